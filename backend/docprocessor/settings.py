@@ -36,6 +36,8 @@ ALLOWED_HOSTS = env("ALLOWED_HOSTS", "localhost").split(",")
 # Application definition
 
 INSTALLED_APPS = [
+    # First, so runserver serves ASGI_APPLICATION (needed by the event stream).
+    "daphne",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -65,7 +67,11 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "x-api-key",
+    "if-none-match",
+    "upload-offset",
+    "x-chunk-sha256",
 ]
+CORS_EXPOSE_HEADERS = ["etag"]
 CORS_ALLOW_CREDENTIALS = True
 
 ROOT_URLCONF = "docprocessor.urls"
@@ -86,22 +92,32 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "docprocessor.wsgi.application"
+ASGI_APPLICATION = "docprocessor.asgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": env("POSTGRES_DB"),
-        "USER": env("POSTGRES_USER"),
-        "PASSWORD": env("POSTGRES_PASSWORD"),
-        "HOST": env("POSTGRES_HOST", "localhost"),
-        "PORT": env("POSTGRES_PORT", "5432"),
-        "CONN_MAX_AGE": 60,
+# DB_ENGINE=sqlite uses a local SQLite file instead (benchmarks, quick local runs).
+if env("DB_ENGINE", "postgresql") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": env("POSTGRES_DB"),
+            "USER": env("POSTGRES_USER"),
+            "PASSWORD": env("POSTGRES_PASSWORD"),
+            "HOST": env("POSTGRES_HOST", "localhost"),
+            "PORT": env("POSTGRES_PORT", "5432"),
+            "CONN_MAX_AGE": 60,
+        }
     }
-}
 
 
 # Password validation
@@ -158,6 +174,119 @@ CELERY_BROKER_CONNECTION_MAX_RETRIES = 0
 CELERY_BROKER_TRANSPORT_OPTIONS = {
     "socket_connect_timeout": 1,  # IMPORTANT
     "socket_timeout": 1,
+    # Import tasks are acked late; Redis redelivers unacked tasks after this
+    # many seconds, so it must exceed the longest import.
+    "visibility_timeout": env.int("CELERY_VISIBILITY_TIMEOUT", 12 * 60 * 60),
 }
 
+# Long-running tasks acked late: do not reserve extra tasks per worker process.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
 API_KEY = env("API_KEY", "")
+# More clients as name=key pairs; jobs record the name of the key used.
+API_CLIENTS: dict[str, str] = env.dict("API_CLIENTS", {})
+
+# Large files can be split into newline-aligned byte ranges processed by a
+# Celery chord. Files at or below IMPORT_CHUNK_SIZE always run as one task.
+IMPORT_CHUNKED = env.bool("IMPORT_CHUNKED", False)
+IMPORT_CHUNK_SIZE = env.int("IMPORT_CHUNK_SIZE", 64 * 1024 * 1024)
+IMPORT_MAX_CHUNKS = env.int("IMPORT_MAX_CHUNKS", 16)
+
+# Validated rows are stored in batches of this size, one transaction each.
+IMPORT_RECORD_BATCH_SIZE = env.int("IMPORT_RECORD_BATCH_SIZE", 10000)
+
+# Failed rows are stored as compact (row, column, code) records in batches of
+# IMPORT_ERROR_BATCH_SIZE; only the first IMPORT_ERROR_LOG_SAMPLE per job are logged.
+IMPORT_ERROR_BATCH_SIZE = env.int("IMPORT_ERROR_BATCH_SIZE", 10000)
+IMPORT_ERROR_LOG_SAMPLE = env.int("IMPORT_ERROR_LOG_SAMPLE", 20)
+
+# Email validation results are memoized per worker process, across jobs.
+EMAIL_CACHE_SIZE = env.int("EMAIL_CACHE_SIZE", 100_000)
+EMAIL_DOMAIN_CACHE_SIZE = env.int("EMAIL_DOMAIN_CACHE_SIZE", 10_000)
+
+# Live progress is published to Redis at most every IMPORT_PROGRESS_INTERVAL
+# seconds (or IMPORT_PROGRESS_ROWS rows); the ImportJob row is only checkpointed
+# every IMPORT_CHECKPOINT_INTERVAL seconds (or IMPORT_CHECKPOINT_ROWS rows).
+IMPORT_PROGRESS_REDIS_URL = env("IMPORT_PROGRESS_REDIS_URL", CELERY_BROKER_URL)
+IMPORT_PROGRESS_INTERVAL = env.float("IMPORT_PROGRESS_INTERVAL", 0.5)
+IMPORT_PROGRESS_ROWS = env.int("IMPORT_PROGRESS_ROWS", 50_000)
+IMPORT_CHECKPOINT_INTERVAL = env.float("IMPORT_CHECKPOINT_INTERVAL", 30.0)
+IMPORT_CHECKPOINT_ROWS = env.int("IMPORT_CHECKPOINT_ROWS", 1_000_000)
+
+# Server-Sent Events stream (ASGI only): poll interval for changes, keepalive
+# comment interval, how often the database is re-read while Redis has data, and
+# how long one connection is kept open before the client is told to reconnect.
+IMPORT_EVENTS_INTERVAL = env.float("IMPORT_EVENTS_INTERVAL", 1.0)
+IMPORT_EVENTS_KEEPALIVE = env.float("IMPORT_EVENTS_KEEPALIVE", 15.0)
+IMPORT_EVENTS_REFRESH_INTERVAL = env.float("IMPORT_EVENTS_REFRESH_INTERVAL", 10.0)
+IMPORT_EVENTS_MAX_AGE = env.float("IMPORT_EVENTS_MAX_AGE", 300.0)
+
+# Status responses of completed/failed jobs are cached for this many seconds.
+IMPORT_STATUS_CACHE_TTL = env.int("IMPORT_STATUS_CACHE_TTL", 60)
+
+# Django cache shared by the web and worker processes, so a worker restarting
+# a job evicts the status cached by the web processes. A non-Redis URL falls
+# back to a per-process cache.
+CACHE_URL = env.str("CACHE_URL", CELERY_BROKER_URL)
+if CACHE_URL.startswith(("redis://", "rediss://", "unix://")):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+            "KEY_PREFIX": "docprocessor",
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# Per-stage timers and Prometheus histograms (/metrics). The Redis flag set by
+# `manage.py import_metrics on|off` overrides this at runtime.
+IMPORT_METRICS_ENABLED = env.bool("IMPORT_METRICS_ENABLED", True)
+
+# Resumable uploads (/api/uploads/) are sent in parts of this many bytes.
+IMPORT_UPLOAD_CHUNK_SIZE = env.int("IMPORT_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+
+# Row reader backend for jobs that do not choose one: "csv" or "arrow"
+# (needs pyarrow). Arrow parses IMPORT_ARROW_BLOCK_SIZE bytes per batch.
+IMPORT_READER = env.str("IMPORT_READER", "csv")
+IMPORT_ARROW_BLOCK_SIZE = env.int("IMPORT_ARROW_BLOCK_SIZE", 4 * 1024 * 1024)
+
+# Memory-map uncompressed files on local (FileSystemStorage) storage instead
+# of streaming them through the storage API.
+IMPORT_MMAP = env.bool("IMPORT_MMAP", True)
+
+# Parse and validate single-task imports in a per-worker process pool of this
+# many processes (0 disables it), handing out blocks of about
+# IMPORT_POOL_BLOCK_SIZE bytes.
+IMPORT_POOL_WORKERS = env.int("IMPORT_POOL_WORKERS", 0)
+IMPORT_POOL_BLOCK_SIZE = env.int("IMPORT_POOL_BLOCK_SIZE", 1024 * 1024)
+
+# Jobs up to IMPORT_FAST_LANE_MAX_BYTES (and IMPORT_FAST_LANE_MAX_ROWS estimated
+# rows) go to the fast queue, larger ones to the bulk queue.
+IMPORT_FAST_QUEUE = env.str("IMPORT_FAST_QUEUE", "imports-fast")
+IMPORT_BULK_QUEUE = env.str("IMPORT_BULK_QUEUE", "imports-bulk")
+IMPORT_FAST_LANE_MAX_BYTES = env.int("IMPORT_FAST_LANE_MAX_BYTES", 16 * 1024 * 1024)
+IMPORT_FAST_LANE_MAX_ROWS = env.int("IMPORT_FAST_LANE_MAX_ROWS", 200_000)
+
+# Bulk jobs running at once (the bulk workers' concurrency), shared between
+# clients by weight (name=weight pairs, default 1). 0 sends bulk jobs straight
+# to the bulk queue.
+IMPORT_BULK_SLOTS = env.int("IMPORT_BULK_SLOTS", 2)
+IMPORT_CLIENT_WEIGHTS: dict[str, int] = env.dict(
+    "IMPORT_CLIENT_WEIGHTS", {}, subcast_values=int
+)
+
+# Duplicate ids within a file become duplicate_id row errors. "exact" keeps
+# the ids seen in sorted runs, spilled to temporary files (in
+# IMPORT_DUPLICATE_IDS_DIR, default the system temp dir) past
+# IMPORT_DUPLICATE_IDS_MEMORY bytes per import; "bloom" uses exactly that much
+# memory but may reject a few unique ids; "off" skips the check.
+IMPORT_DUPLICATE_IDS = env.str("IMPORT_DUPLICATE_IDS", "exact")
+IMPORT_DUPLICATE_IDS_MEMORY = env.int("IMPORT_DUPLICATE_IDS_MEMORY", 64 * 1024 * 1024)
+IMPORT_DUPLICATE_IDS_DIR = env.str("IMPORT_DUPLICATE_IDS_DIR", "")
+
+# Running imports look for a cancel request (Redis flag, else the job row)
+# at most every IMPORT_CANCEL_CHECK_INTERVAL seconds, at block boundaries.
+IMPORT_CANCEL_CHECK_INTERVAL = env.float("IMPORT_CANCEL_CHECK_INTERVAL", 1.0)
@@ -18,7 +18,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from processor.views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/", include("processor.urls"))
+    path("api/", include("processor.urls")),
+    path("metrics", metrics_view),
 ]
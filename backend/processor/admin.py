@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import ImportJob
+from .models import ImportJob, ImportSchema
 
 
 @admin.register(ImportJob)
@@ -11,8 +11,21 @@ class ImportJobAdmin(admin.ModelAdmin):
         "processed_rows",
         "failed_rows",
         "total_rows",
+        "lane",
+        "client",
         "created_at",
         "updated_at",
     )
 
     readonly_fields = [field.name for field in ImportJob._meta.fields]
+
+
+@admin.register(ImportSchema)
+class ImportSchemaAdmin(admin.ModelAdmin):
+    list_display = ("name", "version", "created_at")
+
+    def get_readonly_fields(self, request, obj=None):
+        # Compiled validators are cached by version; save a new version instead.
+        if obj is not None:
+            return ("name", "version", "columns", "aggregates", "created_at")
+        return ("created_at",)
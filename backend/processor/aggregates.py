@@ -0,0 +1,426 @@
+import base64
+import hashlib
+import math
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from .schemas import ColumnSpec, SchemaError
+
+KINDS = ("count", "sum", "min", "max", "stats", "distinct")
+NUMERIC_KINDS = ("sum", "stats")
+GROUP_KEYS = ("value", "domain")
+
+# Groups kept per grouped aggregate; later keys are folded into OTHER_GROUP.
+MAX_GROUPS = 1000
+OTHER_GROUP = "__other__"
+
+# HyperLogLog with 2**12 one-byte registers: about 1.6% standard error.
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RANK_BITS = 64 - HLL_PRECISION
+
+# Computed for jobs whose schema declares no aggregates of its own.
+DEFAULT_AGGREGATES = [
+    {"name": "rows", "type": "count"},
+    {"name": "amount_sum", "type": "sum", "column": "amount"},
+    {"name": "amount_min", "type": "min", "column": "amount"},
+    {"name": "amount_max", "type": "max", "column": "amount"},
+    {"name": "amount_stats", "type": "stats", "column": "amount"},
+    {"name": "distinct_emails", "type": "distinct", "column": "email"},
+    {
+        "name": "amount_by_domain",
+        "type": "sum",
+        "column": "amount",
+        "group_by": "email",
+        "group_key": "domain",
+    },
+]
+
+
+@dataclass(frozen=True)
+class AggregateSpec:
+    name: str
+    type: str
+    column: str | None = None
+    group_by: str | None = None
+    group_key: str = "value"
+    max_groups: int = MAX_GROUPS
+
+    @classmethod
+    def from_dict(
+        cls, data: Mapping[str, Any], columns: Mapping[str, ColumnSpec]
+    ) -> "AggregateSpec":
+        if not isinstance(data, Mapping):
+            raise SchemaError("Each aggregate must be an object.")
+        name = data.get("name")
+        if not name or not isinstance(name, str) or len(name) > 64:
+            raise SchemaError("Each aggregate needs a name of at most 64 characters.")
+        kind = data.get("type")
+        if kind not in KINDS:
+            raise SchemaError(
+                f"Aggregate {name}: type must be one of {', '.join(KINDS)}."
+            )
+        unknown = set(data) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise SchemaError(f"Aggregate {name}: unsupported keys: {sorted(unknown)}")
+
+        column = data.get("column")
+        if column is None and kind != "count":
+            raise SchemaError(f"Aggregate {name}: {kind} needs a column.")
+        if column is not None:
+            if column not in columns:
+                raise SchemaError(f"Aggregate {name}: unknown column {column}.")
+            if kind in NUMERIC_KINDS and columns[column].type not in ("int", "float"):
+                raise SchemaError(f"Aggregate {name}: {kind} needs a numeric column.")
+
+        group_by = data.get("group_by")
+        group_key = data.get("group_key", "value")
+        if group_by is not None and group_by not in columns:
+            raise SchemaError(f"Aggregate {name}: unknown group_by column {group_by}.")
+        if group_key not in GROUP_KEYS:
+            raise SchemaError(
+                f"Aggregate {name}: group_key must be one of {', '.join(GROUP_KEYS)}."
+            )
+        if group_key == "domain" and (
+            group_by is None or columns[group_by].type != "email"
+        ):
+            raise SchemaError(f"Aggregate {name}: domain groups need an email column.")
+
+        max_groups = data.get("max_groups", MAX_GROUPS)
+        if not isinstance(max_groups, int) or max_groups < 1:
+            raise SchemaError(
+                f"Aggregate {name}: max_groups must be a positive integer."
+            )
+        return cls(name, kind, column, group_by, group_key, max_groups)
+
+
+def parse_aggregates(
+    aggregates: Any, columns: Sequence[ColumnSpec]
+) -> tuple[AggregateSpec, ...]:
+    """Parse and check ``ImportSchema.aggregates`` against the schema's columns."""
+    if not isinstance(aggregates, list):
+        raise SchemaError("Aggregates must be a list.")
+    by_name = {spec.name: spec for spec in columns}
+    # Stored fields can be named too, whichever column they are read from.
+    by_name.update({spec.stores: spec for spec in columns if spec.stores})
+    specs = tuple(AggregateSpec.from_dict(data, by_name) for data in aggregates)
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise SchemaError("Aggregate names must be unique.")
+    return specs
+
+
+class Accumulator(Protocol):
+    def add(self, values: Sequence[Any]) -> None: ...
+
+    def merge(self, other: Any) -> None: ...
+
+    def state(self) -> Any: ...
+
+    def load(self, state: Any) -> None: ...
+
+    def result(self) -> Any: ...
+
+
+class Count:
+    def __init__(self) -> None:
+        self.n = 0
+
+    def add(self, values: Sequence[Any]) -> None:
+        self.n += len(values)
+
+    def merge(self, other: "Count") -> None:
+        self.n += other.n
+
+    def state(self) -> Any:
+        return self.n
+
+    def load(self, state: Any) -> None:
+        self.n = state
+
+    def result(self) -> Any:
+        return self.n
+
+
+class Sum:
+    def __init__(self) -> None:
+        self.total: float = 0
+
+    def add(self, values: Sequence[Any]) -> None:
+        self.total += sum(values)
+
+    def merge(self, other: "Sum") -> None:
+        self.total += other.total
+
+    def state(self) -> Any:
+        return self.total
+
+    def load(self, state: Any) -> None:
+        self.total = state
+
+    def result(self) -> Any:
+        return self.total
+
+
+class Min:
+    @staticmethod
+    def pick(values: Iterable[Any]) -> Any:
+        return min(values)
+
+    def __init__(self) -> None:
+        self.value: Any = None
+
+    def add(self, values: Sequence[Any]) -> None:
+        if not values:
+            return
+        best = self.pick(values)
+        self.value = best if self.value is None else self.pick((self.value, best))
+
+    def merge(self, other: "Min") -> None:
+        if other.value is not None:
+            self.add([other.value])
+
+    def state(self) -> Any:
+        return self.value
+
+    def load(self, state: Any) -> None:
+        self.value = state
+
+    def result(self) -> Any:
+        return self.value
+
+
+class Max(Min):
+    @staticmethod
+    def pick(values: Iterable[Any]) -> Any:
+        return max(values)
+
+
+class Stats:
+    """
+    Count, mean and variance in one pass. Blocks are reduced on their own
+    and combined with Chan's update of Welford's (n, mean, M2), which is also
+    how partial results from chunks are merged.
+    """
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, values: Sequence[Any]) -> None:
+        n = len(values)
+        if not n:
+            return
+        mean = sum(values) / n
+        m2 = sum((x - mean) ** 2 for x in values)
+        self.combine(n, mean, m2)
+
+    def combine(self, n: int, mean: float, m2: float) -> None:
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def merge(self, other: "Stats") -> None:
+        if other.n:
+            self.combine(other.n, other.mean, other.m2)
+
+    def state(self) -> Any:
+        return [self.n, self.mean, self.m2]
+
+    def load(self, state: Any) -> None:
+        self.n, self.mean, self.m2 = state
+
+    def result(self) -> Any:
+        # Sample variance, as statistics.variance.
+        variance = self.m2 / (self.n - 1) if self.n > 1 else 0.0
+        return {
+            "count": self.n,
+            "mean": self.mean if self.n else None,
+            "variance": variance,
+            "stddev": math.sqrt(variance),
+        }
+
+
+class Distinct:
+    """Approximate distinct count (HyperLogLog); registers merge by maximum."""
+
+    def __init__(self) -> None:
+        self.registers = bytearray(HLL_REGISTERS)
+
+    def add(self, values: Sequence[Any]) -> None:
+        registers = self.registers
+        mask = (1 << HLL_RANK_BITS) - 1
+        for value in values:
+            digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+            h = int.from_bytes(digest)
+            index = h >> HLL_RANK_BITS
+            rank = HLL_RANK_BITS - (h & mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, other: "Distinct") -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def state(self) -> Any:
+        return base64.b64encode(self.registers).decode()
+
+    def load(self, state: Any) -> None:
+        self.registers = bytearray(base64.b64decode(state))
+
+    def result(self) -> Any:
+        m = HLL_REGISTERS
+        estimate = (0.7213 / (1 + 1.079 / m)) * m * m
+        estimate /= sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting is more accurate.
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+ACCUMULATORS: dict[str, Callable[[], Accumulator]] = {
+    "count": Count,
+    "sum": Sum,
+    "min": Min,
+    "max": Max,
+    "stats": Stats,
+    "distinct": Distinct,
+}
+
+
+def _domain(value: Any) -> str:
+    return str(value).rpartition("@")[2].lower() if value else ""
+
+
+def _value(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+class Grouped:
+    """One accumulator per group key, at most ``max_groups`` of them."""
+
+    def __init__(self, spec: AggregateSpec):
+        self.factory = ACCUMULATORS[spec.type]
+        self.key = _domain if spec.group_key == "domain" else _value
+        self.max_groups = spec.max_groups
+        self.groups: dict[str, Accumulator] = {}
+
+    def group(self, key: str) -> Accumulator:
+        accumulator = self.groups.get(key)
+        if accumulator is None:
+            if len(self.groups) >= self.max_groups and key != OTHER_GROUP:
+                return self.group(OTHER_GROUP)
+            accumulator = self.groups[key] = self.factory()
+        return accumulator
+
+    def add(self, keys: Sequence[Any], values: Sequence[Any]) -> None:
+        buckets: dict[str, list[Any]] = {}
+        key = self.key
+        for group, value in zip(keys, values):
+            buckets.setdefault(key(group), []).append(value)
+        for group, bucket in buckets.items():
+            self.group(group).add(bucket)
+
+    def merge(self, other: "Grouped") -> None:
+        for key, accumulator in other.groups.items():
+            self.group(key).merge(accumulator)
+
+    def state(self) -> Any:
+        return {key: accumulator.state() for key, accumulator in self.groups.items()}
+
+    def load(self, state: Any) -> None:
+        for key, value in state.items():
+            self.group(key).load(value)
+
+    def result(self) -> Any:
+        return {key: accumulator.result() for key, accumulator in self.groups.items()}
+
+
+class Aggregates:
+    """
+    Every aggregate of a job, fed one validated block at a time. The state is
+    plain JSON, so checkpoints carry it across restarts and chunk tasks send
+    theirs to the chord callback to be merged.
+    """
+
+    def __init__(self, specs: Sequence[AggregateSpec]):
+        self.specs = tuple(specs)
+        self.items: list[Any] = [
+            Grouped(spec) if spec.group_by else ACCUMULATORS[spec.type]()
+            for spec in self.specs
+        ]
+
+    @classmethod
+    def for_schema(cls, schema: Any, columns: Sequence[ColumnSpec]) -> "Aggregates":
+        # schema is an ImportSchema or None; None aggregates use the defaults.
+        declared = getattr(schema, "aggregates", None)
+        return cls(
+            parse_aggregates(
+                DEFAULT_AGGREGATES if declared is None else declared, columns
+            )
+        )
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        """Schema columns the aggregates read."""
+        names = {spec.column for spec in self.specs} | {
+            spec.group_by for spec in self.specs
+        }
+        return tuple(sorted(name for name in names if name))
+
+    def update(self, columns: Mapping[str, list[Any]], valid: list[int]) -> None:
+        picked: dict[str, list[Any]] = {}
+
+        def values(name: str) -> list[Any]:
+            if name not in picked:
+                column = columns[name]
+                picked[name] = [column[i] for i in valid]
+            return picked[name]
+
+        for spec, item in zip(self.specs, self.items):
+            if spec.column is None:
+                data: list[Any] = valid
+            else:
+                data = values(spec.column)
+            keys = values(spec.group_by) if spec.group_by else None
+            if spec.column is not None and None in data:
+                # Optional columns: missing values are not aggregated.
+                pairs = [
+                    (i, value) for i, value in enumerate(data) if value is not None
+                ]
+                data = [value for _, value in pairs]
+                if keys is not None:
+                    keys = [keys[i] for i, _ in pairs]
+            if keys is None:
+                item.add(data)
+            else:
+                item.add(keys, data)
+
+    def state(self) -> list[Any]:
+        return [item.state() for item in self.items]
+
+    def load(self, state: list[Any]) -> None:
+        for item, value in zip(self.items, state):
+            item.load(value)
+
+    def merge(self, state: list[Any]) -> None:
+        other = Aggregates(self.specs)
+        other.load(state)
+        for item, partial in zip(self.items, other.items):
+            item.merge(partial)
+
+    def results(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "name": spec.name,
+                "type": spec.type,
+                "column": spec.column or "",
+                "group_by": spec.group_by or "",
+                "value": item.result(),
+            }
+            for spec, item in zip(self.specs, self.items)
+        ]
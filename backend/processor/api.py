@@ -1,33 +1,364 @@
+import io
+import uuid as uuid_lib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
 from django.db import transaction
+from django.http.response import HttpResponseBase
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
 from rest_framework.request import Request
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 
-from .permissions import HasImportApiKey
-from .serializers import ImportJobStatusSerializer, ImportUploadSerializer
+from .permissions import HasImportApiKey, api_client
+from .serializers import (
+    ImportAggregateSerializer,
+    ImportBatchStatusSerializer,
+    ImportJobStatusSerializer,
+    ImportRowErrorSerializer,
+    ImportUploadSerializer,
+    UploadSessionCreateSerializer,
+    UploadSessionSerializer,
+)
 from .services import ImportService
-from .tasks import process_import
-from .models import ImportJob
+from .scheduling import BULK
+from .tasks import assemble_upload, dispatch_bulk, enqueue_import
+from .models import ImportJob, ImportStatus, ImportUpload, UploadStatus
+from .uploads import HashingUploadHandler, UploadService
+
+
+def _int_param(request: Request, name: str, default: int, minimum: int = 0) -> int:
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer."})
+    if number < minimum:
+        raise ValidationError({name: f"Must be at least {minimum}."})
+    return number
 
 
 class ImportUploadApi(APIView):
     permission_classes = [HasImportApiKey]
 
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+
+    def get(self, request: Request) -> Response:
+        """
+        List jobs oldest first, keyset-paginated on ``(created_at, id)``.
+        Filters: ``status``, ``created_after``; ``cursor`` comes from ``next``.
+        """
+        params = request.query_params
+        job_status = params.get("status") or None
+        if job_status is not None and job_status not in ImportStatus.values:
+            raise ValidationError({"status": "Unknown status."})
+
+        created_after = None
+        if params.get("created_after"):
+            created_after = self._datetime_param(params["created_after"])
+        after = self._decode_cursor(params["cursor"]) if params.get("cursor") else None
+        limit = min(
+            _int_param(request, "limit", self.DEFAULT_LIMIT, minimum=1),
+            self.MAX_LIMIT,
+        )
+
+        jobs = ImportService.list_jobs(job_status, created_after, after, limit)
+        ImportService.apply_live_progress_many(jobs)
+        next_cursor = self._encode_cursor(jobs[-1]) if len(jobs) == limit else None
+
+        return Response(
+            {
+                "results": [ImportJobStatusSerializer.from_instance(j) for j in jobs],
+                "next": next_cursor,
+            },
+            status=status.HTTP_200_OK,
+        )
+
     def post(self, request: Request) -> Response:
+        # Must be installed before request.data parses the multipart body;
+        # DRF's MultiPartParser reads request.upload_handlers.
+        hasher = HashingUploadHandler(request)
+        request.upload_handlers.insert(0, hasher)
+
         serializer = ImportUploadSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        job = ImportService.create_job(serializer.validated_data["file"])
-        transaction.on_commit(lambda: process_import.delay(str(job.id)))
-        return Response({"id": job.id}, status=status.HTTP_201_CREATED)
+        data = serializer.validated_data
+        sha256 = hasher.hexdigest("file")
+        if not data["reprocess"]:
+            previous = ImportService.find_completed(sha256, data["schema"])
+            if previous is not None:
+                return Response(
+                    {"id": previous.id, "duplicate": True}, status=status.HTTP_200_OK
+                )
+
+        job = ImportService.create_job(
+            data["file"],
+            sha256,
+            data["schema"],
+            data["reader"],
+            api_client(request),
+            data["total_rows"],
+        )
+        transaction.on_commit(lambda: enqueue_import(job))
+        return Response(
+            {"id": job.id, "duplicate": False}, status=status.HTTP_201_CREATED
+        )
+
+    @staticmethod
+    def _datetime_param(value: str) -> datetime:
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({"created_after": "Must be an ISO 8601 datetime."})
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    @staticmethod
+    def _encode_cursor(job: ImportJob) -> str:
+        raw = f"{job.created_at.isoformat()}|{job.id}"
+        return urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[datetime, uuid_lib.UUID]:
+        try:
+            created_at, job_id = urlsafe_b64decode(cursor).decode().split("|")
+            parsed = parse_datetime(created_at)
+            if parsed is None:
+                raise ValueError(created_at)
+            return parsed, uuid_lib.UUID(job_id)
+        except ValueError:
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+
+class ImportBatchStatusApi(APIView):
+    """Status of up to 1000 jobs in one request and one query."""
+
+    permission_classes = [HasImportApiKey]
+
+    def post(self, request: Request) -> Response:
+        serializer = ImportBatchStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+
+        jobs = ImportService.get_jobs(ids)
+        ImportService.apply_live_progress_many(jobs)
+        found = {job.id for job in jobs}
+
+        return Response(
+            {
+                "results": [ImportJobStatusSerializer.from_instance(j) for j in jobs],
+                "missing": [job_id for job_id in ids if job_id not in found],
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
 class ImportStatusApi(APIView):
     permission_classes = [HasImportApiKey]
 
+    TERMINAL_STATUSES = (
+        ImportStatus.COMPLETED,
+        ImportStatus.FAILED,
+        ImportStatus.CANCELLED,
+    )
+
+    def get(self, request: Request, uuid: str) -> HttpResponseBase:
+        cached = ImportService.get_cached_status(uuid)
+        if cached is not None:
+            data, etag, last_modified = cached
+        else:
+            job = get_object_or_404(ImportJob, pk=uuid)
+            live = ImportService.apply_live_progress(job)
+            data = ImportJobStatusSerializer.from_instance(job)
+            etag = ImportJobStatusSerializer.etag(data)
+            # Live counters move without updated_at, so only the ETag can
+            # validate them.
+            last_modified = None if live else int(job.updated_at.timestamp())
+            if job.status in self.TERMINAL_STATUSES:
+                ImportService.cache_status(job.id, (data, etag, last_modified))
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        response = not_modified or Response(data, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
+class ImportCancelApi(APIView):
+    permission_classes = [HasImportApiKey]
+
+    FINISHED_STATUSES = (ImportStatus.COMPLETED, ImportStatus.FAILED)
+
+    def post(self, request: Request, uuid: str) -> Response:
+        """
+        Cancel a job. A pending job is cancelled at once; a processing one
+        keeps its status, with ``cancel_requested`` set, until its worker
+        stops at the next block boundary. Cancelling twice is a no-op.
+        """
+        job = get_object_or_404(ImportJob, pk=uuid)
+        if job.status in self.FINISHED_STATUSES:
+            return Response(
+                {"detail": f"Import is already {job.status}."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        job = ImportService.cancel(job)
+        if job.lane == BULK:
+            # A cancelled bulk job that was dispatched frees its slot.
+            transaction.on_commit(dispatch_bulk)
+        return Response(
+            ImportJobStatusSerializer.from_instance(job),
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class ImportErrorsApi(APIView):
+    permission_classes = [HasImportApiKey]
+
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+
     def get(self, request: Request, uuid: str) -> Response:
         job = get_object_or_404(ImportJob, pk=uuid)
-        data = ImportJobStatusSerializer.from_instance(job)
-        return Response(data, status=status.HTTP_200_OK)
+        after = _int_param(request, "after", 0)
+        limit = min(
+            _int_param(request, "limit", self.DEFAULT_LIMIT, minimum=1), self.MAX_LIMIT
+        )
+
+        errors = ImportService.list_errors(job, after=after, limit=limit)
+        next_after = errors[-1].row_number if len(errors) == limit else None
+
+        return Response(
+            {
+                "results": [ImportRowErrorSerializer.from_instance(e) for e in errors],
+                "next": next_after,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ImportAggregatesApi(APIView):
+    permission_classes = [HasImportApiKey]
+
+    def get(self, request: Request, uuid: str) -> Response:
+        """Aggregates are stored when the job completes; empty until then."""
+        job = get_object_or_404(ImportJob, pk=uuid)
+        aggregates = ImportService.list_aggregates(job)
+        return Response(
+            {
+                "status": job.status,
+                "results": [
+                    ImportAggregateSerializer.from_instance(a) for a in aggregates
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class UploadSessionApi(APIView):
+    permission_classes = [HasImportApiKey]
+
+    def post(self, request: Request) -> Response:
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        upload = UploadService.create(
+            data["filename"],
+            data["size"],
+            data.get("sha256", ""),
+            data["reprocess"],
+            data["schema"],
+            data["reader"],
+            api_client(request),
+        )
+        return Response(
+            UploadSessionSerializer.from_instance(upload, []),
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class UploadSessionStatusApi(APIView):
+    permission_classes = [HasImportApiKey]
+
+    def get(self, request: Request, uuid: str) -> Response:
+        upload = get_object_or_404(ImportUpload, pk=uuid)
+        return Response(
+            UploadSessionSerializer.from_instance(
+                upload, UploadService.received(upload)
+            ),
+            status=status.HTTP_200_OK,
+        )
+
+
+class UploadChunkApi(APIView):
+    """
+    PUT the raw bytes of one chunk with ``Upload-Offset: <byte offset>`` and,
+    optionally, ``X-Chunk-SHA256``. The body is never parsed: it is read from
+    the request stream straight into storage.
+    """
+
+    permission_classes = [HasImportApiKey]
+
+    def put(self, request: Request, uuid: str, index: int) -> Response:
+        upload = get_object_or_404(ImportUpload, pk=uuid)
+        offset = request.headers.get("Upload-Offset", "")
+        if not offset.isdigit():
+            raise ValidationError({"offset": "Upload-Offset header is required."})
+
+        chunk = UploadService.store_chunk(
+            upload,
+            index,
+            int(offset),
+            request.stream or io.BytesIO(),
+            request.headers.get("X-Chunk-SHA256", ""),
+        )
+        return Response(
+            {"index": chunk.index, "size": chunk.size, "sha256": chunk.sha256},
+            status=status.HTTP_200_OK,
+        )
+
+
+class UploadCompleteApi(APIView):
+    permission_classes = [HasImportApiKey]
+
+    def post(self, request: Request, uuid: str) -> Response:
+        upload = get_object_or_404(ImportUpload, pk=uuid)
+        missing = UploadService.missing(upload)
+        if missing and upload.status == UploadStatus.OPEN:
+            return Response(
+                {"detail": "Upload has missing chunks.", "missing": missing},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        upload, queued = UploadService.complete(uuid)
+        if queued:
+            upload_id = str(upload.id)
+            transaction.on_commit(lambda: assemble_upload.delay(upload_id))
+        # The parts are assembled by a worker; poll the upload until it is
+        # completed (its job is set) or open again with an error.
+        return Response(
+            {"id": upload.job_id, "status": upload.status, "error": upload.error},
+            status=(
+                status.HTTP_200_OK
+                if upload.status == UploadStatus.COMPLETED
+                else status.HTTP_202_ACCEPTED
+            ),
+        )
@@ -0,0 +1,223 @@
+import csv
+import io
+import random
+import resource
+import sys
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass
+from itertools import batched
+from typing import Any
+
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .chunking import LineReader
+from .models import ImportJob
+from .processor import CSVProcessor
+from .schemas import DEFAULT_SCHEMA
+from .tasks import process_import
+from .validators import CSVBatchValidator, CSVRowValidator, email_cache
+
+STAGES = (
+    "parse",
+    "row_validator",
+    "batch_validator",
+    "schema_validator",
+    "progress",
+    "end_to_end",
+)
+
+# Value that makes a row fail, per column (id, name, email, amount).
+BROKEN_VALUES = ("x", "", "user@", "-1")
+
+# Nominal row size used when only progress calls are simulated.
+PROGRESS_BYTES_PER_ROW = 40
+
+
+@dataclass(frozen=True)
+class Dataset:
+    rows: int
+    error_ratio: float = 0.0
+    email_domains: int = 10
+    # Distinct addresses; 0 makes every address unique.
+    distinct_emails: int = 0
+    # Filler columns appended after id,name,email,amount.
+    extra_columns: int = 0
+    seed: int = 0
+
+
+def generate_csv(dataset: Dataset) -> bytes:
+    """Deterministic synthetic CSV: the same dataset always gives the same bytes."""
+    rng = random.Random(dataset.seed)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(
+        ["id", "name", "email", "amount"]
+        + [f"extra_{i}" for i in range(dataset.extra_columns)]
+    )
+
+    domains = [f"domain{i}.example.com" for i in range(max(1, dataset.email_domains))]
+    for n in range(1, dataset.rows + 1):
+        key = rng.randrange(dataset.distinct_emails) if dataset.distinct_emails else n
+        row = [
+            str(n),
+            f"name-{n}",
+            f"user{key}@{domains[key % len(domains)]}",
+            f"{rng.uniform(0, 10_000):.2f}",
+        ]
+        row += [
+            f"value-{rng.randrange(1_000_000)}" for _ in range(dataset.extra_columns)
+        ]
+
+        if rng.random() < dataset.error_ratio:
+            column = rng.randrange(len(BROKEN_VALUES))
+            row[column] = BROKEN_VALUES[column]
+        writer.writerow(row)
+
+    return out.getvalue().encode()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is the process high-water mark: KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(
+    stage: str, dataset: Dataset, run: Callable[[], Any], count_queries: bool = False
+) -> dict[str, Any]:
+    email_cache.clear()
+    queries = None
+    start = time.perf_counter()
+    if count_queries:
+        with CaptureQueriesContext(connection) as captured:
+            run()
+        queries = len(captured)
+    else:
+        run()
+    seconds = time.perf_counter() - start
+
+    return {
+        "stage": stage,
+        **asdict(dataset),
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(dataset.rows / seconds) if seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "queries_per_10k_rows": (
+            round(queries * 10_000 / dataset.rows, 1)
+            if queries is not None and dataset.rows
+            else None
+        ),
+    }
+
+
+def iter_rows(data: bytes) -> Iterable[dict[str, str]]:
+    return csv.DictReader(LineReader(io.BytesIO(data)))
+
+
+def parse(data: bytes) -> None:
+    for _ in iter_rows(data):
+        pass
+
+
+def validate_rows(data: bytes) -> None:
+    for row in iter_rows(data):
+        try:
+            CSVRowValidator.validate_row(row)
+        except ValueError:
+            pass
+
+
+def validate_batches(data: bytes) -> None:
+    for block in batched(iter_rows(data), CSVProcessor.VALIDATION_BLOCK_SIZE):
+        CSVBatchValidator.validate_rows(block)
+
+
+def validate_schema(data: bytes) -> None:
+    # What CSVProcessor does: csv.reader lists against the compiled schema.
+    reader = csv.reader(LineReader(io.BytesIO(data)))
+    validator = DEFAULT_SCHEMA.bind(next(reader))
+    for block in batched(filter(None, reader), CSVProcessor.VALIDATION_BLOCK_SIZE):
+        validator.validate_rows(block)
+
+
+def report_progress(job: ImportJob, rows: int) -> None:
+    # The progress calls process_rows makes for a file of ``rows`` rows, with
+    # the configured throttles.
+    processor = CSVProcessor(job)
+    processor.start(file_size=rows * PROGRESS_BYTES_PER_ROW)
+    step = CSVProcessor.VALIDATION_BLOCK_SIZE
+    for processed in range(step, rows + step, step):
+        processed = min(processed, rows)
+        processor.update_progress(
+            processed, processed, 0, processed * PROGRESS_BYTES_PER_ROW
+        )
+
+
+def run_stage(stage: str, dataset: Dataset, data: bytes) -> dict[str, Any]:
+    if stage == "parse":
+        return measure(stage, dataset, lambda: parse(data))
+    if stage == "row_validator":
+        return measure(stage, dataset, lambda: validate_rows(data))
+    if stage == "batch_validator":
+        return measure(stage, dataset, lambda: validate_batches(data))
+    if stage == "schema_validator":
+        return measure(stage, dataset, lambda: validate_schema(data))
+
+    job = ImportJob.objects.create(file=ContentFile(data, name="benchmark.csv"))
+    try:
+        if stage == "progress":
+            return measure(
+                stage, dataset, lambda: report_progress(job, dataset.rows), True
+            )
+        if stage == "end_to_end":
+            # apply() runs the Celery task in-process, without a broker.
+            return measure(
+                stage,
+                dataset,
+                lambda: process_import.apply(args=[str(job.id)], throw=True),
+                True,
+            )
+        raise ValueError(f"Unknown stage: {stage}")
+    finally:
+        job.file.delete(save=False)
+        job.delete()
+
+
+def run_benchmarks(
+    datasets: Iterable[Dataset], stages: Iterable[str] = STAGES
+) -> list[dict[str, Any]]:
+    results = []
+    for dataset in datasets:
+        data = generate_csv(dataset)
+        for stage in stages:
+            results.append(run_stage(stage, dataset, data))
+    return results
+
+
+def result_key(result: dict[str, Any]) -> tuple:
+    return tuple(result[field] for field in ("stage", *Dataset.__dataclass_fields__))
+
+
+def compare(
+    results: list[dict[str, Any]], baseline: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Rows/sec change of every result that has a matching baseline entry."""
+    previous = {result_key(r): r for r in baseline}
+    changes = []
+    for result in results:
+        before = previous.get(result_key(result))
+        if not before or not before.get("rows_per_sec") or not result["rows_per_sec"]:
+            continue
+        changes.append(
+            {
+                "stage": result["stage"],
+                "rows": result["rows"],
+                "baseline_rows_per_sec": before["rows_per_sec"],
+                "rows_per_sec": result["rows_per_sec"],
+                "change": round(result["rows_per_sec"] / before["rows_per_sec"] - 1, 4),
+            }
+        )
+    return changes
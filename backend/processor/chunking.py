@@ -0,0 +1,121 @@
+import csv
+from typing import IO
+
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+
+class LineReader:
+    """
+    Iterates decoded lines of a binary file for ``csv.reader`` while tracking
+    the byte offset just past the last line handed out. ``csv.reader`` pulls
+    lines lazily, so right after it yields a row ``offset`` is the exact start
+    of the next row. Stops at ``end`` when given; ranges from
+    ``split_byte_ranges`` are row-aligned, so this never cuts a row.
+    """
+
+    def __init__(self, raw: IO[bytes], start: int = 0, end: int | None = None):
+        self.raw = raw
+        self.offset = start
+        self.end = end
+        raw.seek(start)
+
+    def seek(self, offset: int) -> None:
+        self.raw.seek(offset)
+        self.offset = offset
+
+    def __iter__(self) -> "LineReader":
+        return self
+
+    def __next__(self) -> str:
+        if self.end is not None and self.offset >= self.end:
+            raise StopIteration
+        line = self.raw.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode("utf-8")
+
+
+def read_header(raw: IO[bytes]) -> tuple[list[str] | None, int]:
+    """Return the header fieldnames and the byte offset where data rows start."""
+    lines = LineReader(raw)
+    return next(csv.reader(lines), None), lines.offset
+
+
+def find_row_boundaries(raw: IO[bytes], targets: list[int]) -> list[int]:
+    """
+    For every target offset return the offset just past the first newline at
+    or after it that is not inside a quoted field. Quote state is tracked from
+    byte 0, so a newline embedded in ``"..."`` never splits a row. Targets that
+    fall past the last row boundary are dropped.
+    """
+    raw.seek(0)
+    boundaries: list[int] = []
+    pending = sorted(targets)
+    in_quotes = False
+    offset = 0
+
+    while pending:
+        block = raw.read(SCAN_BLOCK_SIZE)
+        if not block:
+            break
+
+        pos = 0
+        size = len(block)
+        while pending and pos < size:
+            target = pending[0] - offset
+            if target > pos:
+                # Nothing to find before the target: only the quote parity matters.
+                stop = min(target, size)
+                if block.count(b'"', pos, stop) % 2:
+                    in_quotes = not in_quotes
+                pos = stop
+                continue
+
+            nl = block.find(b"\n", pos)
+            if nl == -1:
+                if block.count(b'"', pos) % 2:
+                    in_quotes = not in_quotes
+                pos = size
+                continue
+
+            if block.count(b'"', pos, nl) % 2:
+                in_quotes = not in_quotes
+            pos = nl + 1
+            if not in_quotes:
+                boundary = offset + pos
+                boundaries.append(boundary)
+                while pending and pending[0] <= boundary:
+                    pending.pop(0)
+
+        offset += size
+
+    return boundaries
+
+
+def split_byte_ranges(
+    raw: IO[bytes], size: int, chunk_size: int, max_chunks: int
+) -> tuple[list[str] | None, list[tuple[int, int]]]:
+    """
+    Split a stored CSV into newline-aligned ``(start, end)`` byte ranges that
+    together cover every data row once. Returns the header fieldnames too, so
+    chunk workers never have to re-read the first line.
+    """
+    fieldnames, header_end = read_header(raw)
+    if fieldnames is None:
+        return None, []
+
+    data_size = size - header_end
+    if data_size <= 0:
+        return fieldnames, []
+
+    chunk_size = max(chunk_size, -(-data_size // max(1, max_chunks)))
+    targets = list(range(header_end + chunk_size, size, chunk_size))
+
+    starts = [header_end]
+    for boundary in find_row_boundaries(raw, targets):
+        if starts[-1] < boundary < size:
+            starts.append(boundary)
+
+    ends = starts[1:] + [size]
+    return fieldnames, list(zip(starts, ends))
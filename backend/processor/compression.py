@@ -0,0 +1,66 @@
+import gzip
+import os
+import zlib
+from typing import IO, cast
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# Accepted upload names.
+EXTENSIONS = (".csv", ".csv.gz", ".csv.zst")
+SUFFIXES = {".gz": GZIP, ".zst": ZSTD}
+
+# Compressed bytes read to recover the first few KiB of CSV text.
+HEAD_READ_SIZE = 64 * 1024
+
+
+class CompressionError(ValueError):
+    pass
+
+
+def compression_for(filename: str | None) -> str | None:
+    """Compression of a stored upload, from its extension (``None`` for plain CSV)."""
+    if not filename:
+        return None
+    # Storage may insert a random suffix before the last extension
+    # ("feed.csv_Ab12xYz.gz"), so only that extension is reliable.
+    return SUFFIXES.get(os.path.splitext(filename.lower())[1])
+
+
+def open_decompressed(raw: IO[bytes], compression: str | None) -> IO[bytes]:
+    """
+    Wrap ``raw`` in a streaming decompressor. Nothing is written to disk; the
+    decompressed file supports ``readline`` and forward ``seek``, which is all
+    ``LineReader`` needs. ``raw.tell()`` keeps reporting compressed bytes read.
+    """
+    # GzipFile and ZstdFile are io.BufferedIOBase streams with the full binary
+    # file interface, which the stubs do not spell as IO[bytes].
+    if compression is None:
+        return raw
+    if compression == GZIP:
+        return cast(IO[bytes], gzip.GzipFile(fileobj=raw, mode="rb"))
+    if compression == ZSTD:
+        # Python 3.14+ stdlib; only needed for .zst uploads.
+        from compression import zstd
+
+        return cast(IO[bytes], zstd.ZstdFile(raw, mode="rb"))
+    raise CompressionError(f"Unsupported compression: {compression}")
+
+
+def decompress_head(data: bytes, compression: str | None, size: int) -> bytes:
+    """
+    Decompress at most ``size`` bytes from the start of a compressed stream.
+    ``data`` may be a truncated prefix of the file (e.g. the first upload part).
+    """
+    if compression is None:
+        return data[:size]
+    try:
+        if compression == GZIP:
+            return zlib.decompressobj(zlib.MAX_WBITS | 16).decompress(data, size)
+        if compression == ZSTD:
+            from compression import zstd
+
+            return zstd.ZstdDecompressor().decompress(data, size)
+    except Exception as exc:
+        raise CompressionError(f"File is not valid {compression} data.") from exc
+    raise CompressionError(f"Unsupported compression: {compression}")
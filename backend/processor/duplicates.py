@@ -0,0 +1,202 @@
+import hashlib
+import mmap
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator, Sequence
+from itertools import chain
+from typing import Protocol
+
+from django.conf import settings
+
+EXACT = "exact"
+BLOOM = "bloom"
+OFF = "off"
+MODES = (EXACT, BLOOM, OFF)
+
+# Validation message of rows whose id was already imported from the file.
+DUPLICATE_ID = "Duplicate id"
+
+ID_BYTES = array("q").itemsize
+# New ids held in a set (a few MiB) before they are sorted into a run.
+BUFFER_IDS = 64 * 1024
+# Ids merged per step, so a merge never holds more Python ints than this.
+MERGE_STEP = 64 * 1024
+BLOOM_HASHES = 7
+
+
+class IdSet(Protocol):
+    def add(self, ids: Sequence[int]) -> list[int]: ...
+
+    def close(self) -> None: ...
+
+
+class Run:
+    """A sorted run of ids, in memory or memory-mapped from a temporary file."""
+
+    def __init__(self, values: Sequence[int], map: mmap.mmap | None = None):
+        self.values = values
+        self.map = map
+        self.low = values[0]
+        self.high = values[-1]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, id_: int) -> bool:
+        if id_ < self.low or id_ > self.high:
+            return False
+        return self.values[bisect_left(self.values, id_)] == id_
+
+    @property
+    def resident(self) -> int:
+        return 0 if self.map is not None else len(self.values) * ID_BYTES
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.values.release()  # type: ignore[attr-defined]
+            self.map.close()
+
+
+def merge_runs(left: Sequence[int], right: Sequence[int]) -> Iterator[Sequence[int]]:
+    """The union of two disjoint sorted runs, in sorted pieces of bounded size."""
+    i = j = 0
+    while i < len(left) and j < len(right):
+        a = left[i : i + MERGE_STEP]
+        b = right[j : j + MERGE_STEP]
+        # Everything up to the smaller of the two last ids can be emitted;
+        # one side is always used up, so each step advances MERGE_STEP ids.
+        bound = min(a[-1], b[-1])
+        x = bisect_right(a, bound)
+        y = bisect_right(b, bound)
+        yield sorted(chain(a[:x], b[:y]))
+        i += x
+        j += y
+    for rest, start in ((left, i), (right, j)):
+        for k in range(start, len(rest), MERGE_STEP):
+            # A copy: no view may outlive the merge, or its map cannot close.
+            yield array("q", rest[k : k + MERGE_STEP])
+
+
+class SortedIdSet:
+    """
+    Exact set of 64-bit ids, 8 bytes per id. New ids collect in a small set
+    and are sorted into an ``array('q')`` run when it fills; runs of similar
+    size are merged, so there are only a few of them. A merged run that would
+    take the runs held in memory past ``memory`` bytes is written to an
+    anonymous temporary file and memory-mapped instead.
+    """
+
+    def __init__(self, memory: int, buffer: int = BUFFER_IDS):
+        self.memory = memory
+        self.buffer = max(1, buffer)
+        self.pending: set[int] = set()
+        self.runs: list[Run] = []
+        self.high = -(1 << 63)
+
+    def add(self, ids: Sequence[int]) -> list[int]:
+        """Add ``ids``; returns the positions of ids seen before, in this call or earlier."""
+        repeated = []
+        pending = self.pending
+        for position, id_ in enumerate(ids):
+            # Ids usually grow through a file; a new maximum needs no lookup.
+            if id_ > self.high:
+                self.high = id_
+            elif id_ in pending or any(id_ in run for run in self.runs):
+                repeated.append(position)
+                continue
+            pending.add(id_)
+            if len(pending) >= self.buffer:
+                self.flush()
+        return repeated
+
+    def flush(self) -> None:
+        self.runs.append(Run(array("q", sorted(self.pending))))
+        self.pending.clear()
+        # Keep run sizes geometric: O(log n) runs, each id merged O(log n) times.
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            right = self.runs.pop()
+            left = self.runs.pop()
+            self.runs.append(self.merge(left, right))
+
+    def merge(self, left: Run, right: Run) -> Run:
+        size = len(left) + len(right)
+        resident = (
+            sum(run.resident for run in self.runs) + left.resident + right.resident
+        )
+        pieces = merge_runs(left.values, right.values)
+
+        if resident + size * ID_BYTES <= self.memory:
+            values = array("q")
+            for piece in pieces:
+                values.extend(piece)
+            merged = Run(values)
+        else:
+            with tempfile.TemporaryFile(
+                dir=settings.IMPORT_DUPLICATE_IDS_DIR or None
+            ) as f:
+                for piece in pieces:
+                    f.write(array("q", piece))
+                f.flush()
+                map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            merged = Run(memoryview(map).cast("q"), map)
+
+        left.close()
+        right.close()
+        return merged
+
+    def close(self) -> None:
+        for run in self.runs:
+            run.close()
+        self.runs = []
+        self.pending.clear()
+
+
+class BloomIdSet:
+    """
+    Bloom filter over exactly ``memory`` bytes, whatever the row count. No
+    duplicate is missed, but a new id is taken for a duplicate with a
+    probability under 1% up to one id per 10 bits (about 840k ids per MiB),
+    rising beyond that.
+    """
+
+    def __init__(self, memory: int):
+        self.bits = bytearray(max(1, memory))
+        self.size = len(self.bits) * 8
+
+    def positions(self, id_: int) -> list[int]:
+        digest = hashlib.blake2b(
+            id_.to_bytes(8, "little", signed=True), digest_size=16
+        ).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(BLOOM_HASHES)]
+
+    def add(self, ids: Sequence[int]) -> list[int]:
+        repeated = []
+        bits = self.bits
+        for position, id_ in enumerate(ids):
+            seen = True
+            for bit in self.positions(id_):
+                byte, mask = bit >> 3, 1 << (bit & 7)
+                if not bits[byte] & mask:
+                    seen = False
+                    bits[byte] |= mask
+            if seen:
+                repeated.append(position)
+        return repeated
+
+    def close(self) -> None:
+        pass
+
+
+def open_id_set(mode: str = "", memory: int | None = None) -> IdSet | None:
+    """Id set for one import, from ``IMPORT_DUPLICATE_IDS``; None when the check is off."""
+    mode = mode or settings.IMPORT_DUPLICATE_IDS
+    if memory is None:
+        memory = settings.IMPORT_DUPLICATE_IDS_MEMORY
+    if mode == BLOOM:
+        return BloomIdSet(memory)
+    if mode == EXACT:
+        return SortedIdSet(memory)
+    return None
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+import uuid as uuid_lib
+from collections.abc import AsyncIterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from rest_framework.exceptions import PermissionDenied
+
+from .models import ImportJob, ImportStatus
+from .permissions import HasImportApiKey
+from .progress import progress_channel
+from .serializers import ImportJobStatusSerializer
+
+TERMINAL_STATUSES = (
+    ImportStatus.COMPLETED,
+    ImportStatus.FAILED,
+    ImportStatus.CANCELLED,
+)
+
+
+class ImportEventStream:
+    """
+    Server-Sent Events for one job. Emits ``progress`` whenever the counters
+    change and a final ``summary`` once the job is finished. While a job is
+    processing, the live counters come from Redis; the database is read only
+    when Redis has nothing or at ``IMPORT_EVENTS_REFRESH_INTERVAL``. After
+    ``IMPORT_EVENTS_MAX_AGE`` the stream ends with a ``retry`` field, so an
+    abandoned connection stops polling and ``EventSource`` reconnects.
+    """
+
+    def __init__(self, job: ImportJob):
+        self.job = job
+        self.last_refresh = time.monotonic()
+
+    def snapshot(self) -> dict:
+        live = None
+        if self.job.status == ImportStatus.PROCESSING:
+            live = progress_channel.read(self.job.id)
+
+        now = time.monotonic()
+        if (
+            live is None
+            or now - self.last_refresh >= settings.IMPORT_EVENTS_REFRESH_INTERVAL
+        ):
+            self.job.refresh_from_db()
+            self.last_refresh = now
+            if self.job.status == ImportStatus.PROCESSING and live is None:
+                live = progress_channel.read(self.job.id)
+
+        for field, value in (live or {}).items():
+            if hasattr(self.job, field):
+                setattr(self.job, field, value)
+
+        return ImportJobStatusSerializer.from_instance(self.job)
+
+    async def events(self) -> AsyncIterator[str]:
+        snapshot = sync_to_async(self.snapshot)
+        last_data = None
+        last_sent = opened = time.monotonic()
+
+        while True:
+            data = await snapshot()
+
+            if data["status"] in TERMINAL_STATUSES:
+                yield self.format("summary", data)
+                return
+
+            now = time.monotonic()
+            if data != last_data:
+                yield self.format("progress", data)
+                last_data = data
+                last_sent = now
+            elif now - last_sent >= settings.IMPORT_EVENTS_KEEPALIVE:
+                yield ": keepalive\n\n"
+                last_sent = now
+
+            if now - opened >= settings.IMPORT_EVENTS_MAX_AGE:
+                retry = int(settings.IMPORT_EVENTS_INTERVAL * 1000)
+                yield f"retry: {retry}\n\n"
+                return
+
+            await asyncio.sleep(settings.IMPORT_EVENTS_INTERVAL)
+
+    @staticmethod
+    def format(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def import_events(request: HttpRequest, uuid: str) -> HttpResponseBase:
+    try:
+        HasImportApiKey().has_permission(request, None)  # type: ignore[arg-type]
+    except PermissionDenied as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=403)
+
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would have to buffer the whole stream; clients poll
+        # GET /api/imports/<uuid>/ instead.
+        return JsonResponse(
+            {"detail": "Event stream requires an ASGI server."}, status=501
+        )
+
+    try:
+        job_id = uuid_lib.UUID(uuid)
+    except ValueError:
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    job = await ImportJob.objects.filter(pk=job_id).afirst()
+    if job is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    return StreamingHttpResponse(
+        ImportEventStream(job).events(),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
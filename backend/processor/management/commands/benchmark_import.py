@@ -0,0 +1,115 @@
+import json
+import platform
+from pathlib import Path
+from typing import Any
+
+import django
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+from django.utils import timezone
+
+from processor.benchmarks import STAGES, Dataset, compare, run_benchmarks
+from processor.progress import progress_channel
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the import pipeline on synthetic CSVs. Runs in a throwaway "
+        "test database of the configured engine (SQLite or PostgreSQL)."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--error-ratio", type=float, default=0.05)
+        parser.add_argument("--email-domains", type=int, default=10)
+        parser.add_argument(
+            "--distinct-emails",
+            type=int,
+            default=0,
+            help="Size of the address pool; 0 makes every address unique.",
+        )
+        parser.add_argument("--extra-columns", type=int, default=0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+        parser.add_argument("--output", type=Path, help="Write results as JSON.")
+        parser.add_argument(
+            "--baseline", type=Path, help="JSON from an earlier run to compare with."
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            default=None,
+            help="Fail when any stage is slower than the baseline by this fraction.",
+        )
+        parser.add_argument(
+            "--no-redis",
+            action="store_true",
+            help="Do not publish live progress to Redis.",
+        )
+        parser.add_argument(
+            "--keepdb", action="store_true", help="Reuse the test database."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["no_redis"]:
+            progress_channel.disable()
+
+        datasets = [
+            Dataset(
+                rows=rows,
+                error_ratio=options["error_ratio"],
+                email_domains=options["email_domains"],
+                distinct_emails=options["distinct_emails"],
+                extra_columns=options["extra_columns"],
+                seed=options["seed"],
+            )
+            for rows in options["rows"]
+        ]
+
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            results = run_benchmarks(datasets, options["stages"])
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "results": results,
+        }
+
+        for result in results:
+            self.stdout.write(
+                f"{result['stage']:<16} rows={result['rows']:<9} "
+                f"rows/s={result['rows_per_sec']} "
+                f"rss={result['peak_rss_mb']}MB "
+                f"queries/10k={result['queries_per_10k_rows']}"
+            )
+
+        if options["output"]:
+            options["output"].write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["baseline"]:
+            baseline = json.loads(options["baseline"].read_text())
+            changes = compare(results, baseline["results"])
+            for change in changes:
+                self.stdout.write(
+                    f"{change['stage']:<16} rows={change['rows']:<9} "
+                    f"{change['change']:+.1%} vs baseline"
+                )
+
+            limit = options["max_regression"]
+            if limit is not None:
+                slower = [c for c in changes if c["change"] < -limit]
+                if slower:
+                    raise CommandError(
+                        f"{len(slower)} benchmark(s) regressed by more than {limit:.0%}"
+                    )
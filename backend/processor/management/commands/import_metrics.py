@@ -0,0 +1,28 @@
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from processor import metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Switch import timers and metrics on or off for every worker at runtime. "
+        "'default' falls back to IMPORT_METRICS_ENABLED."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("state", choices=["on", "off", "default", "status"])
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        state = options["state"]
+        if state != "status":
+            value = {"on": True, "off": False, "default": None}[state]
+            if not metrics.set_enabled(value):
+                raise CommandError("Redis is not reachable; the switch was not set.")
+
+        self.stdout.write(
+            f"Import metrics: {'on' if metrics.enabled() else 'off'} "
+            f"(IMPORT_METRICS_ENABLED={settings.IMPORT_METRICS_ENABLED})"
+        )
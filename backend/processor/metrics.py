@@ -0,0 +1,251 @@
+import io
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from typing import IO, Any, cast
+
+import redis
+from django.conf import settings
+from loguru import logger
+
+from .progress import progress_channel
+
+KEY_PREFIX = "import-metrics:"
+ENABLED_KEY = f"{KEY_PREFIX}enabled"
+
+STAGES = ("read", "parse", "validate", "process", "write", "progress")
+
+
+class Histogram:
+    """
+    Prometheus histogram aggregated in-process and pushed to Redis in one
+    round trip, so every worker contributes to the same series and ``/metrics``
+    can be served by any web process.
+    """
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.pending: Counter[str] = Counter()
+        self.pending_sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for bound in self.buckets:
+            if value <= bound:
+                self.pending[_format(bound)] += 1
+                break
+        else:
+            self.pending["+Inf"] += 1
+        self.pending["count"] += 1
+        self.pending_sum += value
+
+    def key(self) -> str:
+        return f"{KEY_PREFIX}{self.name}"
+
+    def render(self, data: dict[str, str]) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound in (*map(_format, self.buckets), "+Inf"):
+            cumulative += int(data.get(bound, 0))
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {float(data.get('sum', 0))}")
+        lines.append(f"{self.name}_count {int(data.get('count', 0))}")
+        return lines
+
+
+class StageCounter:
+    """Seconds spent per ``CSVProcessor`` stage, summed over every job."""
+
+    name = "import_stage_seconds_total"
+    help = "Time spent in each import stage."
+
+    def __init__(self) -> None:
+        self.pending: Counter[str] = Counter()
+
+    def add(self, timings: dict[str, float]) -> None:
+        self.pending.update(timings)
+
+    def key(self) -> str:
+        return f"{KEY_PREFIX}{self.name}"
+
+    def render(self, data: dict[str, str]) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for stage in STAGES:
+            lines.append(f'{self.name}{{stage="{stage}"}} {float(data.get(stage, 0))}')
+        return lines
+
+
+def _format(bound: float) -> str:
+    return f"{bound:g}"
+
+
+ROWS_PER_SECOND = Histogram(
+    "import_rows_per_second",
+    "Rows processed per second, per job.",
+    (100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000),
+)
+JOB_DURATION = Histogram(
+    "import_job_duration_seconds",
+    "Time from PROCESSING to completion, per job.",
+    (1, 5, 15, 30, 60, 300, 900, 1800, 3600, 10800),
+)
+QUEUE_WAIT = Histogram(
+    "import_queue_wait_seconds",
+    "Time from job creation to PROCESSING.",
+    (0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600),
+)
+DB_WRITE = Histogram(
+    "import_db_write_seconds",
+    "Latency of one batched database write.",
+    (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+HISTOGRAMS = (ROWS_PER_SECOND, JOB_DURATION, QUEUE_WAIT, DB_WRITE)
+STAGE_SECONDS = StageCounter()
+
+
+def enabled() -> bool:
+    """Runtime switch: the Redis flag wins over ``IMPORT_METRICS_ENABLED``."""
+    client = progress_channel.client
+    if client is not None:
+        try:
+            flag = client.get(ENABLED_KEY)
+        except redis.RedisError:
+            flag = None
+        if flag is not None:
+            return flag == "1"
+    return settings.IMPORT_METRICS_ENABLED
+
+
+def set_enabled(value: bool | None) -> bool:
+    """Set the runtime switch; ``None`` falls back to the setting."""
+    client = progress_channel.client
+    if client is None:
+        return False
+    try:
+        if value is None:
+            client.delete(ENABLED_KEY)
+        else:
+            client.set(ENABLED_KEY, "1" if value else "0")
+    except redis.RedisError as exc:
+        logger.warning(f"Metrics switch failed: {exc}")
+        return False
+    return True
+
+
+def push() -> None:
+    """Send everything observed in this process since the last push."""
+    client = progress_channel.client
+    if client is None:
+        return
+    if not STAGE_SECONDS.pending and not any(h.pending for h in HISTOGRAMS):
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for histogram in HISTOGRAMS:
+            for field, count in histogram.pending.items():
+                pipe.hincrby(histogram.key(), field, count)
+            if histogram.pending_sum:
+                pipe.hincrbyfloat(histogram.key(), "sum", histogram.pending_sum)
+        for stage, seconds in STAGE_SECONDS.pending.items():
+            pipe.hincrbyfloat(STAGE_SECONDS.key(), stage, seconds)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning(f"Metrics push failed: {exc}")
+        return
+
+    for histogram in HISTOGRAMS:
+        histogram.pending.clear()
+        histogram.pending_sum = 0.0
+    STAGE_SECONDS.pending.clear()
+
+
+def render() -> str:
+    client = progress_channel.client
+    series: list[Any] = [*HISTOGRAMS, STAGE_SECONDS]
+    data: list[dict[str, str]] = [{} for _ in series]
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for metric in series:
+                pipe.hgetall(metric.key())
+            data = pipe.execute()
+        except redis.RedisError as exc:
+            logger.warning(f"Metrics read failed: {exc}")
+
+    lines: list[str] = []
+    for metric, values in zip(series, data):
+        lines.extend(metric.render(values))
+    return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Wall time per ``CSVProcessor`` stage. Stages are timed per block of rows,
+    not per row, and nested stages are exclusive: time spent in an inner stage
+    is not counted again in the outer one. A disabled timer hands out a shared
+    no-op context.
+    """
+
+    NULL = nullcontext()
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.totals: defaultdict[str, float] = defaultdict(float)
+        self.stack: list[float] = []
+
+    def stage(self, name: str) -> Any:
+        if not self.enabled:
+            return self.NULL
+        return self._time(name)
+
+    @contextmanager
+    def _time(self, name: str) -> Iterator[None]:
+        self.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            inner = self.stack.pop()
+            self.totals[name] += elapsed - inner
+            if self.stack:
+                self.stack[-1] += elapsed
+            if name == "write":
+                DB_WRITE.observe(elapsed)
+
+    def wrap(self, raw: IO[bytes]) -> IO[bytes]:
+        """Time the file reads under ``raw`` as the ``read`` stage."""
+        if not self.enabled:
+            return raw
+        return io.BufferedReader(TimedRawIO(raw, self), buffer_size=1024 * 1024)
+
+    def as_dict(self) -> dict[str, float]:
+        return {stage: round(self.totals[stage], 6) for stage in STAGES}
+
+
+class TimedRawIO(io.RawIOBase):
+    """Raw reads of the stored file, each one timed. Reads come in 1 MiB blocks."""
+
+    def __init__(self, raw: IO[bytes], timer: StageTimer):
+        self.raw = raw
+        self.timer = timer
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        # The stored file is a Django File, which passes readinto on to the
+        # open binary file; IO[bytes] does not declare it.
+        with self.timer.stage("read"):
+            return cast(io.BufferedIOBase, self.raw).readinto(buffer)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.raw.tell()
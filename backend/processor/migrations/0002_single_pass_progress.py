@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="bytes_processed",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="file_size",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="total_rows_estimated",
+            field=models.BooleanField(default=False),
+        ),
+    ]
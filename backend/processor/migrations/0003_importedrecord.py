@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0002_single_pass_progress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportedRecord",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("record_id", models.BigIntegerField()),
+                ("name", models.TextField()),
+                ("email", models.TextField()),
+                ("amount", models.FloatField()),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="records",
+                        to="processor.importjob",
+                    ),
+                ),
+            ],
+        ),
+    ]
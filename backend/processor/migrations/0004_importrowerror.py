@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0003_importedrecord"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="error_counts",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name="ImportRowError",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("chunk", models.SmallIntegerField(default=0)),
+                ("row_number", models.BigIntegerField()),
+                ("column", models.CharField(blank=True, default="", max_length=64)),
+                ("code", models.CharField(max_length=32)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="row_errors",
+                        to="processor.importjob",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["job", "row_number"],
+                        name="processor_i_job_id_b6068a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
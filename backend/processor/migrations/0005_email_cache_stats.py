@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0004_importrowerror"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="email_cache_stats",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
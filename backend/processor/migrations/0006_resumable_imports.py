@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0005_email_cache_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="checkpoint",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="importedrecord",
+            name="chunk",
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="importedrecord",
+            name="row_number",
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+    ]
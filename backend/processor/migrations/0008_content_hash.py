@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0007_importupload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="sha256",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="importupload",
+            name="reprocess",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name="importupload",
+            name="job",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="uploads",
+                to="processor.importjob",
+            ),
+        ),
+    ]
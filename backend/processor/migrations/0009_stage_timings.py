@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0008_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="timings",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0009_stage_timings"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="importjob",
+            index=models.Index(
+                fields=["created_at", "id"], name="processor_i_created_74cf22_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="importjob",
+            index=models.Index(
+                fields=["status", "created_at", "id"],
+                name="processor_i_status_848ef3_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0010_importjob_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportSchema",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=64)),
+                ("version", models.PositiveIntegerField(default=1)),
+                ("columns", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("name", "version"), name="unique_import_schema_version"
+                    )
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="schema",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="processor.importschema",
+            ),
+        ),
+        migrations.AddField(
+            model_name="importupload",
+            name="schema",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="processor.importschema",
+            ),
+        ),
+    ]
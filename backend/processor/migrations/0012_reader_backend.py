@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0011_import_schema"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="reader",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+        migrations.AddField(
+            model_name="importupload",
+            name="reader",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0012_reader_backend"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="client",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="dispatched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="lane",
+            field=models.CharField(blank=True, default="", max_length=8),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="queue_wait",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="importupload",
+            name="client",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name="importjob",
+            index=models.Index(
+                fields=["lane", "status", "created_at"],
+                name="processor_i_lane_8fd49d_idx",
+            ),
+        ),
+    ]
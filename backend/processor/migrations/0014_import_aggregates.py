@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0013_queue_lanes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importschema",
+            name="aggregates",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="ImportAggregate",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=64)),
+                ("type", models.CharField(max_length=16)),
+                ("column", models.CharField(blank=True, default="", max_length=64)),
+                ("group_by", models.CharField(blank=True, default="", max_length=64)),
+                ("value", models.JSONField(null=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="aggregates",
+                        to="processor.importjob",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("job", "name"), name="unique_import_aggregate_name"
+                    )
+                ],
+            },
+        ),
+    ]
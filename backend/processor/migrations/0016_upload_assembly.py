@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0015_import_cancel"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importupload",
+            name="error",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AlterField(
+            model_name="importupload",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("open", "Open"),
+                    ("assembling", "Assembling"),
+                    ("completed", "Completed"),
+                ],
+                default="open",
+                max_length=20,
+            ),
+        ),
+    ]
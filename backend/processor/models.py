@@ -1,28 +1,223 @@
 import uuid
 
+from django.core.exceptions import ValidationError
 from django.db import models
 
+from .aggregates import parse_aggregates
+from .schemas import SchemaError, parse_columns
+
 
 class ImportStatus(models.TextChoices):
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ImportSchema(models.Model):
+    """
+    Declared CSV columns for an import. Versions are immutable: changing a
+    schema means adding a row with the next version.
+    """
+
+    name = models.CharField(max_length=64)
+    version = models.PositiveIntegerField(default=1)
+    # [{"name", "type": int|float|str|email, "required", constraints...}]
+    columns = models.JSONField()
+    # [{"name", "type": count|sum|min|max|stats|distinct, "column", "group_by",
+    # "group_key": value|domain, "max_groups"}]; null computes DEFAULT_AGGREGATES.
+    aggregates = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "version"], name="unique_import_schema_version"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} v{self.version}"
+
+    def clean(self) -> None:
+        try:
+            columns = parse_columns(self.columns)
+        except SchemaError as exc:
+            raise ValidationError({"columns": str(exc)})
+        if self.aggregates is not None:
+            try:
+                parse_aggregates(self.aggregates, columns)
+            except SchemaError as exc:
+                raise ValidationError({"aggregates": str(exc)})
 
 
 class ImportJob(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     file = models.FileField(upload_to="imports/")
+    # SHA-256 of the file content; identical uploads reuse a completed job.
+    sha256 = models.CharField(max_length=64, blank=True, default="", db_index=True)
     status = models.CharField(
         max_length=20, choices=ImportStatus.choices, default=ImportStatus.PENDING
     )
+    # None validates against the built-in id,name,email,amount schema.
+    schema = models.ForeignKey(
+        ImportSchema, on_delete=models.PROTECT, null=True, blank=True
+    )
+    # Row reader backend ("csv", "arrow"); blank uses IMPORT_READER.
+    reader = models.CharField(max_length=16, blank=True, default="")
+    # Name of the API client (API_CLIENTS) that uploaded the file.
+    client = models.CharField(max_length=64, blank=True, default="")
+    # Queue lane ("fast", "bulk") chosen from the size and estimated rows.
+    lane = models.CharField(max_length=8, blank=True, default="")
+    # Bulk lane: when the fair scheduler handed the job to Celery.
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    # Seconds from creation to PROCESSING, waiting in the job's lane.
+    queue_wait = models.FloatField(null=True, blank=True)
+    # Set by POST /api/imports/<uuid>/cancel; a running job stops at its next
+    # cancellation check.
+    cancel_requested_at = models.DateTimeField(null=True, blank=True)
 
     total_rows = models.IntegerField(default=0)
+    total_rows_estimated = models.BooleanField(default=False)
     processed_rows = models.IntegerField(default=0)
     success_rows = models.IntegerField(default=0)
     failed_rows = models.IntegerField(default=0)
 
+    file_size = models.BigIntegerField(default=0)
+    bytes_processed = models.BigIntegerField(default=0)
+
     error = models.TextField(blank=True, default="")
+    error_counts = models.JSONField(blank=True, default=dict)
+    email_cache_stats = models.JSONField(blank=True, default=dict)
+    # Seconds per processing stage (read, parse, validate, process, write, progress).
+    timings = models.JSONField(blank=True, default=dict)
+    # Resume point: offset (decompressed, row-aligned; null when the reader
+    # cannot tell), bytes (stored), rows, success, failed, total_sum.
+    # Chunked jobs hold {"chunks": n} once their chunks are dispatched.
+    checkpoint = models.JSONField(blank=True, default=dict)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Keyset pagination of GET /api/imports/, with and without ?status=.
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["status", "created_at", "id"]),
+            # Waiting and running bulk jobs, for the fair scheduler.
+            models.Index(fields=["lane", "status", "created_at"]),
+        ]
+
+
+class ImportedRecord(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name="records")
+
+    # Chunked imports number rows within their chunk.
+    chunk = models.SmallIntegerField(default=0)
+    row_number = models.BigIntegerField()
+    record_id = models.BigIntegerField()
+    name = models.TextField()
+    email = models.TextField()
+    amount = models.FloatField()
+
+
+class ImportAggregate(models.Model):
+    """Final value of one aggregate of a completed job."""
+
+    id = models.BigAutoField(primary_key=True)
+    job = models.ForeignKey(
+        ImportJob, on_delete=models.CASCADE, related_name="aggregates"
+    )
+    name = models.CharField(max_length=64)
+    type = models.CharField(max_length=16)
+    column = models.CharField(max_length=64, blank=True, default="")
+    group_by = models.CharField(max_length=64, blank=True, default="")
+    # A number, a stats object, or {group: value} for grouped aggregates.
+    value = models.JSONField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "name"], name="unique_import_aggregate_name"
+            )
+        ]
+
+
+class ImportRowError(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    job = models.ForeignKey(
+        ImportJob, on_delete=models.CASCADE, related_name="row_errors", db_index=False
+    )
+
+    # Chunked imports number rows per chunk; the merge step makes them global.
+    chunk = models.SmallIntegerField(default=0)
+    row_number = models.BigIntegerField()
+    column = models.CharField(max_length=64, blank=True, default="")
+    code = models.CharField(max_length=32)
+
+    class Meta:
+        indexes = [models.Index(fields=["job", "row_number"])]
+
+
+class UploadStatus(models.TextChoices):
+    OPEN = "open"
+    ASSEMBLING = "assembling"
+    COMPLETED = "completed"
+
+
+class ImportUpload(models.Model):
+    """A resumable upload session; its chunks become an ``ImportJob`` file."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.BigIntegerField()
+    # Expected digest when the client sends one; the computed digest once completed.
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    reprocess = models.BooleanField(default=False)
+    schema = models.ForeignKey(
+        ImportSchema, on_delete=models.PROTECT, null=True, blank=True
+    )
+    reader = models.CharField(max_length=16, blank=True, default="")
+    client = models.CharField(max_length=64, blank=True, default="")
+    status = models.CharField(
+        max_length=20, choices=UploadStatus.choices, default=UploadStatus.OPEN
+    )
+    # Why the last assembly failed; the upload is open again for new parts.
+    error = models.TextField(blank=True, default="")
+    # Several uploads of the same content can share one completed job.
+    job = models.ForeignKey(
+        ImportJob,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="uploads",
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def total_chunks(self) -> int:
+        return -(-self.size // self.chunk_size)
+
+
+class ImportUploadChunk(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    upload = models.ForeignKey(
+        ImportUpload, on_delete=models.CASCADE, related_name="chunks"
+    )
+
+    index = models.IntegerField()
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["upload", "index"], name="unique_upload_chunk"
+            )
+        ]
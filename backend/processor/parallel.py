@@ -0,0 +1,132 @@
+import csv
+import io
+import multiprocessing
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, Any
+
+from .schemas import STORED_COLUMNS, ColumnSpec, CompiledSchema, compiled_for
+from .validators import email_cache
+
+# Blocks in flight per pool process: one being validated, one queued.
+IN_FLIGHT_PER_WORKER = 2
+
+_pool: ProcessPoolExecutor | None = None
+_pool_size = 0
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    The validation pool of this worker process, started on first use and
+    reused by every later import. ``forkserver`` children do not inherit the
+    worker's database connections or broker sockets.
+    """
+    global _pool, _pool_size
+    if _pool is None or _pool_size != workers:
+        shutdown()
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+        )
+        _pool_size = workers
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def split_rows(
+    raw: IO[bytes], offset: int, block_size: int
+) -> Iterator[tuple[bytes, int]]:
+    """
+    Cut ``raw`` into blocks of whole rows of about ``block_size`` bytes and
+    yield each with the offset just past it. Every block starts on a row
+    boundary, so a newline ends a row exactly when the quotes before it in
+    the block are balanced; no line is parsed here.
+    """
+    carry = b""
+    while True:
+        data = raw.read(block_size)
+        if not data:
+            if carry:
+                yield carry, offset + len(carry)
+            return
+
+        buffer = carry + data
+        cut = buffer.rfind(b"\n")
+        while cut != -1 and buffer.count(b'"', 0, cut) % 2:
+            cut = buffer.rfind(b"\n", 0, cut)
+        if cut == -1:
+            carry = buffer
+            continue
+
+        block, carry = buffer[: cut + 1], buffer[cut + 1 :]
+        offset += len(block)
+        yield block, offset
+
+
+def validate_block(
+    key: tuple[str, int] | None,
+    columns: tuple[ColumnSpec, ...],
+    fieldnames: list[str],
+    data: bytes,
+    keep: tuple[str, ...] = tuple(STORED_COLUMNS),
+) -> dict[str, Any]:
+    """
+    Runs in a pool process: parse and validate one block. Only what the
+    parent needs comes back: the ``keep`` columns (stored and aggregated),
+    the valid row indexes and the failures as ``(index, column, message)``.
+    """
+    validator = compiled_for(key, columns).bind(fieldnames)
+    rows = list(filter(None, csv.reader(io.StringIO(data.decode("utf-8")))))
+
+    before = email_cache.stats()
+    parsed, errors = validator.validate_rows(rows)
+    after = email_cache.stats()
+
+    return {
+        "rows": len(rows),
+        "columns": {name: parsed[name] for name in keep},
+        "valid": [i for i, error in enumerate(errors) if error is None],
+        "failures": [(i, *error) for i, error in enumerate(errors) if error],
+        "email_cache_stats": {stat: after[stat] - before[stat] for stat in after},
+    }
+
+
+def validate_blocks(
+    schema: CompiledSchema,
+    fieldnames: list[str],
+    blocks: Iterator[tuple[bytes, int]],
+    workers: int,
+    keep: tuple[str, ...] = tuple(STORED_COLUMNS),
+) -> Iterator[tuple[dict[str, Any], int]]:
+    """
+    Validate blocks in the pool and yield ``(result, end offset)`` in file
+    order. Reading stays a bounded window ahead of the slowest block.
+    """
+    pool = get_pool(workers)
+    window: deque[tuple[Future, int]] = deque()
+    try:
+        for data, end in blocks:
+            future = pool.submit(
+                validate_block, schema.key, schema.columns, fieldnames, data, keep
+            )
+            window.append((future, end))
+            if len(window) >= workers * IN_FLIGHT_PER_WORKER:
+                future, end = window.popleft()
+                yield future.result(), end
+        while window:
+            future, end = window.popleft()
+            yield future.result(), end
+    except BrokenProcessPool:
+        # A pool process died; the next import starts a fresh pool.
+        shutdown()
+        raise
+    finally:
+        for future, _ in window:
+            future.cancel()
@@ -7,11 +7,16 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.request import Request
 from rest_framework.views import APIView
 
+# Client name of requests made with API_KEY.
+DEFAULT_CLIENT = "default"
+
 
 class HasImportApiKey(BasePermission):
     """
     Very simple API-key guard.
     Client must send header: X-API-Key: <key>
+    The key's client name (API_CLIENTS) is set as ``request.auth``; read it
+    with ``api_client``.
     """
 
     header_name = "HTTP_X_API_KEY"
@@ -19,8 +24,13 @@ class HasImportApiKey(BasePermission):
     def has_permission(self, request: Request, view: APIView) -> bool:
         if request.method in ("OPTIONS", "HEAD"):
             return True
+        clients = {
+            key: name for name, key in getattr(settings, "API_CLIENTS", {}).items()
+        }
         expected = getattr(settings, "API_KEY", "") or ""
-        if not expected:
+        if expected:
+            clients[expected] = DEFAULT_CLIENT
+        if not clients:
             logger.error("API_KEY is not configured on the server.")
             raise PermissionDenied("Server API key is not configured")
 
@@ -28,6 +38,13 @@ class HasImportApiKey(BasePermission):
         if not provided:
             raise PermissionDenied("Missing API key")
 
-        if provided != expected:
+        client = clients.get(provided)
+        if client is None:
             raise PermissionDenied("Invalid API key")
+        request.auth = client
         return True
+
+
+def api_client(request: Request) -> str:
+    """Client name of the API key that passed ``HasImportApiKey``."""
+    return request.auth if isinstance(request.auth, str) else DEFAULT_CLIENT
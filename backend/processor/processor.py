@@ -1,96 +1,823 @@
-import csv
-import io
-from typing import Any
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable
+from itertools import batched
+from typing import IO, Any
 
 from loguru import logger
 
-from .validators import CSVHeaderValidator, CSVRowValidator
+from .aggregates import Aggregates
+from .chunking import split_byte_ranges
+from .compression import compression_for, open_decompressed
+from .duplicates import DUPLICATE_ID, open_id_set
+from . import metrics, parallel
+from .metrics import StageTimer
+from .progress import ProgressThrottle, progress_channel
+from .readers import Block, local_path, open_reader, resolve_reader
+from .schemas import STORED_COLUMNS, BoundSchema, compile_schema
+from .services import ImportService
+from .validators import email_cache, error_code
+from .writers import ImportedRecordWriter, ImportRowErrorWriter
 
-from .models import ImportJob, ImportStatus
+from .models import (
+    ImportAggregate,
+    ImportJob,
+    ImportStatus,
+    ImportedRecord,
+    ImportRowError,
+)
 
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Count, F
 from django.utils import timezone
 
+ProgressCallback = Callable[[int, int, int], None]
+# processed, success, failed, offset just past the last processed row
+OffsetProgressCallback = Callable[[int, int, int, int], None]
+
+# A chord callback for a job in one of these has already run.
+FINISHED_STATUSES = (
+    ImportStatus.COMPLETED,
+    ImportStatus.CANCELLED,
+    ImportStatus.FAILED,
+)
+
+PROGRESS_FIELDS = ("processed_rows", "success_rows", "failed_rows", "bytes_processed")
+
+# Ids looked up per query when rebuilding or reconciling the duplicate id check.
+ID_BATCH_SIZE = 10_000
+# Rows between cancellation checks, when IMPORT_CANCEL_CHECK_INTERVAL has not
+# elapsed first.
+CANCEL_CHECK_ROWS = 100_000
+
+
+class ImportCancelled(Exception):
+    """Raised at a block boundary once a cancel request is seen."""
+
+    def __init__(self, processed: int, success: int, failed: int):
+        super().__init__(f"Import cancelled after {processed} rows")
+        self.processed = processed
+        self.success = success
+        self.failed = failed
+
 
 class CSVProcessor:
-    BATCH_SIZE = 50
+    VALIDATION_BLOCK_SIZE = 500
 
     def __init__(self, job: ImportJob):
         self.job = job
+        self.schema = compile_schema(job.schema)
+        self.reader = resolve_reader(job.reader)
 
         self.total_sum = 0.0
+        self.aggregates = Aggregates.for_schema(job.schema, self.schema.columns)
+        # Ids of the stored rows; None when the duplicate check is off.
+        self.ids = open_id_set()
+        self.file_size = 0
+        self.timer = StageTimer(metrics.enabled())
+        self.records = ImportedRecordWriter(
+            job.id, settings.IMPORT_RECORD_BATCH_SIZE, timer=self.timer
+        )
+        self.errors = ImportRowErrorWriter(
+            job.id, settings.IMPORT_ERROR_BATCH_SIZE, timer=self.timer
+        )
+        self.error_counts: Counter[str] = Counter()
+        self.logged_errors = 0
+        self.email_stats_start = email_cache.stats()
+        # Lookups made by validation pool processes, which have their own cache.
+        self.pool_email_stats: Counter[str] = Counter()
 
-    def run(self) -> float:
-        ImportJob.objects.filter(id=self.job.id).update(
-            status=ImportStatus.PROCESSING,
-            processed_rows=0,
-            success_rows=0,
-            failed_rows=0,
-            error="",
-            updated_at=timezone.now(),
+        # Live counters go to Redis; the job row is only written at start,
+        # at checkpoints and at finish.
+        self.live = ProgressThrottle(
+            settings.IMPORT_PROGRESS_INTERVAL, settings.IMPORT_PROGRESS_ROWS
+        )
+        self.checkpoint = ProgressThrottle(
+            settings.IMPORT_CHECKPOINT_INTERVAL, settings.IMPORT_CHECKPOINT_ROWS
+        )
+        self.cancel_check = ProgressThrottle(
+            settings.IMPORT_CANCEL_CHECK_INTERVAL, CANCEL_CHECK_ROWS
         )
 
+    def run(self) -> float:
+        self.file_size = self.job.file.size or 0
+
+        # A job still marked as processing was interrupted (worker crash or
+        # redelivery); continue from its last checkpoint instead of byte 0.
+        checkpoint: dict[str, Any] = {}
+        if self.job.status == ImportStatus.PROCESSING:
+            checkpoint = self.job.checkpoint or {}
+        if checkpoint:
+            self.resume(checkpoint)
+        else:
+            self.start()
+
+        compression = compression_for(self.job.file.name)
         with self.job.file.open("rb") as bf:
-            with io.TextIOWrapper(bf, encoding="utf-8", newline="") as tf:
-                r = csv.DictReader(tf)
-                total_rows = max(0, sum(1 for _ in r))
-                CSVHeaderValidator.validate_header(r.fieldnames)
+            # Compressed files are decompressed as a stream. Checkpoints keep
+            # the decompressed offset; progress counts compressed bytes read.
+            raw = open_decompressed(self.timer.wrap(bf), compression)
+            reader = open_reader(
+                self.reader,
+                raw,
+                self.VALIDATION_BLOCK_SIZE,
+                path=None if compression else local_path(self.job.file),
+            )
+            fieldnames = reader.read_header()
+            validator = self.schema.bind(fieldnames)
+            if checkpoint:
+                reader.skip(checkpoint.get("offset"), checkpoint["rows"])
+            counters = {
+                "processed": checkpoint.get("rows", 0),
+                "success": checkpoint.get("success", 0),
+                "failed": checkpoint.get("failed", 0),
+            }
+
+            def position() -> int:
+                offset = reader.offset
+                return bf.tell() if compression or offset is None else offset
+
+            # The pool cuts blocks at row-aligned offsets, so it pairs with
+            # the csv backend only.
+            workers = settings.IMPORT_POOL_WORKERS
+            try:
+                # A redelivered job may have been cancelled while it waited.
+                if self.cancel_requested():
+                    raise ImportCancelled(**counters)
+                if workers > 0 and reader.offset is not None:
+                    processed, success, failed = self.process_parallel(
+                        raw,
+                        fieldnames or [],
+                        reader.offset,
+                        workers,
+                        lambda p, s, f, offset: self.update_progress(
+                            p, s, f, bf.tell() if compression else offset, offset
+                        ),
+                        **counters,
+                    )
+                else:
+                    processed, success, failed = self.process_rows(
+                        reader.blocks(validator),
+                        validator,
+                        lambda p, s, f: self.update_progress(
+                            p, s, f, position(), reader.offset
+                        ),
+                        **counters,
+                    )
+            except ImportCancelled as stop:
+                self.records.flush()
+                self.errors.flush()
+                self.cancel(stop.processed, stop.success, stop.failed)
+                raise
+
+        self.records.flush()
+        self.errors.flush()
+        self.finish(processed, success, failed)
+        return self.total_sum
+
+    def plan_chunks(
+        self, chunk_size: int, max_chunks: int
+    ) -> tuple[list[str], list[tuple[int, int]]]:
+        with self.job.file.open("rb") as bf:
+            fieldnames, ranges = split_byte_ranges(
+                bf, self.job.file.size or 0, chunk_size, max_chunks
+            )
+        self.schema.bind(fieldnames)
+        return fieldnames or [], ranges
+
+    def run_chunk(
+        self, index: int, start: int, end: int, fieldnames: list[str]
+    ) -> dict[str, Any]:
+        """
+        Process the rows in the byte range ``[start, end)`` and add this
+        chunk's progress to the job counters. The caller merges the returned
+        totals once every chunk is done. A cancelled chunk returns what it
+        processed so far, with ``cancelled`` set.
+        """
+        self.records.chunk = self.errors.chunk = index
+        published = dict.fromkeys(PROGRESS_FIELDS, 0)
+        saved = dict.fromkeys(PROGRESS_FIELDS, 0)
+
+        # A redelivered chunk starts over; drop what the earlier attempt stored.
+        ImportedRecord.objects.filter(job_id=self.job.id, chunk=index).delete()
+        ImportRowError.objects.filter(job_id=self.job.id, chunk=index).delete()
+
+        with self.job.file.open("rb") as bf:
+            reader = open_reader(
+                self.reader,
+                self.timer.wrap(bf),
+                self.VALIDATION_BLOCK_SIZE,
+                start,
+                end,
+                fieldnames,
+                path=local_path(self.job.file),
+            )
+            validator = self.schema.bind(fieldnames)
+
+            def report(
+                processed: int, success: int, failed: int, force: bool = False
+            ) -> None:
+                offset = reader.offset
+                position = min(bf.tell(), end) if offset is None else offset
+                current = (processed, success, failed, position - start)
+                self.report_chunk_progress(current, published, saved, force)
+
+            cancelled = False
+            try:
+                if self.cancel_requested():
+                    raise ImportCancelled(0, 0, 0)
+                processed, success, failed = self.process_rows(
+                    reader.blocks(validator), validator, report
+                )
+            except ImportCancelled as stop:
+                processed, success, failed = stop.processed, stop.success, stop.failed
+                cancelled = True
+            self.records.flush()
+            self.errors.flush()
+            report(processed, success, failed, force=True)
+
+        # Database write latencies seen by this worker; the job-level metrics
+        # are recorded once every chunk is merged.
+        metrics.push()
+
+        return {
+            "index": index,
+            "start": start,
+            "end": end,
+            "cancelled": cancelled,
+            "processed": processed,
+            "success": success,
+            "failed": failed,
+            "total_sum": self.total_sum,
+            "aggregates": self.aggregates.state(),
+            "error_counts": dict(self.error_counts),
+            "email_cache_stats": self.email_cache_stats(),
+            "timings": self.timer.as_dict(),
+        }
+
+    def process_rows(
+        self,
+        blocks: Iterable[Block],
+        validator: BoundSchema,
+        on_batch: ProgressCallback,
+        processed: int = 0,
+        success: int = 0,
+        failed: int = 0,
+    ) -> tuple[int, int, int]:
+        # Stages are timed per block; "parse" includes the reader backend
+        # pulling lines, minus the raw file reads counted as "read".
+        timer = self.timer
+        pending = iter(blocks)
+        while True:
+            with timer.stage("parse"):
+                block = next(pending, None)
+            if block is None:
+                break
+
+            size, values = block
+            with timer.stage("validate"):
+                columns, errors = validator.validate_columns(values, size)
+            valid = [i for i, error in enumerate(errors) if error is None]
+            failures = []
+            if len(valid) < size:
+                failures = [(i, *error) for i, error in enumerate(errors) if error]
+
+            stored = self.apply_block(columns, valid, failures, processed, size)
+            success += stored
+            failed += size - stored
+            processed += size
+            with timer.stage("progress"):
+                on_batch(processed, success, failed)
+            self.check_cancel(processed, success, failed)
+
+        return processed, success, failed
+
+    def process_parallel(
+        self,
+        raw: IO[bytes],
+        fieldnames: list[str],
+        offset: int,
+        workers: int,
+        on_batch: OffsetProgressCallback,
+        processed: int = 0,
+        success: int = 0,
+        failed: int = 0,
+    ) -> tuple[int, int, int]:
+        """
+        ``process_rows`` with parsing and validation in the worker's process
+        pool: this process only cuts the file into row-aligned blocks, then
+        stores the results in file order.
+        """
+        timer = self.timer
+        raw.seek(offset)
+        blocks = parallel.split_rows(raw, offset, settings.IMPORT_POOL_BLOCK_SIZE)
+        keep = tuple(STORED_COLUMNS.keys() | set(self.aggregates.columns))
+        results = parallel.validate_blocks(
+            self.schema, fieldnames, blocks, workers, keep
+        )
+        while True:
+            # Reading and cutting blocks is counted here too; the pool
+            # usually has the next result ready.
+            with timer.stage("validate"):
+                item = next(results, None)
+            if item is None:
+                break
+
+            result, end = item
+            size = result["rows"]
+            self.pool_email_stats.update(result["email_cache_stats"])
+            stored = self.apply_block(
+                result["columns"], result["valid"], result["failures"], processed, size
+            )
+            success += stored
+            failed += size - stored
+            processed += size
+            with timer.stage("progress"):
+                on_batch(processed, success, failed, end)
+            self.check_cancel(processed, success, failed)
+
+        return processed, success, failed
+
+    def apply_block(
+        self,
+        columns: dict[str, list[Any]],
+        valid: list[int],
+        failures: list[tuple[int, str, str]],
+        first_row: int,
+        size: int,
+    ) -> int:
+        """Store one validated block; returns how many rows were stored."""
+        if self.ids is not None and valid:
+            ids = columns["id"]
+            with self.timer.stage("validate"):
+                repeated = self.ids.add([ids[i] for i in valid])
+            if repeated:
+                duplicates = {valid[k] for k in repeated}
+                valid = [i for i in valid if i not in duplicates]
+                id_column = self.schema.sources["id"]
+                failures = sorted(
+                    [*failures, *((i, id_column, DUPLICATE_ID) for i in duplicates)]
+                )
+
+        for i, column, message in failures:
+            self.record_error(first_row + i + 1, column, message)
+
+        try:
+            with self.timer.stage("process"):
+                self.process_block(columns, valid, first_row)
+            return len(valid)
+        except DatabaseError:
+            raise
+        except Exception as exc:
+            logger.exception(
+                f"Block failed: job={self.job.id} rows={first_row + 1}-{first_row + size} error={str(exc)}"
+            )
+            for i in valid:
+                self.errors.add(first_row + i + 1, "", "row_error")
+            self.error_counts["row_error"] += len(valid)
+            return 0
+
+    def process_block(
+        self, columns: dict[str, list[Any]], valid: list[int], first_row: int
+    ) -> None:
+        self.records.add_block(columns, valid, first_row)
+        self.aggregates.update(columns, valid)
+        # Counted once the block is fully applied, so a block that fails
+        # part way leaves the total as it was.
+        amounts = columns["amount"]
+        self.total_sum += sum(amounts[i] for i in valid)
+
+    def check_cancel(self, processed: int, success: int, failed: int) -> None:
+        if self.cancel_check.due(processed) and self.cancel_requested():
+            raise ImportCancelled(processed, success, failed)
+
+    def cancel_requested(self) -> bool:
+        # Redis answers in one round trip; the job row is the fallback.
+        requested = progress_channel.cancel_requested(self.job.id)
+        if requested is None:
+            requested = ImportJob.objects.filter(
+                id=self.job.id, cancel_requested_at__isnull=False
+            ).exists()
+        return requested
+
+    def record_error(self, row_number: int, column: str, message: str) -> None:
+        code = error_code(column, message)
+        self.errors.add(row_number, column, code)
+        self.error_counts[code] += 1
+
+        if self.logged_errors < settings.IMPORT_ERROR_LOG_SAMPLE:
+            self.logged_errors += 1
+            logger.error(
+                f"Row failed validation: job={self.job.id} row={row_number} column={column} error={message}"
+            )
+
+    def email_cache_stats(self) -> dict[str, int]:
+        # The cache is shared by every job in this worker; report only the
+        # lookups made since this processor was created.
+        now = email_cache.stats()
+        return {
+            key: now[key] - self.email_stats_start[key] + self.pool_email_stats[key]
+            for key in now
+        }
+
+    def start(self, file_size: int | None = None) -> None:
+        if file_size is not None:
+            self.file_size = file_size
+
+        now = timezone.now()
+        self.job.started_at = now
+        # A restart keeps the wait of the first attempt.
+        if self.job.queue_wait is None:
+            self.job.queue_wait = (now - self.job.created_at).total_seconds()
+            if self.timer.enabled:
+                metrics.QUEUE_WAIT.observe(self.job.queue_wait)
+
+        # A cancel that came after the task read the job is not overwritten:
+        # a cancelled job, or one with a cancel request, does not start.
+        started = (
+            ImportJob.objects.filter(id=self.job.id, cancel_requested_at=None)
+            .exclude(status=ImportStatus.CANCELLED)
+            .update(
+                status=ImportStatus.PROCESSING,
+                # Upload-time estimate until the first progress update.
+                total_rows=self.job.total_rows if self.job.total_rows_estimated else 0,
+                total_rows_estimated=True,
+                processed_rows=0,
+                success_rows=0,
+                failed_rows=0,
+                file_size=self.file_size,
+                bytes_processed=0,
+                error="",
+                error_counts={},
+                checkpoint={},
+                timings={},
+                started_at=now,
+                queue_wait=self.job.queue_wait,
+                updated_at=now,
+            )
+        )
+        if not started:
+            ImportJob.objects.filter(id=self.job.id).exclude(
+                status=ImportStatus.CANCELLED
+            ).update(status=ImportStatus.CANCELLED, updated_at=now)
+            if self.ids is not None:
+                self.ids.close()
+            logger.info(f"ImportJob {self.job.id} cancelled before it started")
+            raise ImportCancelled(0, 0, 0)
+
+        progress_channel.clear(self.job.id)
+        ImportService.forget_status(self.job.id)
+
+        # A restarted job starts over, so drop rows stored by earlier attempts.
+        ImportedRecord.objects.filter(job_id=self.job.id).delete()
+        ImportRowError.objects.filter(job_id=self.job.id).delete()
+
+    def resume(self, checkpoint: dict[str, Any]) -> None:
+        rows = checkpoint["rows"]
+        self.total_sum = checkpoint["total_sum"]
+        if "aggregates" in checkpoint:
+            self.aggregates.load(checkpoint["aggregates"])
+        self.error_counts = Counter(self.job.error_counts or {})
+        self.timer.totals.update(self.job.timings or {})
+
+        progress_channel.clear(self.job.id)
+        ImportService.forget_status(self.job.id)
+
+        # Batches flushed after the checkpoint are replayed, so drop them.
+        ImportedRecord.objects.filter(job_id=self.job.id, row_number__gt=rows).delete()
+        ImportRowError.objects.filter(job_id=self.job.id, row_number__gt=rows).delete()
+
+        if self.ids is not None:
+            # The id set is not checkpointed; rebuild it from the rows kept.
+            stored = ImportedRecord.objects.filter(job_id=self.job.id).values_list(
+                "record_id", flat=True
+            )
+            for ids in batched(stored.iterator(ID_BATCH_SIZE), ID_BATCH_SIZE):
+                self.ids.add(ids)
 
         ImportJob.objects.filter(id=self.job.id).update(
-            total_rows=total_rows,
+            processed_rows=rows,
+            success_rows=checkpoint["success"],
+            failed_rows=checkpoint["failed"],
+            bytes_processed=checkpoint.get("bytes", checkpoint.get("offset") or 0),
             updated_at=timezone.now(),
         )
+        logger.info(
+            f"ImportJob {self.job.id} resuming at row {rows} (byte {checkpoint.get('bytes')})"
+        )
 
-        success = failed = processed = 0
+    def estimate_total_rows(self, processed: int, bytes_read: int) -> int:
+        if bytes_read <= 0 or self.file_size <= 0:
+            return processed
+        return max(processed, int(processed * self.file_size / bytes_read))
 
-        with self.job.file.open("rb") as bf:
-            with io.TextIOWrapper(bf, encoding="utf-8", newline="") as tf:
-                reader = csv.DictReader(tf)
-
-                for processed, row in enumerate(reader, start=1):
-                    try:
-                        validated = CSVRowValidator.validate_row(row)
-                        self.process_row(validated)
-                        success += 1
-                    except (ValueError, SyntaxError) as exc:
-                        logger.error(
-                            f"Row failed validation: job={self.job.id} row={row} error={str(exc)}"
-                        )
-                        failed += 1
-                    except Exception as exc:
-                        logger.exception(
-                            f"Row failed: job={self.job.id} row={processed} error={str(exc)}"
-                        )
-                        failed += 1
-
-                    if processed % self.BATCH_SIZE == 0:
-                        self.update_progress(processed, success, failed)
-
-        self.finish(total_rows, success, failed)
-        return self.total_sum
+    def update_progress(
+        self,
+        processed: int,
+        success: int,
+        failed: int,
+        bytes_read: int,
+        offset: int | None = None,
+    ) -> None:
+        counters = {
+            "total_rows": self.estimate_total_rows(processed, bytes_read),
+            "processed_rows": processed,
+            "success_rows": success,
+            "failed_rows": failed,
+            "bytes_processed": min(bytes_read, self.file_size),
+        }
+
+        checkpoint = self.checkpoint.due(processed)
+        if self.live.due(processed) and not progress_channel.publish(
+            self.job.id, counters
+        ):
+            # Without Redis the job row is the only place pollers can look.
+            checkpoint = True
 
-    def process_row(self, row: dict[str, Any]) -> None:
-        if not row:
-            raise ValueError("Invalid row")
+        if checkpoint:
+            # Everything before bytes_read must be stored before the
+            # checkpoint claims it, so a resumed job can skip those rows.
+            # Without a row-aligned offset a resumed job skips ``rows`` instead.
+            self.records.flush()
+            self.errors.flush()
+            with self.timer.stage("write"):
+                ImportJob.objects.filter(id=self.job.id).update(
+                    **counters,
+                    error_counts=dict(self.error_counts),
+                    email_cache_stats=self.email_cache_stats(),
+                    timings=self.timer.as_dict(),
+                    checkpoint={
+                        "offset": offset,
+                        "bytes": bytes_read,
+                        "rows": processed,
+                        "success": success,
+                        "failed": failed,
+                        "total_sum": self.total_sum,
+                        "aggregates": self.aggregates.state(),
+                    },
+                    updated_at=timezone.now(),
+                )
 
-        amount = float(row.get("amount", 0))
-        self.total_sum += amount
+    def report_chunk_progress(
+        self,
+        current: tuple[int, ...],
+        published: dict[str, int],
+        saved: dict[str, int],
+        force: bool = False,
+    ) -> None:
+        counters = dict(zip(PROGRESS_FIELDS, current))
+        processed = counters["processed_rows"]
 
-    def update_progress(self, processed: int, success: int, failed: int) -> None:
+        checkpoint = force or self.checkpoint.due(processed)
+        if force or self.live.due(processed):
+            deltas = {k: counters[k] - published[k] for k in PROGRESS_FIELDS}
+            if progress_channel.increment(self.job.id, deltas):
+                published.update(counters)
+            else:
+                checkpoint = True
+
+        if checkpoint:
+            with self.timer.stage("write"):
+                self.add_progress(*(counters[k] - saved[k] for k in PROGRESS_FIELDS))
+            saved.update(counters)
+
+    def add_progress(
+        self, processed: int, success: int, failed: int, bytes_read: int
+    ) -> None:
+        # Chunks run concurrently, so progress is accumulated in the database
+        # rather than overwritten.
         ImportJob.objects.filter(id=self.job.id).update(
-            processed_rows=processed,
-            success_rows=success,
-            failed_rows=failed,
+            processed_rows=F("processed_rows") + processed,
+            success_rows=F("success_rows") + success,
+            failed_rows=F("failed_rows") + failed,
+            bytes_processed=F("bytes_processed") + bytes_read,
             updated_at=timezone.now(),
         )
 
-    def finish(self, total: int, success: int, failed: int) -> None:
+    def finish_chunks(self, results: list[dict[str, Any]]) -> float | None:
+        """
+        Merge the chunk results and finish the job. The callback may be
+        delivered again, so a job that is already finished is left as it is
+        (None is returned), and the merge runs in one transaction with the
+        job locked.
+        """
+        with transaction.atomic():
+            status = (
+                ImportJob.objects.select_for_update()
+                .filter(id=self.job.id)
+                .values_list("status", flat=True)
+                .first()
+            )
+            if status in FINISHED_STATUSES:
+                logger.info(f"ImportJob {self.job.id} is already {status}")
+                return None
+            cancelled = self.merge_chunks(results)
+        if cancelled is not None:
+            raise cancelled
+        return self.total_sum
+
+    def merge_chunks(self, results: list[dict[str, Any]]) -> ImportCancelled | None:
+        self.file_size = self.job.file_size
+        results = sorted(results, key=lambda r: r["index"])
+        self.total_sum = sum(r["total_sum"] for r in results)
+
+        # Chunk workers number rows from 1; shift each chunk's errors by the
+        # rows of the chunks before it.
+        offset = 0
+        offsets = {}
+        email_stats: Counter[str] = Counter()
+        timings: defaultdict[str, float] = defaultdict(float)
+        for result in results:
+            offsets[result["index"]] = offset
+            if offset:
+                ImportRowError.objects.filter(
+                    job_id=self.job.id, chunk=result["index"]
+                ).update(row_number=F("row_number") + offset)
+            offset += result["processed"]
+            self.error_counts.update(result["error_counts"])
+            self.aggregates.merge(result["aggregates"])
+            email_stats.update(result["email_cache_stats"])
+            for stage, seconds in result.get("timings", {}).items():
+                timings[stage] += seconds
+
+        # Chunk timings add up across workers, so they are CPU-seconds rather
+        # than wall time.
+        self.timer.totals = timings
+        processed = sum(r["processed"] for r in results)
+        success = sum(r["success"] for r in results)
+        failed = sum(r["failed"] for r in results)
+        if any(r.get("cancelled") for r in results):
+            self.cancel(processed, success, failed, email_cache_stats=dict(email_stats))
+            return ImportCancelled(processed, success, failed)
+
+        dropped = self.drop_chunk_duplicates(offsets) if self.ids is not None else {}
+        if dropped:
+            self.reaggregate(results, dropped)
+        count = sum(len(rows) for rows in dropped.values())
+        self.finish(
+            processed,
+            success - count,
+            failed + count,
+            email_cache_stats=dict(email_stats),
+        )
+        return None
+
+    def drop_chunk_duplicates(self, offsets: dict[int, int]) -> dict[int, set[int]]:
+        """
+        Each chunk only checks its own ids. An id stored by several chunks
+        keeps its first row; the later ones are dropped and become
+        duplicate_id errors. Returns the dropped row numbers of each chunk.
+        """
+        repeated = (
+            ImportedRecord.objects.filter(job_id=self.job.id)
+            .values("record_id")
+            .annotate(copies=Count("id"))
+            .filter(copies__gt=1)
+            .values_list("record_id", flat=True)
+        )
+        dropped: dict[int, set[int]] = {}
+        for ids in batched(repeated.iterator(ID_BATCH_SIZE), ID_BATCH_SIZE):
+            records = (
+                ImportedRecord.objects.filter(job_id=self.job.id, record_id__in=ids)
+                .order_by("record_id", "chunk", "row_number")
+                .values_list("id", "record_id", "chunk", "row_number", "amount")
+            )
+            first = None
+            drop = []
+            for pk, record_id, chunk, row_number, amount in records:
+                if record_id != first:
+                    first = record_id
+                    continue
+                drop.append(pk)
+                dropped.setdefault(chunk, set()).add(row_number)
+                self.total_sum -= amount
+                self.errors.chunk = chunk
+                self.record_error(
+                    offsets[chunk] + row_number, self.schema.sources["id"], DUPLICATE_ID
+                )
+            ImportedRecord.objects.filter(id__in=drop).delete()
+        self.errors.flush()
+        return dropped
+
+    def reaggregate(
+        self, results: list[dict[str, Any]], dropped: dict[int, set[int]]
+    ) -> None:
+        """
+        Aggregates cannot take rows back out, so the chunks that lost rows to
+        ``drop_chunk_duplicates`` are aggregated again from their byte range,
+        without those rows. The other chunks keep their merged state.
+        """
+        self.aggregates = Aggregates.for_schema(self.job.schema, self.schema.columns)
+        with self.job.file.open("rb") as bf:
+            fieldnames = open_reader(
+                self.reader, bf, self.VALIDATION_BLOCK_SIZE
+            ).read_header()
+            validator = self.schema.bind(fieldnames)
+            for result in results:
+                skip = dropped.get(result["index"])
+                if not skip:
+                    self.aggregates.merge(result["aggregates"])
+                    continue
+                reader = open_reader(
+                    self.reader,
+                    bf,
+                    self.VALIDATION_BLOCK_SIZE,
+                    result["start"],
+                    result["end"],
+                    fieldnames,
+                    path=local_path(self.job.file),
+                )
+                # The chunk's own duplicate check runs first, as it did when
+                # the chunk was processed; the dropped rows passed it.
+                ids = open_id_set()
+                row = 0
+                for size, values in reader.blocks(validator):
+                    columns, errors = validator.validate_columns(values, size)
+                    valid = [i for i, error in enumerate(errors) if error is None]
+                    if ids is not None and valid:
+                        repeated = ids.add([columns["id"][i] for i in valid])
+                        if repeated:
+                            duplicates = {valid[k] for k in repeated}
+                            valid = [i for i in valid if i not in duplicates]
+                    valid = [i for i in valid if row + i + 1 not in skip]
+                    self.aggregates.update(columns, valid)
+                    row += size
+                if ids is not None:
+                    ids.close()
+
+    def finish(
+        self,
+        total: int,
+        success: int,
+        failed: int,
+        email_cache_stats: dict[str, int] | None = None,
+    ) -> None:
+        if email_cache_stats is None:
+            email_cache_stats = self.email_cache_stats()
+
+        if self.ids is not None:
+            self.ids.close()
+        self.store_aggregates()
+        timings = self.timer.as_dict()
+        finished_at = timezone.now()
         status = ImportStatus.COMPLETED
         ImportJob.objects.filter(id=self.job.id).update(
             status=status,
             total_rows=total,
+            total_rows_estimated=False,
             processed_rows=total,
             success_rows=success,
             failed_rows=failed,
+            bytes_processed=self.file_size,
             error="",
+            error_counts=dict(self.error_counts),
+            email_cache_stats=email_cache_stats,
+            checkpoint={},
+            timings=timings,
+            updated_at=finished_at,
+        )
+        progress_channel.clear(self.job.id)
+
+        if self.timer.enabled and self.job.started_at:
+            duration = (finished_at - self.job.started_at).total_seconds()
+            metrics.JOB_DURATION.observe(duration)
+            if duration > 0:
+                metrics.ROWS_PER_SECOND.observe(total / duration)
+            metrics.STAGE_SECONDS.add(timings)
+            metrics.push()
+
+    def cancel(
+        self,
+        processed: int,
+        success: int,
+        failed: int,
+        email_cache_stats: dict[str, int] | None = None,
+    ) -> None:
+        """Mark the job cancelled; rows stored before the request are kept."""
+        if email_cache_stats is None:
+            email_cache_stats = self.email_cache_stats()
+        if self.ids is not None:
+            self.ids.close()
+
+        ImportJob.objects.filter(id=self.job.id).update(
+            status=ImportStatus.CANCELLED,
+            processed_rows=processed,
+            success_rows=success,
+            failed_rows=failed,
+            error_counts=dict(self.error_counts),
+            email_cache_stats=email_cache_stats,
+            checkpoint={},
+            timings=self.timer.as_dict(),
             updated_at=timezone.now(),
         )
+        progress_channel.clear(self.job.id)
+        logger.info(f"ImportJob {self.job.id} cancelled after {processed} rows")
+
+    def store_aggregates(self) -> None:
+        # Written before the job is marked completed, so a completed job
+        # always has its results.
+        ImportAggregate.objects.filter(job_id=self.job.id).delete()
+        ImportAggregate.objects.bulk_create(
+            ImportAggregate(job_id=self.job.id, **result)
+            for result in self.aggregates.results()
+        )
@@ -0,0 +1,162 @@
+import time
+from collections.abc import Mapping
+from typing import Any
+from uuid import UUID
+
+import redis
+from django.conf import settings
+from loguru import logger
+
+KEY_PREFIX = "import-progress:"
+CANCEL_KEY_PREFIX = "import-cancel:"
+KEY_TTL = 24 * 60 * 60
+
+
+class ProgressChannel:
+    """
+    Live job counters kept in a Redis hash, so running jobs do not have to
+    UPDATE the ``ImportJob`` row on every batch. Every call degrades to a
+    no-op when Redis is unreachable; callers fall back to the database.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client: redis.Redis | None = None
+
+    @property
+    def client(self) -> redis.Redis | None:
+        if self._client is None and self.url:
+            try:
+                self._client = redis.Redis.from_url(
+                    self.url,
+                    decode_responses=True,
+                    socket_timeout=1,
+                    socket_connect_timeout=1,
+                )
+            except ValueError as exc:
+                logger.warning(f"Progress channel disabled: {exc}")
+                self.disable()
+        return self._client
+
+    def disable(self) -> None:
+        self.url = ""
+        self._client = None
+
+    @staticmethod
+    def key(job_id: UUID | str) -> str:
+        return f"{KEY_PREFIX}{job_id}"
+
+    def publish(self, job_id: UUID | str, counters: dict[str, int]) -> bool:
+        return self._execute(job_id, lambda pipe, key: pipe.hset(key, mapping=counters))
+
+    def increment(self, job_id: UUID | str, deltas: dict[str, int]) -> bool:
+        def apply(pipe: Any, key: str) -> None:
+            for field, delta in deltas.items():
+                pipe.hincrby(key, field, delta)
+
+        return self._execute(job_id, apply)
+
+    def read(self, job_id: UUID | str) -> dict[str, int] | None:
+        client = self.client
+        if client is None:
+            return None
+        try:
+            data = client.hgetall(self.key(job_id))
+        except redis.RedisError as exc:
+            logger.warning(f"Progress channel read failed: job={job_id} error={exc}")
+            return None
+        return _counters(data) or None
+
+    def read_many(self, job_ids: list[UUID]) -> dict[UUID, dict[str, int]]:
+        client = self.client
+        if client is None or not job_ids:
+            return {}
+        try:
+            pipe = client.pipeline(transaction=False)
+            for job_id in job_ids:
+                pipe.hgetall(self.key(job_id))
+            rows = pipe.execute()
+        except redis.RedisError as exc:
+            logger.warning(
+                f"Progress channel read failed: jobs={len(job_ids)} error={exc}"
+            )
+            return {}
+        return {job_id: _counters(data) for job_id, data in zip(job_ids, rows) if data}
+
+    def request_cancel(self, job_id: UUID | str) -> bool:
+        client = self.client
+        if client is None:
+            return False
+        try:
+            client.set(f"{CANCEL_KEY_PREFIX}{job_id}", 1, ex=KEY_TTL)
+        except redis.RedisError as exc:
+            logger.warning(f"Cancel flag write failed: job={job_id} error={exc}")
+            return False
+        return True
+
+    def cancel_requested(self, job_id: UUID | str) -> bool | None:
+        """Whether the job's cancel flag is set; None when Redis cannot tell."""
+        client = self.client
+        if client is None:
+            return None
+        try:
+            return bool(client.exists(f"{CANCEL_KEY_PREFIX}{job_id}"))
+        except redis.RedisError as exc:
+            logger.warning(f"Cancel flag read failed: job={job_id} error={exc}")
+            return None
+
+    def clear(self, job_id: UUID | str) -> None:
+        client = self.client
+        if client is None:
+            return
+        try:
+            client.delete(self.key(job_id))
+        except redis.RedisError as exc:
+            logger.warning(f"Progress channel clear failed: job={job_id} error={exc}")
+
+    def _execute(self, job_id: UUID | str, apply: Any) -> bool:
+        client = self.client
+        if client is None:
+            return False
+        key = self.key(job_id)
+        try:
+            pipe = client.pipeline(transaction=False)
+            apply(pipe, key)
+            pipe.expire(key, KEY_TTL)
+            pipe.execute()
+        except redis.RedisError as exc:
+            logger.warning(f"Progress channel write failed: job={job_id} error={exc}")
+            return False
+        return True
+
+
+def _counters(data: Mapping[bytes | str, Any]) -> dict[str, int]:
+    # Keys are str with decode_responses; bytes are decoded just in case.
+    return {
+        field.decode() if isinstance(field, bytes) else field: int(value)
+        for field, value in data.items()
+    }
+
+
+class ProgressThrottle:
+    """Fires at most once per ``interval`` seconds, or every ``rows`` rows."""
+
+    def __init__(self, interval: float, rows: int):
+        self.interval = interval
+        self.rows = rows
+        self.last_time = time.monotonic()
+        self.last_rows = 0
+
+    def due(self, processed: int) -> bool:
+        now = time.monotonic()
+        if (
+            now - self.last_time < self.interval
+            and processed - self.last_rows < self.rows
+        ):
+            return False
+        self.last_time = now
+        self.last_rows = processed
+        return True
+
+
+progress_channel = ProgressChannel(settings.IMPORT_PROGRESS_REDIS_URL)
@@ -0,0 +1,331 @@
+import csv
+import io
+import mmap
+import os
+from collections.abc import Iterator
+from importlib.util import find_spec
+from itertools import batched, islice
+from typing import IO, Any, Protocol
+
+from django.conf import settings
+from loguru import logger
+
+from .chunking import LineReader
+from .schemas import BoundSchema, extract_column
+
+CSV = "csv"
+ARROW = "arrow"
+READERS = (CSV, ARROW)
+
+# Rows in a block, then one value list per schema column (None when the
+# column is not in the file). Values are str, or bytes for numeric columns
+# read by MmapBlockReader.
+Block = tuple[int, list[list[Any]]]
+
+# Bytes cut from the mapping per block by MmapBlockReader.
+MMAP_BLOCK_SIZE = 256 * 1024
+NUMERIC_TYPES = ("int", "float")
+
+
+class BlockReader(Protocol):
+    # Row-aligned offset of the next unread row, or None when the backend
+    # reads ahead and cannot tell. Read-only: backends may compute it.
+    @property
+    def offset(self) -> int | None: ...
+
+    def read_header(self) -> list[str] | None: ...
+
+    def skip(self, offset: int | None, rows: int) -> None: ...
+
+    def blocks(self, validator: BoundSchema) -> Iterator[Block]: ...
+
+
+def arrow_available() -> bool:
+    return find_spec("pyarrow") is not None
+
+
+def resolve_reader(name: str = "") -> str:
+    """The job's backend, else ``IMPORT_READER``; csv when pyarrow is missing."""
+    name = name or settings.IMPORT_READER
+    if name == ARROW and not arrow_available():
+        logger.warning("pyarrow is not installed; reading with the csv backend")
+        return CSV
+    return name if name in READERS else CSV
+
+
+class CSVBlockReader:
+    """
+    Default backend: ``csv.reader`` lists, cut into blocks of ``block_rows``
+    and split into columns with the header indexes resolved once per file.
+    """
+
+    def __init__(
+        self,
+        raw: IO[bytes],
+        block_rows: int,
+        start: int = 0,
+        end: int | None = None,
+        fieldnames: list[str] | None = None,
+    ):
+        self.lines = LineReader(raw, start, end)
+        self.block_rows = block_rows
+        self.fieldnames = fieldnames
+
+    @property
+    def offset(self) -> int | None:
+        return self.lines.offset
+
+    def read_header(self) -> list[str] | None:
+        if self.fieldnames is None:
+            self.fieldnames = next(csv.reader(self.lines), None)
+        return self.fieldnames
+
+    def skip(self, offset: int | None, rows: int) -> None:
+        if offset is not None:
+            self.lines.seek(offset)
+            return
+        # Checkpoint written by a backend without row-aligned offsets.
+        for _ in islice(filter(None, csv.reader(self.lines)), rows):
+            pass
+
+    def blocks(self, validator: BoundSchema) -> Iterator[Block]:
+        indexes = validator.indexes
+        # Blank lines are skipped, as csv.DictReader does.
+        rows = filter(None, csv.reader(self.lines))
+        for block in batched(rows, self.block_rows):
+            size = len(block)
+            yield size, [extract_column(block, index, size) for index in indexes]
+
+
+class ByteRange(io.RawIOBase):
+    """The ``[start, end)`` byte range of ``raw`` as a file of its own."""
+
+    def __init__(self, raw: IO[bytes], start: int, end: int):
+        raw.seek(start)
+        self.raw = raw
+        self.remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        size = min(len(buffer), self.remaining)
+        data = self.raw.read(size) if size else b""
+        buffer[: len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
+class ArrowBlockReader:
+    """
+    Optional backend for very large files: pyarrow's streaming CSV reader
+    parses ``block_size`` bytes at a time in C++ and hands over whole column
+    batches, only for the columns the schema declares. Rows must have as many
+    fields as the header. Arrow reads ahead, so there is no row-aligned
+    offset; checkpoints resume by dropping the first ``rows`` rows parsed
+    (Arrow's own ``skip_rows_after_names`` would count blank lines as rows).
+    """
+
+    offset = None
+
+    def __init__(
+        self,
+        raw: IO[bytes],
+        block_size: int,
+        start: int = 0,
+        end: int | None = None,
+        fieldnames: list[str] | None = None,
+    ):
+        self.raw = raw
+        self.block_size = block_size
+        self.start = start
+        self.end = end
+        self.fieldnames = fieldnames
+        self.skip_rows = 0
+
+    def read_header(self) -> list[str] | None:
+        if self.fieldnames is None:
+            lines = LineReader(self.raw, self.start)
+            self.fieldnames = next(csv.reader(lines), None)
+            self.start = lines.offset
+        return self.fieldnames
+
+    def skip(self, offset: int | None, rows: int) -> None:
+        self.skip_rows = rows
+
+    def blocks(self, validator: BoundSchema) -> Iterator[Block]:
+        import pyarrow
+        from pyarrow import csv as pa_csv
+
+        if self.end is not None:
+            source: IO[bytes] | io.RawIOBase = ByteRange(self.raw, self.start, self.end)
+        else:
+            self.raw.seek(self.start)
+            source = self.raw
+
+        present = [
+            name
+            for name, index in zip(validator.schema.names, validator.indexes)
+            if index is not None
+        ]
+        stream = pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(
+                column_names=self.fieldnames,
+                block_size=self.block_size,
+            ),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            # Everything stays text; the schema validators do the parsing.
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=present,
+                column_types={name: pyarrow.string() for name in present},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        skip = self.skip_rows
+        for batch in stream:
+            if skip:
+                dropped = min(skip, batch.num_rows)
+                batch = batch.slice(dropped)
+                skip -= dropped
+            size = batch.num_rows
+            if not size:
+                continue
+            values = {name: batch.column(name).to_pylist() for name in present}
+            yield size, [
+                values.get(name) or [None] * size for name in validator.schema.names
+            ]
+
+
+class MmapBlockReader:
+    """
+    Local-storage fast path of the csv backend. The file is memory-mapped and
+    cut into row-aligned blocks on the bytes (quote parity, as in
+    ``parallel.split_rows``), one copy per block and no readline per row.
+    Blocks without quotes are split with ``bytes.split``; only text columns
+    are decoded, while ``int()``/``float()`` parse numeric columns straight
+    from bytes. Blocks that contain quotes go through ``csv.reader``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        block_size: int,
+        start: int = 0,
+        end: int | None = None,
+        fieldnames: list[str] | None = None,
+    ):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.block_size = block_size
+        self.offset: int = start
+        self.end = len(self.map) if end is None else min(end, len(self.map))
+        self.fieldnames = fieldnames
+        self.skip_rows = 0
+
+    def read_header(self) -> list[str] | None:
+        if self.fieldnames is None:
+            data = self.cut(self.offset)
+            if data is None:
+                return None
+            lines = LineReader(io.BytesIO(data))
+            self.fieldnames = next(csv.reader(lines), None)
+            self.offset += lines.offset
+        return self.fieldnames
+
+    def skip(self, offset: int | None, rows: int) -> None:
+        if offset is not None:
+            self.offset = offset
+        else:
+            self.skip_rows = rows
+
+    def cut(self, start: int) -> bytes | None:
+        """Whole rows from ``start``: about ``block_size`` bytes, more for long rows."""
+        size = self.block_size
+        while start < self.end:
+            stop = min(start + size, self.end)
+            data = self.map[start:stop]
+            if stop == self.end:
+                return data
+            cut = data.rfind(b"\n")
+            while cut != -1 and data.count(b'"', 0, cut) % 2:
+                cut = data.rfind(b"\n", 0, cut)
+            if cut != -1:
+                return data[: cut + 1]
+            size *= 2
+        return None
+
+    def blocks(self, validator: BoundSchema) -> Iterator[Block]:
+        indexes = validator.indexes
+        numeric = [spec.type in NUMERIC_TYPES for spec in validator.schema.columns]
+        skip = self.skip_rows
+
+        try:
+            while (data := self.cut(self.offset)) is not None:
+                self.offset += len(data)
+                if b'"' in data:
+                    text = io.StringIO(data.decode("utf-8"))
+                    rows: list[Any] = list(filter(None, csv.reader(text)))
+                    raw = False
+                else:
+                    if b"\r" in data:
+                        data = data.replace(b"\r\n", b"\n")
+                    rows = [line.split(b",") for line in data.split(b"\n") if line]
+                    raw = True
+
+                if skip:
+                    dropped = min(skip, len(rows))
+                    rows = rows[dropped:]
+                    skip -= dropped
+                size = len(rows)
+                if not size:
+                    continue
+
+                columns = []
+                for index, as_bytes in zip(indexes, numeric):
+                    values = extract_column(rows, index, size)
+                    if raw and not as_bytes and index is not None:
+                        values = _decode(values)
+                    columns.append(values)
+                yield size, columns
+        finally:
+            self.map.close()
+
+
+def _decode(values: list[Any]) -> list[str | None]:
+    try:
+        return list(map(bytes.decode, values))
+    except TypeError:
+        # Short rows left None in the column.
+        return [value if value is None else value.decode() for value in values]
+
+
+def local_path(file: Any) -> str | None:
+    """Filesystem path of a stored file, or None for remote storage."""
+    try:
+        return file.path
+    except (NotImplementedError, AttributeError, ValueError):
+        return None
+
+
+def open_reader(
+    name: str,
+    raw: IO[bytes],
+    block_rows: int,
+    start: int = 0,
+    end: int | None = None,
+    fieldnames: list[str] | None = None,
+    path: str | None = None,
+) -> BlockReader:
+    """
+    ``path`` is the local file behind an uncompressed ``raw``; with it the csv
+    backend memory-maps the file instead of streaming ``raw``.
+    """
+    if name == ARROW:
+        return ArrowBlockReader(
+            raw, settings.IMPORT_ARROW_BLOCK_SIZE, start, end, fieldnames
+        )
+    if path and settings.IMPORT_MMAP and os.path.getsize(path) > 0:
+        return MmapBlockReader(path, MMAP_BLOCK_SIZE, start, end, fieldnames)
+    return CSVBlockReader(raw, block_rows, start, end, fieldnames)
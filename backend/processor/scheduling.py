@@ -0,0 +1,52 @@
+from collections import Counter, deque
+from collections.abc import Sequence
+from typing import Any
+
+from django.conf import settings
+
+FAST = "fast"
+BULK = "bulk"
+LANES = (FAST, BULK)
+
+
+def choose_lane(size: int, rows: int = 0) -> str:
+    """Fast lane for small files; ``rows`` is the estimated row count, 0 if unknown."""
+    if (
+        size > settings.IMPORT_FAST_LANE_MAX_BYTES
+        or rows > settings.IMPORT_FAST_LANE_MAX_ROWS
+    ):
+        return BULK
+    return FAST
+
+
+def queue_for(lane: str) -> str:
+    return settings.IMPORT_BULK_QUEUE if lane == BULK else settings.IMPORT_FAST_QUEUE
+
+
+def weight(client: str) -> int:
+    return max(1, settings.IMPORT_CLIENT_WEIGHTS.get(client, 1))
+
+
+def pick_fair(
+    waiting: Sequence[tuple[Any, str]], running: Counter[str], slots: int
+) -> list[Any]:
+    """
+    Weighted fair share of ``slots`` free bulk slots. ``waiting`` holds
+    ``(job id, client)`` oldest first. Each slot goes to the client with the
+    fewest running jobs per unit of weight; ties go to the client whose oldest
+    job has waited longest. A client never gets more than its share while
+    others are waiting, however many files it queued.
+    """
+    queues: dict[str, deque[Any]] = {}
+    for job_id, client in waiting:
+        queues.setdefault(client, deque()).append(job_id)
+
+    running = Counter(running)
+    picked: list[Any] = []
+    while queues and len(picked) < slots:
+        client = min(queues, key=lambda name: running[name] / weight(name))
+        picked.append(queues[client].popleft())
+        running[client] += 1
+        if not queues[client]:
+            del queues[client]
+    return picked
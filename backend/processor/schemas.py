@@ -0,0 +1,416 @@
+import math
+import re
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, fields
+from typing import Any
+
+from .validators import (
+    ColumnResult,
+    ColumnValidator,
+    RowError,
+    _bulk_parse,
+    validate_emails,
+)
+
+TYPES = ("int", "float", "str", "email")
+
+CONSTRAINTS = {
+    "int": ("min", "max", "choices"),
+    "float": ("min", "max"),
+    "str": ("min_length", "max_length", "pattern", "choices"),
+    "email": ("max_length", "pattern"),
+}
+
+# Columns stored on ImportedRecord and the types each may be declared as.
+STORED_COLUMNS = {
+    "id": ("int",),
+    "name": ("str", "email"),
+    "email": ("email",),
+    "amount": ("int", "float"),
+}
+
+# Distinct schema versions compiled per worker before the cache starts over.
+CACHE_SIZE = 128
+
+
+class SchemaError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    name: str
+    type: str
+    required: bool = True
+    min: float | None = None
+    max: float | None = None
+    min_length: int | None = None
+    max_length: int | None = None
+    pattern: str | None = None
+    choices: tuple[Any, ...] | None = None
+    # The ImportedRecord field filled from this column, when it is not the
+    # column's own name.
+    stores: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ColumnSpec":
+        if not isinstance(data, Mapping):
+            raise SchemaError("Each column must be an object.")
+        name = data.get("name")
+        if not name or not isinstance(name, str) or len(name) > 64:
+            raise SchemaError("Each column needs a name of at most 64 characters.")
+        type_ = data.get("type")
+        if type_ not in TYPES:
+            raise SchemaError(f"Column {name}: type must be one of {', '.join(TYPES)}.")
+
+        allowed = {"name", "type", "required", "stores", *CONSTRAINTS[type_]}
+        unknown = set(data) - allowed
+        if unknown:
+            raise SchemaError(
+                f"Column {name}: unsupported keys for {type_}: {sorted(unknown)}"
+            )
+
+        values = dict(data)
+        if "choices" in values:
+            values["choices"] = tuple(values["choices"])
+        if "pattern" in values:
+            try:
+                re.compile(values["pattern"])
+            except re.error as exc:
+                raise SchemaError(f"Column {name}: invalid pattern: {exc}")
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in values.items() if key in known})
+
+
+def stored_field(spec: ColumnSpec) -> str | None:
+    """The ``STORED_COLUMNS`` field a column fills, if any."""
+    if spec.stores is not None:
+        return spec.stores
+    return spec.name if spec.name in STORED_COLUMNS else None
+
+
+def parse_columns(columns: Any) -> tuple[ColumnSpec, ...]:
+    """
+    Parse and check the ``ImportSchema.columns`` JSON. Each of the
+    ``STORED_COLUMNS`` (id, name, email, amount) must come from one required
+    column of the listed types, either named after the field or mapped onto
+    it with ``"stores"``; other columns are validated only.
+    """
+    if not isinstance(columns, list) or not columns:
+        raise SchemaError("Columns must be a non-empty list.")
+    specs = tuple(ColumnSpec.from_dict(column) for column in columns)
+
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise SchemaError("Column names must be unique.")
+
+    sources: dict[str, ColumnSpec] = {}
+    for spec in specs:
+        if spec.stores is None:
+            continue
+        if spec.stores not in STORED_COLUMNS:
+            raise SchemaError(
+                f"Column {spec.name}: stores must be one of "
+                f"{', '.join(STORED_COLUMNS)}."
+            )
+        if spec.name in STORED_COLUMNS and spec.name != spec.stores:
+            raise SchemaError(
+                f"Column {spec.name}: a column named after a stored field "
+                f"stores that field."
+            )
+    for spec in specs:
+        field = stored_field(spec)
+        if field is None:
+            continue
+        if field in sources:
+            raise SchemaError(
+                f"Column {spec.name}: {field} is already stored from column "
+                f"{sources[field].name}."
+            )
+        sources[field] = spec
+
+    for field, types in STORED_COLUMNS.items():
+        source = sources.get(field)
+        if source is None or not source.required or source.type not in types:
+            raise SchemaError(
+                f"Every record stores {field}: declare a required "
+                f"{' or '.join(types)} column named {field}, or map one onto it "
+                f'with "stores": "{field}".'
+            )
+    return specs
+
+
+def _label(spec: ColumnSpec) -> str:
+    return spec.name.capitalize()
+
+
+def _blank(value: str | None) -> bool:
+    return value is None or not value.strip()
+
+
+def _optional(convert: Callable[[str], Any]) -> Callable[[str | None], Any]:
+    def parse(value: str | None) -> Any:
+        return None if value is None or not value.strip() else convert(value)
+
+    return parse
+
+
+def _reject(
+    result: ColumnResult, failed: Callable[[Any], bool], message: str
+) -> ColumnResult:
+    parsed, errors = result
+    for i, value in enumerate(parsed):
+        if value is not None and errors[i] is None and failed(value):
+            parsed[i] = None
+            errors[i] = message
+    return parsed, errors
+
+
+def _number_column(spec: ColumnSpec) -> ColumnValidator:
+    convert: Callable[[Any], Any] = int if spec.type == "int" else float
+    label = _label(spec)
+    invalid = f"Invalid {spec.name}"
+    # Same messages as validate_id / validate_amount for the default schema.
+    missing = invalid if spec.type == "int" else f"Missing {spec.name}"
+
+    def validate(value: str | None) -> Any:
+        if value is None:
+            if not spec.required:
+                return None
+            raise ValueError(missing)
+        if not spec.required and not value.strip():
+            return None
+        try:
+            return convert(value)
+        except (TypeError, ValueError):
+            raise ValueError(invalid)
+
+    fast = convert if spec.required else _optional(convert)
+
+    checks: list[tuple[Callable[[Any], bool], str]] = []
+    if spec.type == "float":
+        checks.append((lambda v: not math.isfinite(v), invalid))
+    if spec.min is not None:
+        low = spec.min
+        if spec.type == "int" and low == 1:
+            message = f"{label} must be positive"
+        elif low == 0:
+            message = f"{label} must be non-negative"
+        else:
+            message = f"{label} must be at least {low:g}"
+        checks.append((lambda v: v < low, message))
+    if spec.max is not None:
+        high = spec.max
+        checks.append((lambda v: v > high, f"{label} must be at most {high:g}"))
+    if spec.choices is not None:
+        choices = frozenset(spec.choices)
+        checks.append((lambda v: v not in choices, f"{label} is not an allowed value"))
+
+    def validate_column(values: Sequence[str | None]) -> ColumnResult:
+        result = _bulk_parse(values, fast, validate)
+        for failed, message in checks:
+            result = _reject(result, failed, message)
+        return result
+
+    return validate_column
+
+
+def _text_checks(spec: ColumnSpec) -> list[tuple[Callable[[Any], bool], str]]:
+    label = _label(spec)
+    checks: list[tuple[Callable[[Any], bool], str]] = []
+    if spec.min_length is not None:
+        shortest = spec.min_length
+        checks.append(
+            (lambda v: len(v) < shortest, f"{label} is shorter than {shortest}")
+        )
+    if spec.max_length is not None:
+        longest = spec.max_length
+        checks.append((lambda v: len(v) > longest, f"{label} is longer than {longest}"))
+    if spec.pattern is not None:
+        match = re.compile(spec.pattern).fullmatch
+        checks.append((lambda v: match(v) is None, f"{label} has an invalid format"))
+    if spec.choices is not None:
+        choices = frozenset(spec.choices)
+        checks.append((lambda v: v not in choices, f"{label} is not an allowed value"))
+    return checks
+
+
+def _str_column(spec: ColumnSpec) -> ColumnValidator:
+    required = f"{_label(spec)} is required"
+    checks = _text_checks(spec)
+
+    def validate_column(values: Sequence[str | None]) -> ColumnResult:
+        parsed: list[Any] = [(value or "").strip() for value in values]
+        if spec.required:
+            errors = [None if text else required for text in parsed]
+        else:
+            parsed = [text or None for text in parsed]
+            errors = [None] * len(parsed)
+        result = parsed, errors
+        for failed, message in checks:
+            result = _reject(result, failed, message)
+        return result
+
+    return validate_column
+
+
+def _email_column(spec: ColumnSpec) -> ColumnValidator:
+    checks = _text_checks(spec)
+
+    def validate_column(values: Sequence[str | None]) -> ColumnResult:
+        if spec.required:
+            result = validate_emails(values)
+        else:
+            present = [i for i, value in enumerate(values) if not _blank(value)]
+            parsed, errors = validate_emails([values[i] for i in present])
+            result = [None] * len(values), [None] * len(values)
+            for i, email, error in zip(present, parsed, errors):
+                result[0][i] = email
+                result[1][i] = error
+        for failed, message in checks:
+            result = _reject(result, failed, message)
+        return result
+
+    return validate_column
+
+
+COLUMN_BUILDERS: dict[str, Callable[[ColumnSpec], ColumnValidator]] = {
+    "int": _number_column,
+    "float": _number_column,
+    "str": _str_column,
+    "email": _email_column,
+}
+
+
+def extract_column(
+    rows: Sequence[Sequence[str]], index: int | None, size: int
+) -> list[str | None]:
+    if index is None:
+        return [None] * size
+    try:
+        return [row[index] for row in rows]
+    except IndexError:
+        # Short rows read as missing values, like csv.DictReader's restval.
+        return [row[index] if index < len(row) else None for row in rows]
+
+
+class CompiledSchema:
+    """
+    A schema turned into one column validator per declared column. Binding it
+    to a file header resolves every column to its position once, so blocks of
+    rows are validated from plain ``csv.reader`` lists (or column batches from
+    a reader backend) with no per-row dict.
+    """
+
+    def __init__(
+        self, columns: Sequence[ColumnSpec], key: tuple[str, int] | None = None
+    ):
+        # (name, version) of the ImportSchema; None for the built-in schema.
+        self.key = key
+        self.columns = tuple(columns)
+        self.names = tuple(spec.name for spec in self.columns)
+        self.required = frozenset(spec.name for spec in self.columns if spec.required)
+        # Stored field -> the column it is read from.
+        self.sources = {
+            field: spec.name
+            for spec in self.columns
+            if (field := stored_field(spec)) is not None
+        }
+        self.validators = tuple(COLUMN_BUILDERS[spec.type](spec) for spec in columns)
+
+    def bind(self, fieldnames: Sequence[str] | None) -> "BoundSchema":
+        if not fieldnames:
+            raise ValueError("Missing header")
+        missing = set(self.required) - set(fieldnames)
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+
+        # The last of repeated header names wins, as with csv.DictReader.
+        positions = {name: i for i, name in enumerate(fieldnames)}
+        return BoundSchema(self, tuple(positions.get(name) for name in self.names))
+
+
+class BoundSchema:
+    """A compiled schema for one header: column indexes plus validators."""
+
+    def __init__(self, schema: CompiledSchema, indexes: tuple[int | None, ...]):
+        self.schema = schema
+        self.indexes = indexes
+        self.plan = tuple(
+            zip(
+                schema.names,
+                (spec.stores for spec in schema.columns),
+                schema.validators,
+            )
+        )
+
+    def validate_rows(
+        self, rows: Sequence[Sequence[str]]
+    ) -> tuple[dict[str, list[Any]], list[RowError | None]]:
+        """Same result shape as ``CSVBatchValidator.validate_rows``."""
+        size = len(rows)
+        columns = [extract_column(rows, index, size) for index in self.indexes]
+        return self.validate_columns(columns, size)
+
+    def validate_columns(
+        self, columns: Sequence[Sequence[str | None]], size: int
+    ) -> tuple[dict[str, list[Any]], list[RowError | None]]:
+        """Validate one value list per schema column, in schema order."""
+        parsed: dict[str, list[Any]] = {}
+        errors: list[RowError | None] = [None] * size
+
+        for (name, stores, validate), column in zip(self.plan, columns):
+            values, column_errors = validate(column)
+            parsed[name] = values
+            if stores is not None:
+                parsed[stores] = values
+            if column_errors.count(None) == size:
+                continue
+            for i, error in enumerate(column_errors):
+                if error is not None and errors[i] is None:
+                    errors[i] = (name, error)
+
+        return parsed, errors
+
+
+DEFAULT_COLUMNS = [
+    {"name": "id", "type": "int", "min": 1},
+    {"name": "name", "type": "str"},
+    {"name": "email", "type": "email"},
+    {"name": "amount", "type": "float", "min": 0},
+]
+
+DEFAULT_SCHEMA = CompiledSchema(parse_columns(DEFAULT_COLUMNS))
+
+_compiled: dict[tuple[str, int], CompiledSchema] = {}
+
+
+def compile_schema(schema: Any) -> CompiledSchema:
+    """
+    Compiled validator for an ``ImportSchema`` (``None`` for the default),
+    cached per worker by name and version. Versions are never edited in place,
+    so a cached entry never goes stale.
+    """
+    if schema is None:
+        return DEFAULT_SCHEMA
+    key = (schema.name, schema.version)
+    if key not in _compiled:
+        _store(key, CompiledSchema(parse_columns(schema.columns), key))
+    return _compiled[key]
+
+
+def compiled_for(
+    key: tuple[str, int] | None, columns: Sequence[ColumnSpec]
+) -> CompiledSchema:
+    """Same cache for column specs sent by another process (the validation pool)."""
+    if key is None:
+        return DEFAULT_SCHEMA
+    if key not in _compiled:
+        _store(key, CompiledSchema(columns, key))
+    return _compiled[key]
+
+
+def _store(key: tuple[str, int], compiled: CompiledSchema) -> None:
+    if len(_compiled) >= CACHE_SIZE:
+        _compiled.clear()
+    _compiled[key] = compiled
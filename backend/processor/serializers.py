@@ -1,9 +1,27 @@
-from typing import Optional, Set
+import csv
+import hashlib
+import io
+from typing import IO, Optional, Set
 
 from rest_framework import serializers
 
-from .models import ImportJob
-
+from .chunking import read_header
+from .compression import (
+    EXTENSIONS,
+    HEAD_READ_SIZE,
+    CompressionError,
+    compression_for,
+    decompress_head,
+)
+from .models import (
+    ImportAggregate,
+    ImportJob,
+    ImportRowError,
+    ImportSchema,
+    ImportUpload,
+)
+from .readers import ARROW, READERS, arrow_available
+from .schemas import compile_schema
 
 ALLOWED_CONTENT_TYPES: Set[str] = {
     "text/csv",
@@ -12,10 +30,23 @@ ALLOWED_CONTENT_TYPES: Set[str] = {
     "application/vnd.ms-excel",
 }
 
+# Only accepted for .csv.gz/.csv.zst names; a plain .csv must be sent as text.
+COMPRESSED_CONTENT_TYPES: Set[str] = {
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/octet-stream",
+}
+
+HEAD_SIZE = 4096
+
+# Windows of HEAD_SIZE bytes, spread over the file, sampled to estimate rows.
+ROW_SAMPLES = 4
+
 
 def _validate_extension(filename: str) -> None:
-    if not filename.lower().endswith(".csv"):
-        raise serializers.ValidationError("File must be a .csv")
+    if not filename.lower().endswith(EXTENSIONS):
+        raise serializers.ValidationError("File must be a .csv, .csv.gz or .csv.zst")
 
 
 def _validate_not_empty(head: bytes) -> None:
@@ -28,23 +59,145 @@ def _validate_not_binary(head: bytes) -> None:
         raise serializers.ValidationError("File looks like a binary file, not CSV.")
 
 
-def _validate_content_type(content_type: Optional[str]) -> None:
-    if content_type and content_type not in ALLOWED_CONTENT_TYPES:
+def _read_head(f, filename: str) -> bytes:
+    """First HEAD_SIZE bytes of CSV text, decompressed for .csv.gz/.csv.zst."""
+    compression = compression_for(filename)
+    pos = f.tell()
+    data = f.read(HEAD_SIZE if compression is None else HEAD_READ_SIZE)
+    f.seek(pos)
+    try:
+        return decompress_head(data, compression, HEAD_SIZE)
+    except CompressionError as exc:
+        raise serializers.ValidationError(str(exc))
+
+
+def _parse_header(head: bytes) -> list[str] | None:
+    """Header fields from the head buffer; None when the header does not fit in it."""
+    try:
+        fieldnames, end = read_header(io.BytesIO(head))
+    except UnicodeDecodeError:
+        if len(head) >= HEAD_SIZE and b"\n" not in head:
+            return None
+        raise serializers.ValidationError("File header is not valid UTF-8.")
+    if len(head) >= HEAD_SIZE and end >= len(head):
+        return None
+    return fieldnames or []
+
+
+def _validate_header(head: bytes, schema: ImportSchema | None) -> None:
+    """The same header check the worker runs, answered before the file is queued."""
+    fieldnames = _parse_header(head)
+    if fieldnames is None:
+        return
+    try:
+        compile_schema(schema).bind(fieldnames)
+    except ValueError as exc:
+        raise serializers.ValidationError(str(exc))
+
+
+def _estimate_rows(f: IO[bytes], head: bytes, size: int) -> int:
+    """
+    Data rows of an uncompressed file of ``size`` bytes: counted when the
+    whole file is in ``head``, else extrapolated from the newlines in
+    ROW_SAMPLES windows spread from the first row to the end of the file.
+    """
+    try:
+        _, start = read_header(io.BytesIO(head))
+    except UnicodeDecodeError:
+        return 0
+    if size <= len(head):
+        text = head[start:].decode("utf-8", "replace")
+        return sum(1 for row in csv.reader(io.StringIO(text)) if row)
+
+    if start >= len(head):
+        # The header alone fills the head; leave it to the worker.
+        return 0
+
+    pos = f.tell()
+    newlines = sampled = 0
+    try:
+        span = max(0, size - start - HEAD_SIZE)
+        for i in range(ROW_SAMPLES):
+            f.seek(start + span * i // (ROW_SAMPLES - 1))
+            window = f.read(HEAD_SIZE)
+            newlines += window.count(b"\n")
+            sampled += len(window)
+    finally:
+        f.seek(pos)
+    if not newlines:
+        return 1
+    return max(1, round((size - start) * newlines / sampled))
+
+
+def _validate_content_type(content_type: Optional[str], filename: str) -> None:
+    allowed = ALLOWED_CONTENT_TYPES
+    if compression_for(filename) is not None:
+        allowed = allowed | COMPRESSED_CONTENT_TYPES
+    if content_type and content_type not in allowed:
         raise serializers.ValidationError(f"Unsupported content type: {content_type}")
 
 
+def _validate_reader(reader: str) -> str:
+    if reader == ARROW and not arrow_available():
+        raise serializers.ValidationError("The arrow reader is not installed.")
+    return reader
+
+
+def _resolve_schema(attrs: dict) -> dict:
+    """Swap ``schema``/``schema_version`` for the ImportSchema, latest by default."""
+    name = attrs.pop("schema", "")
+    version = attrs.pop("schema_version", None)
+    attrs["schema"] = None
+    if not name:
+        if version is not None:
+            raise serializers.ValidationError({"schema": "Schema name is required."})
+        return attrs
+
+    schemas = ImportSchema.objects.filter(name=name)
+    if version is not None:
+        schemas = schemas.filter(version=version)
+    attrs["schema"] = schemas.order_by("-version").first()
+    if attrs["schema"] is None:
+        raise serializers.ValidationError({"schema": "Unknown schema."})
+    return attrs
+
+
 class ImportUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
+    # Skip content-hash deduplication and always process the file again.
+    reprocess = serializers.BooleanField(required=False, default=False)
+    # Name of an ImportSchema; the latest version unless schema_version is set.
+    schema = serializers.CharField(required=False, allow_blank=True, max_length=64)
+    schema_version = serializers.IntegerField(required=False, min_value=1)
+    # Row reader backend; IMPORT_READER when blank.
+    reader = serializers.ChoiceField(
+        choices=READERS, required=False, allow_blank=True, default=""
+    )
+
+    def validate(self, attrs):
+        attrs = _resolve_schema(attrs)
+        f = attrs["file"]
+        head = _read_head(f, f.name)
+        try:
+            _validate_header(head, attrs["schema"])
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({"file": exc.detail})
+
+        # Compressed files are estimated while they are processed.
+        attrs["total_rows"] = 0
+        if compression_for(f.name) is None:
+            attrs["total_rows"] = _estimate_rows(f, head, f.size)
+        return attrs
+
+    def validate_reader(self, reader: str) -> str:
+        return _validate_reader(reader)
 
     def validate_file(self, f):
         filename = f.name or ""
         _validate_extension(filename)
-        _validate_content_type(f.content_type)
-
-        pos = f.tell()
-        head = f.read(4096)
-        f.seek(pos)
+        _validate_content_type(f.content_type, filename)
 
+        head = _read_head(f, filename)
         _validate_not_empty(head)
         _validate_not_binary(head)
 
@@ -68,32 +221,182 @@ class ImportJobStatusSerializer(serializers.Serializer):
     id = serializers.UUIDField()
     status = serializers.CharField()
     total_rows = serializers.IntegerField()
+    total_rows_estimated = serializers.BooleanField()
     processed_rows = serializers.IntegerField()
     success_rows = serializers.IntegerField()
     failed_rows = serializers.IntegerField()
+    file_size = serializers.IntegerField()
+    bytes_processed = serializers.IntegerField()
     progress = serializers.IntegerField()
+    row_progress = serializers.IntegerField()
+    byte_progress = serializers.IntegerField()
     error = serializers.CharField(allow_blank=True)
+    error_counts = serializers.DictField(child=serializers.IntegerField())
+    timings = serializers.DictField(child=serializers.FloatField())
+    lane = serializers.CharField(allow_blank=True)
+    queue_wait = serializers.FloatField(allow_null=True)
+    cancel_requested = serializers.BooleanField()
     created_at = serializers.DateTimeField()
+    started_at = serializers.DateTimeField(allow_null=True)
     updated_at = serializers.DateTimeField()
 
     @staticmethod
     def from_instance(job: ImportJob) -> dict:
         total = job.total_rows or 0
         processed = job.processed_rows or 0
+        file_size = job.file_size or 0
+        bytes_processed = job.bytes_processed or 0
 
-        progress = 0
+        row_progress = 0
         if total > 0:
-            progress = int((processed / total) * 100)
+            row_progress = min(100, int((processed / total) * 100))
+
+        byte_progress = 0
+        if file_size > 0:
+            byte_progress = min(100, int((bytes_processed / file_size) * 100))
+
+        # Byte progress is exact while rows are still being counted, so prefer
+        # it whenever total_rows is only an estimate.
+        progress = row_progress
+        if job.total_rows_estimated and file_size > 0:
+            progress = byte_progress
 
         return {
             "id": job.id,
             "status": job.status,
             "total_rows": total,
+            "total_rows_estimated": job.total_rows_estimated,
             "processed_rows": processed,
             "success_rows": job.success_rows or 0,
             "failed_rows": job.failed_rows or 0,
+            "file_size": file_size,
+            "bytes_processed": bytes_processed,
             "progress": progress,
+            "row_progress": row_progress,
+            "byte_progress": byte_progress,
             "error": job.error or "",
+            "error_counts": job.error_counts or {},
+            "timings": job.timings or {},
+            "lane": job.lane,
+            "queue_wait": job.queue_wait,
+            "cancel_requested": job.cancel_requested_at is not None,
             "created_at": job.created_at.isoformat(),
+            "started_at": job.started_at.isoformat() if job.started_at else None,
             "updated_at": job.updated_at.isoformat(),
         }
+
+    @staticmethod
+    def etag(data: dict) -> str:
+        # updated_at alone is not enough: live counters from Redis change
+        # without touching the row.
+        key = ":".join(
+            str(data[field])
+            for field in (
+                "id",
+                "updated_at",
+                "status",
+                "total_rows",
+                "processed_rows",
+                "success_rows",
+                "failed_rows",
+                "bytes_processed",
+            )
+        )
+        return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+class ImportBatchStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=1000
+    )
+
+
+class ImportRowErrorSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    column = serializers.CharField(allow_blank=True)
+    code = serializers.CharField()
+
+    @staticmethod
+    def from_instance(error: ImportRowError) -> dict:
+        return {
+            "row": error.row_number,
+            "column": error.column,
+            "code": error.code,
+        }
+
+
+class ImportAggregateSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    type = serializers.CharField()
+    column = serializers.CharField(allow_blank=True)
+    group_by = serializers.CharField(allow_blank=True)
+    value = serializers.JSONField(allow_null=True)
+
+    @staticmethod
+    def from_instance(aggregate: ImportAggregate) -> dict:
+        return {
+            "name": aggregate.name,
+            "type": aggregate.type,
+            "column": aggregate.column,
+            "group_by": aggregate.group_by,
+            "value": aggregate.value,
+        }
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(required=False, allow_blank=True)
+    sha256 = serializers.RegexField(
+        r"^[0-9a-fA-F]{64}$", required=False, allow_blank=True
+    )
+    reprocess = serializers.BooleanField(required=False, default=False)
+    schema = serializers.CharField(required=False, allow_blank=True, max_length=64)
+    schema_version = serializers.IntegerField(required=False, min_value=1)
+    reader = serializers.ChoiceField(
+        choices=READERS, required=False, allow_blank=True, default=""
+    )
+
+    def validate(self, attrs):
+        try:
+            _validate_content_type(attrs.get("content_type"), attrs["filename"])
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({"content_type": exc.detail})
+        return _resolve_schema(attrs)
+
+    def validate_reader(self, reader: str) -> str:
+        return _validate_reader(reader)
+
+    def validate_filename(self, filename: str) -> str:
+        _validate_extension(filename)
+        return filename
+
+
+class UploadSessionSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    filename = serializers.CharField()
+    size = serializers.IntegerField()
+    chunk_size = serializers.IntegerField()
+    total_chunks = serializers.IntegerField()
+    received = serializers.ListField(child=serializers.IntegerField())
+    status = serializers.CharField()
+    sha256 = serializers.CharField(allow_blank=True)
+    reprocess = serializers.BooleanField()
+    job = serializers.UUIDField(allow_null=True)
+    error = serializers.CharField(allow_blank=True)
+
+    @staticmethod
+    def from_instance(upload: ImportUpload, received: list[int]) -> dict:
+        return {
+            "id": upload.id,
+            "filename": upload.filename,
+            "size": upload.size,
+            "chunk_size": upload.chunk_size,
+            "total_chunks": upload.total_chunks,
+            "received": received,
+            "status": upload.status,
+            "sha256": upload.sha256,
+            "reprocess": upload.reprocess,
+            "job": upload.job_id,
+            "error": upload.error,
+        }
@@ -1,13 +1,62 @@
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import UploadedFile
+from django.db.models import Q
 from django.utils import timezone
+from loguru import logger
 
-from .models import ImportJob, ImportStatus
+from .models import (
+    ImportAggregate,
+    ImportJob,
+    ImportRowError,
+    ImportSchema,
+    ImportStatus,
+)
+from .progress import progress_channel
+from .scheduling import choose_lane
 
 
 class ImportService:
     @staticmethod
-    def create_job(file: UploadedFile) -> ImportJob:
-        return ImportJob.objects.create(file=file)
+    def create_job(
+        file: UploadedFile,
+        sha256: str = "",
+        schema: ImportSchema | None = None,
+        reader: str = "",
+        client: str = "",
+        total_rows: int = 0,
+    ) -> ImportJob:
+        # total_rows is the upload-time estimate (0 when unknown).
+        return ImportJob.objects.create(
+            file=file,
+            sha256=sha256,
+            schema=schema,
+            reader=reader,
+            client=client,
+            total_rows=total_rows,
+            total_rows_estimated=True,
+            lane=choose_lane(file.size or 0, total_rows),
+        )
+
+    @staticmethod
+    def find_completed(
+        sha256: str, schema: ImportSchema | None = None
+    ) -> ImportJob | None:
+        # The same file checked against another schema is a different import.
+        if not sha256:
+            return None
+        return (
+            ImportJob.objects.filter(
+                sha256=sha256, schema=schema, status=ImportStatus.COMPLETED
+            )
+            .order_by("-created_at")
+            .first()
+        )
 
     @staticmethod
     def mark_failed(job_id: str, error: str) -> None:
@@ -16,3 +65,113 @@ class ImportService:
             error=error,
             updated_at=timezone.now(),
         )
+        progress_channel.clear(job_id)
+
+    @staticmethod
+    def cancel(job: ImportJob) -> ImportJob:
+        """
+        Request cancellation of a pending or processing job. A pending job is
+        cancelled at once and its queued task does nothing; a processing job
+        stops at its next cancellation check.
+        """
+        now = timezone.now()
+        # The flag comes first: a pending job may start before it is updated.
+        ImportJob.objects.filter(
+            id=job.id,
+            status__in=(ImportStatus.PENDING, ImportStatus.PROCESSING),
+            cancel_requested_at=None,
+        ).update(cancel_requested_at=now, updated_at=now)
+        progress_channel.request_cancel(job.id)
+        ImportJob.objects.filter(id=job.id, status=ImportStatus.PENDING).update(
+            status=ImportStatus.CANCELLED, updated_at=now
+        )
+        job.refresh_from_db()
+        return job
+
+    @staticmethod
+    def apply_live_progress(job: ImportJob) -> bool:
+        # Running jobs only checkpoint to the database; Redis has the latest
+        # counters.
+        if job.status != ImportStatus.PROCESSING:
+            return False
+        live = progress_channel.read(job.id)
+        for field, value in (live or {}).items():
+            if hasattr(job, field):
+                setattr(job, field, value)
+        return bool(live)
+
+    @staticmethod
+    def apply_live_progress_many(jobs: list[ImportJob]) -> None:
+        # One Redis round trip for every processing job in the list.
+        processing = [job for job in jobs if job.status == ImportStatus.PROCESSING]
+        live = progress_channel.read_many([job.id for job in processing])
+        for job in processing:
+            for field, value in live.get(job.id, {}).items():
+                if hasattr(job, field):
+                    setattr(job, field, value)
+
+    @staticmethod
+    def list_jobs(
+        status: str | None,
+        created_after: datetime | None,
+        after: tuple[datetime, UUID] | None,
+        limit: int,
+    ) -> list[ImportJob]:
+        jobs = ImportJob.objects.all()
+        if status:
+            jobs = jobs.filter(status=status)
+        if created_after is not None:
+            jobs = jobs.filter(created_at__gt=created_after)
+        if after is not None:
+            created_at, job_id = after
+            jobs = jobs.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=job_id)
+            )
+        return list(jobs.order_by("created_at", "id")[:limit])
+
+    @staticmethod
+    def get_jobs(job_ids: list[UUID]) -> list[ImportJob]:
+        return list(ImportJob.objects.filter(id__in=job_ids))
+
+    @staticmethod
+    def status_cache_key(job_id: Any) -> str:
+        return f"import-status:{job_id}"
+
+    @staticmethod
+    def get_cached_status(job_id: Any) -> Any:
+        try:
+            return cache.get(ImportService.status_cache_key(job_id))
+        except redis.RedisError as exc:
+            logger.warning(f"Status cache read failed: job={job_id} error={exc}")
+            return None
+
+    @staticmethod
+    def cache_status(job_id: Any, value: Any) -> None:
+        # Only finished jobs are cached; they no longer change.
+        try:
+            cache.set(
+                ImportService.status_cache_key(job_id),
+                value,
+                settings.IMPORT_STATUS_CACHE_TTL,
+            )
+        except redis.RedisError as exc:
+            logger.warning(f"Status cache write failed: job={job_id} error={exc}")
+
+    @staticmethod
+    def forget_status(job_id: Any) -> None:
+        try:
+            cache.delete(ImportService.status_cache_key(job_id))
+        except redis.RedisError as exc:
+            logger.warning(f"Status cache delete failed: job={job_id} error={exc}")
+
+    @staticmethod
+    def list_aggregates(job: ImportJob) -> list[ImportAggregate]:
+        return list(ImportAggregate.objects.filter(job=job).order_by("id"))
+
+    @staticmethod
+    def list_errors(job: ImportJob, after: int, limit: int) -> list[ImportRowError]:
+        return list(
+            ImportRowError.objects.filter(job=job, row_number__gt=after)
+            .only("row_number", "column", "code")
+            .order_by("row_number")[:limit]
+        )
@@ -1,21 +1,184 @@
-from celery import shared_task
+from collections import Counter
+from typing import Any
+
+from celery import chord, shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from loguru import logger
 
+from .compression import compression_for
 from .services import ImportService
-from .models import ImportJob
-from .processor import CSVProcessor
+from .models import ImportJob, ImportStatus, ImportUpload
+from .processor import CSVProcessor, ImportCancelled
+from .scheduling import BULK, pick_fair, queue_for
+from .uploads import UploadService
 
 
-@shared_task(bind=True)
+# acks_late + reject_on_worker_lost: a task whose worker dies is redelivered,
+# and CSVProcessor.run resumes it from the job's last checkpoint.
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
 def process_import(self, job_id: str) -> None:
     try:
         job = ImportJob.objects.get(id=job_id)
+        # A job cancelled while pending is dropped here, before it starts.
+        if job.status in (ImportStatus.COMPLETED, ImportStatus.CANCELLED):
+            logger.info(f"ImportJob {job_id} already {job.status}")
+            return
+        if job.status == ImportStatus.PROCESSING and job.checkpoint.get("chunks"):
+            # Redelivered after its chunks were dispatched; their chord
+            # finishes the job.
+            logger.info(f"ImportJob {job_id} chunks already dispatched")
+            return
+        if settings.IMPORT_CHUNKED and dispatch_chunks(job):
+            return
         processor = CSVProcessor(job)
         total = processor.run()
         logger.info(f"ImportJob {job_id} completed successfully with amount: {total}")
+    except ImportCancelled:
+        return
+    except ImportJob.DoesNotExist:
+        logger.error(f"ImportJob {job_id} does not exist")
+        return
+    except Exception as e:
+        ImportService.mark_failed(job_id=job_id, error=str(e))
+        raise
+    finally:
+        release_bulk_slot(job_id)
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def assemble_upload(self, upload_id: str) -> None:
+    try:
+        job = UploadService.assemble(upload_id)
+    except ImportUpload.DoesNotExist:
+        logger.error(f"ImportUpload {upload_id} does not exist")
+        return
+    except Exception as e:
+        # The parts are kept, so the client can fix them and complete again.
+        UploadService.reopen(upload_id, str(e))
+        raise
+    if job is not None:
+        enqueue_import(job)
+
+
+def enqueue_import(job: ImportJob) -> None:
+    """Send a new job to its lane's queue; bulk jobs wait for a fair-share slot."""
+    if job.lane == BULK and settings.IMPORT_BULK_SLOTS > 0:
+        dispatch_bulk()
+        return
+    process_import.apply_async(args=[str(job.id)], queue=queue_for(job.lane))
+
+
+def dispatch_bulk() -> int:
+    """
+    Hand free bulk slots to waiting bulk jobs, weighted-fair by client. Runs
+    when a bulk job is created and whenever one stops running.
+    """
+    slots = settings.IMPORT_BULK_SLOTS
+    if slots <= 0:
+        return 0
+
+    with transaction.atomic():
+        # Locking the waiting jobs serializes concurrent dispatchers.
+        waiting = list(
+            ImportJob.objects.select_for_update()
+            .filter(lane=BULK, status=ImportStatus.PENDING, dispatched_at=None)
+            .order_by("created_at", "id")
+            .values_list("id", "client")
+        )
+        if not waiting:
+            return 0
+        running = Counter(
+            ImportJob.objects.filter(
+                lane=BULK,
+                dispatched_at__isnull=False,
+                status__in=(ImportStatus.PENDING, ImportStatus.PROCESSING),
+            ).values_list("client", flat=True)
+        )
+        picked = pick_fair(waiting, running, slots - running.total())
+        if not picked:
+            return 0
+
+        ImportJob.objects.filter(id__in=picked).update(dispatched_at=timezone.now())
+
+        def send() -> None:
+            for job_id in picked:
+                process_import.apply_async(
+                    args=[str(job_id)], queue=settings.IMPORT_BULK_QUEUE
+                )
+
+        transaction.on_commit(send)
+
+    logger.info(
+        f"Dispatched {len(picked)} bulk imports, {len(waiting) - len(picked)} waiting"
+    )
+    return len(picked)
+
+
+def release_bulk_slot(job_id: str) -> None:
+    # Called when a task stops working on a job; a bulk job still running as
+    # chunks keeps its slot.
+    if ImportJob.objects.filter(id=job_id, lane=BULK).exists():
+        dispatch_bulk()
+
+
+def dispatch_chunks(job: ImportJob) -> bool:
+    if (job.file.size or 0) <= settings.IMPORT_CHUNK_SIZE:
+        return False
+    if compression_for(job.file.name):
+        # Compressed streams cannot be split into byte ranges.
+        return False
+
+    processor = CSVProcessor(job)
+    fieldnames, ranges = processor.plan_chunks(
+        settings.IMPORT_CHUNK_SIZE, settings.IMPORT_MAX_CHUNKS
+    )
+    if len(ranges) < 2:
+        return False
+
+    processor.start(job.file.size)
+    # Recorded before the chord is sent, so a redelivered process_import
+    # never starts a second chord over the same chunks.
+    ImportJob.objects.filter(id=job.id).update(checkpoint={"chunks": len(ranges)})
+    job_id = str(job.id)
+    queue = queue_for(job.lane)
+    chord(
+        process_import_chunk.s(job_id, index, start, end, fieldnames).set(queue=queue)
+        for index, (start, end) in enumerate(ranges)
+    )(finish_import_chunks.s(job_id).set(queue=queue))
+    logger.info(f"ImportJob {job_id} split into {len(ranges)} chunks")
+    return True
+
+
+@shared_task(bind=True, ignore_result=False, acks_late=True, reject_on_worker_lost=True)
+def process_import_chunk(
+    self, job_id: str, index: int, start: int, end: int, fieldnames: list[str]
+) -> dict[str, Any]:
+    try:
+        job = ImportJob.objects.get(id=job_id)
+        return CSVProcessor(job).run_chunk(index, start, end, fieldnames)
+    except Exception as e:
+        ImportService.mark_failed(job_id=job_id, error=str(e))
+        release_bulk_slot(job_id)
+        raise
+
+
+@shared_task(bind=True, acks_late=True)
+def finish_import_chunks(self, results: list[dict[str, Any]], job_id: str) -> None:
+    try:
+        job = ImportJob.objects.get(id=job_id)
+        total = CSVProcessor(job).finish_chunks(results)
+        if total is None:
+            return
+        logger.info(f"ImportJob {job_id} completed successfully with amount: {total}")
+    except ImportCancelled:
+        return
     except ImportJob.DoesNotExist:
         logger.error(f"ImportJob {job_id} does not exist")
         return
     except Exception as e:
         ImportService.mark_failed(job_id=job_id, error=str(e))
         raise
+    finally:
+        release_bulk_slot(job_id)
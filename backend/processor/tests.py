@@ -1,13 +1,58 @@
+import csv
+import gzip
+import hashlib
+import io
+import json
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter
+from unittest import skipUnless
 from unittest.mock import patch
 
+import redis
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, override_settings
 from django.utils.dateparse import parse_datetime
 from rest_framework.test import APITestCase
 
-from .models import ImportJob, ImportStatus
-from .processor import CSVProcessor
+from . import metrics, parallel
+from .aggregates import Aggregates, parse_aggregates
+from .benchmarks import STAGES, Dataset, compare, generate_csv, run_benchmarks
+from .chunking import split_byte_ranges
+from .duplicates import BLOOM, EXACT, OFF, BloomIdSet, SortedIdSet
+from .models import (
+    ImportedRecord,
+    ImportJob,
+    ImportRowError,
+    ImportSchema,
+    ImportStatus,
+    ImportUploadChunk,
+)
+from .processor import CSVProcessor, ImportCancelled
+from .progress import ProgressThrottle
+from .readers import CSVBlockReader, MmapBlockReader, arrow_available
+from .scheduling import pick_fair
+from .schemas import (
+    DEFAULT_COLUMNS,
+    DEFAULT_SCHEMA,
+    SchemaError,
+    compile_schema,
+    parse_columns,
+)
+from .serializers import ImportJobStatusSerializer
 from .services import ImportService
+from .tasks import assemble_upload, dispatch_bulk, enqueue_import, process_import
+from .uploads import UploadService
+from .validators import (
+    CSVBatchValidator,
+    CSVRowValidator,
+    EmailValidationCache,
+    validate_email,
+)
+from .writers import ImportRowErrorWriter
 
 csv_content = (
     b"id,name,email,amount\n1,name-1,foo@example.com,100\n2,name-2,bar@example.com,200"
@@ -18,7 +63,7 @@ csv_content_with_errors = b"id,name,email,amount\n1,name-2,bar@,200\n1,,baz@foo.
 
 @override_settings(API_KEY="test-key")
 class ImportUploadApiTest(APITestCase):
-    @patch("processor.api.process_import")
+    @patch("processor.api.enqueue_import")
     def test_upload_creates_job_and_returns_id(self, mock_task):
         file = SimpleUploadedFile("test.csv", csv_content, content_type="text/csv")
 
@@ -33,6 +78,69 @@ class ImportUploadApiTest(APITestCase):
         self.assertIn("id", response.data)
         self.assertTrue(ImportJob.objects.filter(id=response.data["id"]).exists())
 
+    @patch("processor.api.enqueue_import")
+    def test_upload_stores_content_hash_and_reuses_completed_job(self, mock_task):
+        def upload(**extra):
+            file = SimpleUploadedFile("test.csv", csv_content, content_type="text/csv")
+            return self.client.post(
+                "/api/imports/",
+                {"file": file, **extra},
+                format="multipart",
+                HTTP_X_API_KEY="test-key",
+            )
+
+        first = upload()
+        job = ImportJob.objects.get(id=first.data["id"])
+        self.assertEqual(job.sha256, hashlib.sha256(csv_content).hexdigest())
+
+        # Not completed yet, so the copy is processed on its own.
+        self.assertEqual(upload().status_code, 201)
+
+        ImportJob.objects.filter(id=job.id).update(status=ImportStatus.COMPLETED)
+        duplicate = upload()
+        self.assertEqual(duplicate.status_code, 200)
+        self.assertEqual(duplicate.data, {"id": job.id, "duplicate": True})
+
+        forced = upload(reprocess="true")
+        self.assertEqual(forced.status_code, 201)
+        self.assertNotEqual(forced.data["id"], job.id)
+        self.assertEqual(ImportJob.objects.count(), 3)
+
+    @patch("processor.api.enqueue_import")
+    def test_gzip_upload_is_checked_on_decompressed_head(self, mock_task):
+        for content, expected in (
+            (gzip.compress(csv_content), 201),
+            (gzip.compress(b"id,name\x00"), 400),
+            (b"not gzip at all", 400),
+        ):
+            file = SimpleUploadedFile(
+                "test.csv.gz", content, content_type="application/gzip"
+            )
+            response = self.client.post(
+                "/api/imports/",
+                {"file": file},
+                format="multipart",
+                HTTP_X_API_KEY="test-key",
+            )
+            self.assertEqual(response.status_code, expected)
+
+    @patch("processor.api.enqueue_import")
+    def test_octet_stream_is_only_accepted_for_compressed_names(self, mock_task):
+        for name, content, expected in (
+            ("test.csv", csv_content, 400),
+            ("test.csv.gz", gzip.compress(csv_content), 201),
+        ):
+            file = SimpleUploadedFile(
+                name, content, content_type="application/octet-stream"
+            )
+            response = self.client.post(
+                "/api/imports/",
+                {"file": file},
+                format="multipart",
+                HTTP_X_API_KEY="test-key",
+            )
+            self.assertEqual(response.status_code, expected)
+
     def test_upload_without_file_returns_400(self):
         response = self.client.post(
             "/api/imports/",
@@ -42,6 +150,57 @@ class ImportUploadApiTest(APITestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+    @patch("processor.api.enqueue_import")
+    def test_header_is_checked_before_the_job_is_queued(self, mock_enqueue):
+        ImportSchema.objects.create(
+            name="orders",
+            columns=DEFAULT_COLUMNS + [{"name": "currency", "type": "str"}],
+        )
+        for content, extra, error in (
+            (b"id,name,amount\n1,a,2\n", {}, "Missing columns: {'email'}"),
+            (b"\n1,a,a@example.com,2\n", {}, "Missing header"),
+            (csv_content, {"schema": "orders"}, "Missing columns: {'currency'}"),
+        ):
+            file = SimpleUploadedFile("test.csv", content, content_type="text/csv")
+            response = self.client.post(
+                "/api/imports/",
+                {"file": file, **extra},
+                format="multipart",
+                HTTP_X_API_KEY="test-key",
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data["file"], [error])
+
+        self.assertFalse(ImportJob.objects.exists())
+        mock_enqueue.assert_not_called()
+
+    @patch("processor.api.enqueue_import")
+    def test_upload_stores_row_estimate(self, mock_enqueue):
+        def upload(content: bytes) -> ImportJob:
+            file = SimpleUploadedFile("test.csv", content, content_type="text/csv")
+            response = self.client.post(
+                "/api/imports/",
+                {"file": file, "reprocess": "true"},
+                format="multipart",
+                HTTP_X_API_KEY="test-key",
+            )
+            return ImportJob.objects.get(id=response.data["id"])
+
+        small = upload(csv_content + b"\n\n")
+        self.assertEqual((small.total_rows, small.total_rows_estimated), (2, True))
+
+        large = upload(generate_csv(Dataset(rows=5000)))
+        self.assertAlmostEqual(large.total_rows, 5000, delta=250)
+
+        # Processing starts from the estimate and ends with the exact count.
+        processor = CSVProcessor(large)
+        processor.start()
+        large.refresh_from_db()
+        self.assertAlmostEqual(large.total_rows, 5000, delta=250)
+        processor.run()
+        large.refresh_from_db()
+        self.assertEqual((large.total_rows, large.total_rows_estimated), (5000, False))
+
 
 @override_settings(API_KEY="test-key")
 class ImportStatusApiTest(APITestCase):
@@ -71,6 +230,106 @@ class ImportStatusApiTest(APITestCase):
         self.assertIsNotNone(created_at)
         self.assertIsNotNone(updated_at)
 
+    def test_status_prefers_byte_progress_while_total_is_estimated(self):
+        job = ImportJob.objects.create(
+            file="imports/test.csv",
+            status=ImportStatus.PROCESSING,
+            total_rows=1000,
+            total_rows_estimated=True,
+            processed_rows=100,
+            file_size=4000,
+            bytes_processed=1000,
+        )
+
+        response = self.client.get(f"/api/imports/{job.id}/", HTTP_X_API_KEY="test-key")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["total_rows_estimated"])
+        self.assertEqual(response.data["row_progress"], 10)
+        self.assertEqual(response.data["byte_progress"], 25)
+        self.assertEqual(response.data["progress"], 25)
+
+    @patch("processor.services.progress_channel")
+    def test_status_reads_live_counters_while_processing(self, mock_channel):
+        mock_channel.read.return_value = {"processed_rows": 80, "success_rows": 75}
+        job = ImportJob.objects.create(
+            file="imports/test.csv",
+            status=ImportStatus.PROCESSING,
+            total_rows=100,
+            processed_rows=50,
+        )
+
+        response = self.client.get(f"/api/imports/{job.id}/", HTTP_X_API_KEY="test-key")
+
+        self.assertEqual(response.data["processed_rows"], 80)
+        self.assertEqual(response.data["success_rows"], 75)
+        self.assertEqual(response.data["progress"], 80)
+
+    @patch("processor.services.progress_channel")
+    def test_status_ignores_live_counters_for_finished_jobs(self, mock_channel):
+        job = ImportJob.objects.create(
+            file="imports/test.csv",
+            status=ImportStatus.COMPLETED,
+            total_rows=100,
+            processed_rows=100,
+        )
+
+        response = self.client.get(f"/api/imports/{job.id}/", HTTP_X_API_KEY="test-key")
+
+        self.assertEqual(response.data["processed_rows"], 100)
+        mock_channel.read.assert_not_called()
+
+    def test_status_returns_304_when_etag_matches(self):
+        job = ImportJob.objects.create(
+            file="imports/test.csv",
+            status=ImportStatus.PROCESSING,
+            total_rows=100,
+            processed_rows=50,
+        )
+        url = f"/api/imports/{job.id}/"
+
+        first = self.client.get(url, HTTP_X_API_KEY="test-key")
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+
+        second = self.client.get(
+            url, HTTP_X_API_KEY="test-key", HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(second.status_code, 304)
+
+        ImportJob.objects.filter(id=job.id).update(processed_rows=60)
+        third = self.client.get(
+            url, HTTP_X_API_KEY="test-key", HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third["ETag"], first["ETag"])
+
+    def test_finished_job_status_is_served_from_cache(self):
+        job = ImportJob.objects.create(
+            file="imports/test.csv", status=ImportStatus.COMPLETED, total_rows=2
+        )
+        url = f"/api/imports/{job.id}/"
+        self.client.get(url, HTTP_X_API_KEY="test-key")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_X_API_KEY="test-key")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_rows"], 2)
+
+    @patch("processor.services.cache")
+    def test_status_is_read_from_the_database_when_the_cache_is_down(self, mock_cache):
+        mock_cache.get.side_effect = redis.ConnectionError("down")
+        mock_cache.set.side_effect = redis.ConnectionError("down")
+        job = ImportJob.objects.create(
+            file="imports/test.csv", status=ImportStatus.COMPLETED, total_rows=2
+        )
+
+        response = self.client.get(f"/api/imports/{job.id}/", HTTP_X_API_KEY="test-key")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_rows"], 2)
+
     def test_status_returns_404_for_unknown_job(self):
         response = self.client.get(
             "/api/imports/00000000-0000-0000-0000-000000000000/",
@@ -79,6 +338,394 @@ class ImportStatusApiTest(APITestCase):
         self.assertEqual(response.status_code, 404)
 
 
+@override_settings(API_KEY="test-key")
+class ImportListApiTest(APITestCase):
+    def setUp(self):
+        self.jobs = [
+            ImportJob.objects.create(file="imports/test.csv") for _ in range(5)
+        ]
+        ImportJob.objects.filter(id__in=[j.id for j in self.jobs[:2]]).update(
+            status=ImportStatus.COMPLETED
+        )
+
+    def test_jobs_are_keyset_paginated(self):
+        seen = []
+        params = {"limit": 2}
+        while True:
+            response = self.client.get(
+                "/api/imports/", params, HTTP_X_API_KEY="test-key"
+            )
+            self.assertEqual(response.status_code, 200)
+            seen += [job["id"] for job in response.data["results"]]
+            if response.data["next"] is None:
+                break
+            params["cursor"] = response.data["next"]
+
+        expected = ImportJob.objects.order_by("created_at", "id")
+        self.assertEqual(seen, [job.id for job in expected])
+
+    def test_jobs_are_filtered_by_status_and_creation_time(self):
+        completed = self.client.get(
+            "/api/imports/", {"status": "completed"}, HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(len(completed.data["results"]), 2)
+
+        newest = ImportJob.objects.order_by("-created_at").first()
+        later = self.client.get(
+            "/api/imports/",
+            {"created_after": newest.created_at.isoformat()},
+            HTTP_X_API_KEY="test-key",
+        )
+        self.assertEqual(later.data["results"], [])
+
+    def test_invalid_filters_return_400(self):
+        for params in (
+            {"status": "nope"},
+            {"created_after": "x"},
+            {"cursor": "x"},
+            {"limit": 0},
+            {"limit": -1},
+        ):
+            response = self.client.get(
+                "/api/imports/", params, HTTP_X_API_KEY="test-key"
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_batch_status_returns_known_and_missing_jobs(self):
+        unknown = "00000000-0000-0000-0000-000000000000"
+        ids = [str(self.jobs[0].id), str(self.jobs[3].id), unknown]
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                "/api/imports/status/",
+                {"ids": ids},
+                format="json",
+                HTTP_X_API_KEY="test-key",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {str(job["id"]) for job in response.data["results"]}, set(ids[:2])
+        )
+        self.assertEqual([str(i) for i in response.data["missing"]], [unknown])
+
+
+@override_settings(API_KEY="test-key")
+class ImportErrorsApiTest(APITestCase):
+    def setUp(self):
+        self.job = ImportJob.objects.create(file="imports/test.csv")
+        ImportRowError.objects.bulk_create(
+            ImportRowError(job=self.job, row_number=n, column="id", code="invalid_id")
+            for n in (3, 7, 9)
+        )
+
+    def test_errors_are_keyset_paginated(self):
+        url = f"/api/imports/{self.job.id}/errors/"
+
+        first = self.client.get(url, {"limit": 2}, HTTP_X_API_KEY="test-key")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([e["row"] for e in first.data["results"]], [3, 7])
+        self.assertEqual(first.data["next"], 7)
+
+        second = self.client.get(
+            url, {"limit": 2, "after": first.data["next"]}, HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(
+            second.data["results"], [{"row": 9, "column": "id", "code": "invalid_id"}]
+        )
+        self.assertIsNone(second.data["next"])
+
+    def test_invalid_cursor_returns_400(self):
+        response = self.client.get(
+            f"/api/imports/{self.job.id}/errors/",
+            {"after": "abc"},
+            HTTP_X_API_KEY="test-key",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_zero_limit_returns_400(self):
+        response = self.client.get(
+            f"/api/imports/{self.job.id}/errors/",
+            {"limit": 0},
+            HTTP_X_API_KEY="test-key",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("limit", response.data)
+
+
+@override_settings(API_KEY="test-key", IMPORT_UPLOAD_CHUNK_SIZE=32)
+class UploadSessionApiTest(APITestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def _create(self, content: bytes, **extra) -> dict:
+        response = self.client.post(
+            "/api/uploads/",
+            {"filename": "big.csv", "size": len(content), **extra},
+            format="json",
+            HTTP_X_API_KEY="test-key",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def _put(self, upload_id, index: int, offset: int, body: bytes, **headers):
+        return self.client.put(
+            f"/api/uploads/{upload_id}/chunks/{index}/",
+            body,
+            content_type="application/octet-stream",
+            HTTP_X_API_KEY="test-key",
+            HTTP_UPLOAD_OFFSET=str(offset),
+            **headers,
+        )
+
+    @patch("processor.tasks.enqueue_import")
+    @patch("processor.api.assemble_upload")
+    def test_chunks_are_assembled_into_a_job(self, mock_assemble, mock_enqueue):
+        upload = self._create(
+            csv_content, sha256=hashlib.sha256(csv_content).hexdigest()
+        )
+        self.assertEqual(upload["total_chunks"], 3)
+
+        # Chunks may arrive in any order; a retried chunk replaces the first try.
+        for index in (2, 0, 1, 1):
+            start = index * 32
+            response = self._put(
+                upload["id"], index, start, csv_content[start : start + 32]
+            )
+            self.assertEqual(response.status_code, 200)
+
+        status = self.client.get(
+            f"/api/uploads/{upload['id']}/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(status.data["received"], [0, 1, 2])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "assembling")
+        self.assertIsNone(response.data["id"])
+        mock_assemble.delay.assert_called_once_with(str(upload["id"]))
+        self.assertFalse(ImportJob.objects.exists())
+
+        # Completing again while assembling queues nothing new.
+        again = self.client.post(
+            f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(again.status_code, 202)
+        self.assertEqual(mock_assemble.delay.call_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assemble_upload(str(upload["id"]))
+        job = ImportJob.objects.get()
+        self.assertEqual(job.file.read(), csv_content)
+        mock_enqueue.assert_called_once_with(job)
+        self.assertEqual((job.client, job.lane), ("default", "fast"))
+        self.assertFalse(
+            default_storage.exists(UploadService.part_name(upload["id"], 0))
+        )
+
+        done = self.client.post(
+            f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(done.status_code, 200)
+        self.assertEqual(done.data["id"], job.id)
+
+    @patch("processor.tasks.enqueue_import")
+    @patch("processor.api.assemble_upload")
+    def test_checksum_mismatch_reopens_the_upload(self, mock_assemble, mock_enqueue):
+        upload = self._create(csv_content, sha256="0" * 64)
+        for index in range(3):
+            start = index * 32
+            self._put(upload["id"], index, start, csv_content[start : start + 32])
+
+        response = self.client.post(
+            f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(response.status_code, 202)
+        assemble_upload(str(upload["id"]))
+
+        status = self.client.get(
+            f"/api/uploads/{upload['id']}/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(status.data["status"], "open")
+        self.assertEqual(status.data["error"], "File checksum does not match.")
+        self.assertEqual(status.data["received"], [0, 1, 2])
+        self.assertFalse(ImportJob.objects.exists())
+        mock_enqueue.assert_not_called()
+
+    @patch("processor.api.assemble_upload")
+    def test_assembling_a_known_file_reuses_the_completed_job(self, mock_assemble):
+        job = ImportJob.objects.create(
+            file="imports/test.csv",
+            sha256=hashlib.sha256(csv_content).hexdigest(),
+            status=ImportStatus.COMPLETED,
+        )
+        upload = self._create(csv_content)
+        for index in range(3):
+            start = index * 32
+            self._put(upload["id"], index, start, csv_content[start : start + 32])
+
+        response = self.client.post(
+            f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(response.status_code, 202)
+        assemble_upload(str(upload["id"]))
+
+        done = self.client.post(
+            f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(done.status_code, 200)
+        self.assertEqual(done.data["id"], job.id)
+        self.assertEqual(ImportJob.objects.count(), 1)
+
+    @patch("processor.tasks.enqueue_import")
+    @patch("processor.api.assemble_upload")
+    def test_a_declared_digest_alone_never_reuses_a_completed_job(
+        self, mock_assemble, mock_enqueue
+    ):
+        digest = hashlib.sha256(csv_content).hexdigest()
+        ImportJob.objects.create(
+            file="imports/test.csv", sha256=digest, status=ImportStatus.COMPLETED
+        )
+        # Other bytes, declared with the digest of the completed job.
+        content = csv_content.replace(b"100", b"999")
+        upload = self._create(content, sha256=digest)
+        for index in range(3):
+            start = index * 32
+            self._put(upload["id"], index, start, content[start : start + 32])
+
+        response = self.client.post(
+            f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertIsNone(response.data["id"])
+        assemble_upload(str(upload["id"]))
+
+        status = self.client.get(
+            f"/api/uploads/{upload['id']}/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(status.data["status"], "open")
+        self.assertIsNone(status.data["job"])
+        self.assertEqual(status.data["error"], "File checksum does not match.")
+        self.assertEqual(ImportJob.objects.count(), 1)
+        mock_enqueue.assert_not_called()
+
+    def test_chunk_stored_under_another_name_is_rejected(self):
+        upload = self._create(csv_content)
+        save = default_storage.save
+
+        def concurrent_save(name, content):
+            # Another request stored the same part first.
+            save(name, io.BytesIO(b"other"))
+            return save(name, content)
+
+        with patch.object(default_storage, "save", side_effect=concurrent_save):
+            response = self._put(upload["id"], 0, 0, csv_content[:32])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("index", response.data)
+        self.assertFalse(ImportUploadChunk.objects.exists())
+        # Only the other request's part is left.
+        _, files = default_storage.listdir(f"uploads/{upload['id']}")
+        self.assertEqual(files, ["0.part"])
+
+    def test_chunk_with_wrong_offset_or_size_is_rejected(self):
+        upload = self._create(csv_content)
+
+        self.assertEqual(
+            self._put(upload["id"], 1, 0, csv_content[:32]).status_code, 400
+        )
+        self.assertEqual(
+            self._put(upload["id"], 0, 0, csv_content[:40]).status_code, 400
+        )
+        self.assertEqual(
+            self._put(
+                upload["id"], 0, 0, csv_content[:32], HTTP_X_CHUNK_SHA256="0" * 64
+            ).status_code,
+            400,
+        )
+        self.assertEqual(ImportUploadChunk.objects.count(), 0)
+
+    def test_complete_with_a_bad_header_returns_400(self):
+        content = b"id,name,amount\n1,name-1,100\n"
+        upload = self._create(content)
+        self._put(upload["id"], 0, 0, content)
+
+        response = self.client.post(
+            f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_complete_with_missing_chunks_returns_400(self):
+        upload = self._create(csv_content)
+        self._put(upload["id"], 0, 0, csv_content[:32])
+
+        response = self.client.post(
+            f"/api/uploads/{upload['id']}/complete/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["missing"], [1, 2])
+
+
+@override_settings(API_KEY="test-key", IMPORT_EVENTS_INTERVAL=0)
+class ImportEventsTest(TestCase):
+    async def test_finished_job_streams_summary_event(self):
+        job = await ImportJob.objects.acreate(
+            file="imports/test.csv",
+            status=ImportStatus.COMPLETED,
+            total_rows=2,
+            processed_rows=2,
+            success_rows=2,
+        )
+
+        response = await self.async_client.get(
+            f"/api/imports/{job.id}/events", headers={"X-API-Key": "test-key"}
+        )
+        body = b"".join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        event, data = body.decode().strip().split("\n")
+        self.assertEqual(event, "event: summary")
+        self.assertEqual(json.loads(data.removeprefix("data: "))["success_rows"], 2)
+
+    @override_settings(IMPORT_EVENTS_MAX_AGE=0)
+    async def test_stream_is_closed_after_its_max_age(self):
+        job = await ImportJob.objects.acreate(
+            file="imports/test.csv", status=ImportStatus.PENDING
+        )
+
+        response = await self.async_client.get(
+            f"/api/imports/{job.id}/events", headers={"X-API-Key": "test-key"}
+        )
+        body = b"".join([chunk async for chunk in response.streaming_content])
+
+        events = body.decode().strip().split("\n\n")
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[0].startswith("event: progress\n"))
+        self.assertEqual(events[1], "retry: 0")
+
+    async def test_stream_requires_api_key(self):
+        response = await self.async_client.get(
+            "/api/imports/00000000-0000-0000-0000-000000000000/events"
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_stream_is_unavailable_under_wsgi(self):
+        response = self.client.get(
+            "/api/imports/00000000-0000-0000-0000-000000000000/events",
+            HTTP_X_API_KEY="test-key",
+        )
+        self.assertEqual(response.status_code, 501)
+
+
 @override_settings(API_KEY="test-key")
 class CSVProcessorTest(TestCase):
     def _make_job(self, csv_content: bytes) -> ImportJob:
@@ -95,6 +742,152 @@ class CSVProcessorTest(TestCase):
         self.assertEqual(job.success_rows, 2)
         self.assertEqual(job.failed_rows, 0)
 
+    def test_failed_block_is_left_out_of_the_total(self):
+        job = self._make_job(csv_content)
+        with patch.object(Aggregates, "update", side_effect=RuntimeError("boom")):
+            total_sum = CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(total_sum, 0)
+        self.assertEqual(job.error_counts, {"row_error": 2})
+
+    def test_single_pass_reports_exact_totals_and_bytes(self):
+        job = self._make_job(csv_content)
+        CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertFalse(job.total_rows_estimated)
+        self.assertEqual(job.total_rows, 2)
+        self.assertEqual(job.processed_rows, 2)
+        self.assertEqual(job.file_size, len(csv_content))
+        self.assertEqual(job.bytes_processed, len(csv_content))
+
+    def test_gzip_file_is_streamed_with_compressed_byte_progress(self):
+        compressed = gzip.compress(csv_content)
+        file = SimpleUploadedFile("test.csv.gz", compressed)
+        job = ImportJob.objects.create(file=file)
+        total_sum = CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(total_sum, 300.0)
+        self.assertEqual(job.success_rows, 2)
+        self.assertEqual(job.file_size, len(compressed))
+        self.assertEqual(job.bytes_processed, len(compressed))
+
+    @override_settings(IMPORT_METRICS_ENABLED=True)
+    def test_stage_timings_are_stored_and_returned(self):
+        job = self._make_job(csv_content)
+        CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(set(job.timings), set(metrics.STAGES))
+        self.assertGreater(sum(job.timings.values()), 0)
+        self.assertIsNotNone(job.started_at)
+        self.assertEqual(
+            ImportJobStatusSerializer.from_instance(job)["timings"], job.timings
+        )
+
+    @override_settings(IMPORT_METRICS_ENABLED=False)
+    def test_disabled_timers_record_nothing(self):
+        job = self._make_job(csv_content)
+        CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(set(job.timings.values()), {0})
+
+    def test_estimate_total_rows_from_bytes(self):
+        job = self._make_job(csv_content)
+        processor = CSVProcessor(job)
+        processor.file_size = 1000
+
+        self.assertEqual(processor.estimate_total_rows(50, 250), 200)
+        self.assertEqual(processor.estimate_total_rows(50, 0), 50)
+        self.assertEqual(processor.estimate_total_rows(50, 2000), 50)
+
+    @override_settings(IMPORT_RECORD_BATCH_SIZE=1)
+    def test_valid_rows_are_persisted(self):
+        job = self._make_job(csv_content_with_errors + b"\n" + csv_content[21:])
+        CSVProcessor(job).run()
+
+        records = list(
+            job.records.order_by("record_id").values_list(
+                "record_id", "name", "email", "amount"
+            )
+        )
+        self.assertEqual(
+            records,
+            [
+                (1, "name-1", "foo@example.com", 100.0),
+                (2, "name-2", "bar@example.com", 200.0),
+            ],
+        )
+
+    def test_rerun_replaces_persisted_rows(self):
+        job = self._make_job(csv_content)
+        CSVProcessor(job).run()
+        CSVProcessor(job).run()
+
+        self.assertEqual(job.records.count(), 2)
+
+    def test_copy_statement_quotes_column_names(self):
+        # "column" is reserved in PostgreSQL, so an unquoted COPY fails.
+        job = self._make_job(csv_content)
+        self.assertEqual(
+            ImportRowErrorWriter(job.id, 10).copy_sql(),
+            'COPY "processor_importrowerror" '
+            '("job_id", "chunk", "row_number", "column", "code") FROM STDIN',
+        )
+
+        writer = ImportRowErrorWriter(job.id, 10)
+        writer.add(3, "amount", "invalid_amount")
+        with patch("processor.writers.connection") as connection:
+            connection.vendor = "postgresql"
+            connection.ops.quote_name = lambda name: f'"{name}"'
+            cursor = connection.cursor.return_value.__enter__.return_value
+            writer.flush()
+        cursor.copy.assert_called_once_with(writer.copy_sql())
+        copy = cursor.copy.return_value.__enter__.return_value
+        copy.write_row.assert_called_once_with(
+            (job.id, 0, 3, "amount", "invalid_amount")
+        )
+
+    def test_interrupted_job_resumes_from_checkpoint(self):
+        job = self._make_job(csv_content)
+        first_row_end = csv_content.index(b"\n", 21) + 1
+        ImportJob.objects.filter(id=job.id).update(
+            status=ImportStatus.PROCESSING,
+            checkpoint={
+                "offset": first_row_end,
+                "rows": 1,
+                "success": 1,
+                "failed": 0,
+                "total_sum": 100.0,
+            },
+        )
+        # Row 2 was flushed after the checkpoint, before the worker died.
+        for row_number, amount in ((1, 100), (2, 200)):
+            ImportedRecord.objects.create(
+                job=job,
+                row_number=row_number,
+                record_id=row_number,
+                name=f"name-{row_number}",
+                email="foo@example.com",
+                amount=amount,
+            )
+
+        job.refresh_from_db()
+        total_sum = CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(total_sum, 300.0)
+        self.assertEqual(job.status, ImportStatus.COMPLETED)
+        self.assertEqual(job.success_rows, 2)
+        self.assertEqual(job.checkpoint, {})
+        self.assertEqual(
+            list(job.records.order_by("row_number").values_list("row_number", "email")),
+            [(1, "foo@example.com"), (2, "bar@example.com")],
+        )
+
     def test_invalid_rows_counted_as_failed(self):
         job = self._make_job(csv_content_with_errors)
         CSVProcessor(job).run()
@@ -104,14 +897,1235 @@ class CSVProcessorTest(TestCase):
         self.assertEqual(job.failed_rows, 3)
         self.assertEqual(job.success_rows, 0)
 
-    def test_status_transitions_to_processing_then_completed(self):
-        job = self._make_job(csv_content)
-        self.assertEqual(job.status, ImportStatus.PENDING)
+    def test_failed_rows_are_stored_as_compact_errors(self):
+        job = self._make_job(csv_content_with_errors)
+        CSVProcessor(job).run()
 
+        job.refresh_from_db()
+        self.assertEqual(
+            list(
+                job.row_errors.order_by("row_number").values_list(
+                    "row_number", "column", "code"
+                )
+            ),
+            [
+                (1, "email", "invalid_email"),
+                (2, "name", "missing_name"),
+                (3, "amount", "invalid_amount"),
+            ],
+        )
+        self.assertEqual(
+            job.error_counts,
+            {"invalid_email": 1, "missing_name": 1, "invalid_amount": 1},
+        )
+
+    def test_email_cache_stats_are_recorded_on_the_job(self):
+        job = self._make_job(csv_content)
         CSVProcessor(job).run()
 
         job.refresh_from_db()
-        self.assertEqual(job.status, ImportStatus.COMPLETED)
+        stats = job.email_cache_stats
+        self.assertEqual(set(stats), {"hits", "domain_hits", "misses"})
+        self.assertEqual(sum(stats.values()), 2)
+
+    @patch("processor.processor.progress_channel")
+    def test_progress_goes_to_redis_between_checkpoints(self, mock_channel):
+        mock_channel.publish.return_value = True
+        job = self._make_job(csv_content)
+        processor = CSVProcessor(job)
+        processor.start(file_size=100)
+        processor.live.interval = processor.checkpoint.interval = 0
+
+        processor.update_progress(10, 9, 1, 50)
+        mock_channel.publish.assert_called_once()
+        job.refresh_from_db()
+        self.assertEqual(job.processed_rows, 10)
+
+        processor.checkpoint.interval = 60
+        processor.update_progress(20, 18, 2, 80)
+        job.refresh_from_db()
+        self.assertEqual(job.processed_rows, 10)
+        self.assertEqual(mock_channel.publish.call_args.args[1]["processed_rows"], 20)
+
+    @patch("processor.processor.progress_channel")
+    def test_progress_falls_back_to_database_without_redis(self, mock_channel):
+        mock_channel.publish.return_value = False
+        job = self._make_job(csv_content)
+        processor = CSVProcessor(job)
+        processor.start(file_size=100)
+        processor.live.interval = 0
+
+        processor.update_progress(20, 18, 2, 80)
+
+        job.refresh_from_db()
+        self.assertEqual(job.processed_rows, 20)
+
+    def test_status_transitions_to_processing_then_completed(self):
+        job = self._make_job(csv_content)
+        self.assertEqual(job.status, ImportStatus.PENDING)
+
+        CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportStatus.COMPLETED)
+
+
+class CSVChunkingTest(TestCase):
+    def test_ranges_are_newline_aligned_and_respect_quotes(self):
+        data = b"id,name,email,amount\n" + b"".join(
+            b'%d,"name\n%d",foo@example.com,1\n' % (i, i) for i in range(1, 101)
+        )
+        fieldnames, ranges = split_byte_ranges(io.BytesIO(data), len(data), 64, 8)
+
+        self.assertEqual(fieldnames, ["id", "name", "email", "amount"])
+        self.assertEqual(len(ranges), 8)
+        self.assertEqual(ranges[0][0], len(b"id,name,email,amount\n"))
+        self.assertEqual(ranges[-1][1], len(data))
+
+        rows = []
+        for start, end in ranges:
+            self.assertEqual(data[start - 1 : start], b"\n")
+            rows.extend(csv.reader(io.StringIO(data[start:end].decode())))
+        self.assertEqual([r[0] for r in rows], [str(i) for i in range(1, 101)])
+
+    def test_chunks_merge_into_job_counters(self):
+        file = SimpleUploadedFile(
+            "test.csv", csv_content_with_errors + b"\n" + csv_content[21:]
+        )
+        job = ImportJob.objects.create(file=file)
+        processor = CSVProcessor(job)
+        fieldnames, ranges = processor.plan_chunks(chunk_size=1, max_chunks=2)
+        processor.start(job.file.size)
+
+        results = [
+            CSVProcessor(job).run_chunk(index, start, end, fieldnames)
+            for index, (start, end) in enumerate(ranges)
+        ]
+        job.refresh_from_db()
+        self.assertEqual(job.processed_rows, 5)
+
+        total = CSVProcessor(job).finish_chunks(results)
+
+        job.refresh_from_db()
+        self.assertEqual(len(ranges), 2)
+        self.assertEqual(total, 300.0)
+        self.assertEqual(job.status, ImportStatus.COMPLETED)
+        self.assertEqual(job.total_rows, 5)
+        self.assertEqual(job.success_rows, 2)
+        self.assertEqual(job.failed_rows, 3)
+
+    @override_settings(IMPORT_CHUNKED=True, IMPORT_CHUNK_SIZE=1, IMPORT_MAX_CHUNKS=2)
+    @patch("processor.tasks.chord")
+    def test_redelivered_task_does_not_dispatch_chunks_twice(self, mock_chord):
+        file = SimpleUploadedFile("test.csv", csv_content_with_errors)
+        job = ImportJob.objects.create(file=file)
+
+        process_import(str(job.id))
+        process_import(str(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(mock_chord.call_count, 1)
+        self.assertEqual(job.status, ImportStatus.PROCESSING)
+        self.assertEqual(job.checkpoint, {"chunks": 2})
+
+
+class DuplicateIdsTest(TestCase):
+    def _run(self, content: bytes) -> ImportJob:
+        job = ImportJob.objects.create(file=SimpleUploadedFile("t.csv", content))
+        CSVProcessor(job).run()
+        job.refresh_from_db()
+        return job
+
+    def test_sorted_id_set_spills_to_disk_and_stays_exact(self):
+        ids = [(i * 7919) % 5003 + 1 for i in range(20000)]
+        id_set = SortedIdSet(memory=1024, buffer=256)
+        repeated = []
+        for start in range(0, len(ids), 500):
+            repeated.extend(start + k for k in id_set.add(ids[start : start + 500]))
+
+        seen: set[int] = set()
+        expected = []
+        for position, id_ in enumerate(ids):
+            if id_ in seen:
+                expected.append(position)
+            seen.add(id_)
+        self.assertEqual(repeated, expected)
+        self.assertTrue(any(run.map is not None for run in id_set.runs))
+        id_set.close()
+
+    def test_bloom_id_set_never_misses_a_duplicate(self):
+        id_set = BloomIdSet(memory=1024)
+        self.assertEqual(id_set.add(range(1, 501)), [])
+        self.assertEqual(id_set.add([7, 7, 250]), [0, 1, 2])
+
+    def test_duplicate_ids_become_row_errors(self):
+        content = b"id,name,email,amount\n" + b"".join(
+            b"%d,n,a@example.com,%d\n" % (id_, row)
+            for row, id_ in enumerate((1, 2, 1, 3, 2), start=1)
+        )
+        for mode in (EXACT, BLOOM):
+            with self.subTest(mode=mode), override_settings(IMPORT_DUPLICATE_IDS=mode):
+                job = self._run(content)
+                self.assertEqual((job.success_rows, job.failed_rows), (3, 2))
+                self.assertEqual(job.error_counts, {"duplicate_id": 2})
+                self.assertEqual(
+                    list(
+                        job.row_errors.order_by("row_number").values_list(
+                            "row_number", "column"
+                        )
+                    ),
+                    [(3, "id"), (5, "id")],
+                )
+
+        with override_settings(IMPORT_DUPLICATE_IDS=OFF):
+            self.assertEqual(self._run(content).success_rows, 5)
+
+    def test_resumed_job_remembers_stored_ids(self):
+        content = b"id,name,email,amount\n1,n,a@example.com,1\n1,n,a@example.com,2\n"
+        offset = content.index(b"1,n,a@example.com,2")
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("t.csv", content),
+            status=ImportStatus.PROCESSING,
+            checkpoint={
+                "offset": offset,
+                "bytes": offset,
+                "rows": 1,
+                "success": 1,
+                "failed": 0,
+                "total_sum": 1.0,
+            },
+        )
+        ImportedRecord.objects.create(
+            job=job,
+            row_number=1,
+            record_id=1,
+            name="n",
+            email="a@example.com",
+            amount=1,
+        )
+        total_sum = CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(total_sum, 1.0)
+        self.assertEqual((job.success_rows, job.failed_rows), (1, 1))
+
+    def test_duplicates_across_chunks_keep_the_first_row(self):
+        content = b"id,name,email,amount\n" + b"".join(
+            b"%d,n,a@example.com,%d\n" % (id_, row)
+            for row, id_ in enumerate((1, 2, 3, 4, 2, 5, 1, 6), start=1)
+        )
+        job = ImportJob.objects.create(file=SimpleUploadedFile("t.csv", content))
+        processor = CSVProcessor(job)
+        fieldnames, ranges = processor.plan_chunks(chunk_size=1, max_chunks=2)
+        processor.start(job.file.size)
+        results = [
+            CSVProcessor(job).run_chunk(index, start, end, fieldnames)
+            for index, (start, end) in enumerate(ranges)
+        ]
+        total = CSVProcessor(job).finish_chunks(results)
+
+        job.refresh_from_db()
+        self.assertEqual(len(ranges), 2)
+        self.assertEqual(total, 1 + 2 + 3 + 4 + 6 + 8)
+        self.assertEqual((job.success_rows, job.failed_rows), (6, 2))
+        self.assertEqual(
+            list(
+                job.row_errors.order_by("row_number").values_list("row_number", "code")
+            ),
+            [(5, "duplicate_id"), (7, "duplicate_id")],
+        )
+        self.assertEqual(
+            sorted(job.records.values_list("record_id", flat=True)), [1, 2, 3, 4, 5, 6]
+        )
+
+    def test_finishing_the_chunks_again_changes_nothing(self):
+        content = b"id,name,email,amount\n" + b"".join(
+            b"%d,n,a@example.com,%d\n" % (id_, row)
+            for row, id_ in enumerate((1, 2, 3, 4, 2, 5, 1, 6), start=1)
+        )
+        job = ImportJob.objects.create(file=SimpleUploadedFile("t.csv", content))
+        processor = CSVProcessor(job)
+        fieldnames, ranges = processor.plan_chunks(chunk_size=1, max_chunks=2)
+        processor.start(job.file.size)
+        results = [
+            CSVProcessor(job).run_chunk(index, start, end, fieldnames)
+            for index, (start, end) in enumerate(ranges)
+        ]
+        CSVProcessor(job).finish_chunks(results)
+        # A redelivered chord callback gets the same results.
+        self.assertIsNone(CSVProcessor(job).finish_chunks(results))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportStatus.COMPLETED)
+        self.assertEqual((job.success_rows, job.failed_rows), (6, 2))
+        self.assertEqual(
+            list(
+                job.row_errors.order_by("row_number").values_list("row_number", "code")
+            ),
+            [(5, "duplicate_id"), (7, "duplicate_id")],
+        )
+        self.assertEqual(job.records.count(), 6)
+
+    def test_aggregates_leave_out_duplicates_across_chunks(self):
+        schema = ImportSchema.objects.create(
+            name="deduped",
+            columns=DEFAULT_COLUMNS + [{"name": "region", "type": "str"}],
+            aggregates=[
+                {"name": "rows", "type": "count"},
+                {"name": "amount_max", "type": "max", "column": "amount"},
+                {
+                    "name": "by_region",
+                    "type": "sum",
+                    "column": "amount",
+                    "group_by": "region",
+                },
+            ],
+        )
+        # Rows 5 and 7 repeat ids of the first chunk and carry the largest amounts.
+        rows = ((1, 1), (2, 2), (3, 3), (4, 4), (2, 50), (5, 6), (1, 70), (6, 8))
+        content = b"id,name,email,amount,region\n" + b"".join(
+            b"%d,n,a@example.com,%d,%s\n" % (id_, amount, b"eu" if id_ % 2 else b"us")
+            for id_, amount in rows
+        )
+
+        def aggregates(job: ImportJob) -> dict:
+            return {a.name: a.value for a in ImportService.list_aggregates(job)}
+
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("t.csv", content), schema=schema
+        )
+        processor = CSVProcessor(job)
+        fieldnames, ranges = processor.plan_chunks(chunk_size=1, max_chunks=2)
+        processor.start(job.file.size)
+        results = [
+            CSVProcessor(job).run_chunk(index, start, end, fieldnames)
+            for index, (start, end) in enumerate(ranges)
+        ]
+        job.refresh_from_db()
+        CSVProcessor(job).finish_chunks(results)
+
+        self.assertEqual(len(ranges), 2)
+        self.assertEqual(
+            list(job.row_errors.order_by("row_number").values_list("row_number")),
+            [(5,), (7,)],
+        )
+        chunked = aggregates(job)
+        self.assertEqual(chunked["rows"], 6)
+        self.assertEqual(chunked["amount_max"], 8)
+        self.assertEqual(chunked["by_region"], {"eu": 1 + 3 + 6, "us": 2 + 4 + 8})
+
+        single = ImportJob.objects.create(
+            file=SimpleUploadedFile("t.csv", content), schema=schema
+        )
+        CSVProcessor(single).run()
+        self.assertEqual(aggregates(single), chunked)
+
+
+@override_settings(API_KEY="test-key", IMPORT_MMAP=False)
+class CancelImportTest(APITestCase):
+    content = b"id,name,email,amount\n" + b"".join(
+        b"%d,n,a@example.com,1\n" % i for i in range(1, 7)
+    )
+
+    def _make_job(self, **fields) -> ImportJob:
+        return ImportJob.objects.create(
+            file=SimpleUploadedFile("t.csv", self.content), **fields
+        )
+
+    def _cancel(self, job: ImportJob):
+        return self.client.post(
+            f"/api/imports/{job.id}/cancel", HTTP_X_API_KEY="test-key"
+        )
+
+    def test_pending_job_is_cancelled_before_it_starts(self):
+        job = self._make_job()
+        response = self._cancel(job)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], ImportStatus.CANCELLED)
+        self.assertTrue(response.data["cancel_requested"])
+
+        process_import(str(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportStatus.CANCELLED)
+        self.assertIsNone(job.started_at)
+        self.assertFalse(job.records.exists())
+        self.assertEqual(self._cancel(job).status_code, 202)
+
+    def test_finished_job_cannot_be_cancelled(self):
+        job = self._make_job(status=ImportStatus.COMPLETED)
+        self.assertEqual(self._cancel(job).status_code, 409)
+
+    def test_running_job_stops_at_a_block_boundary(self):
+        job = self._make_job()
+        processor = CSVProcessor(job)
+        processor.VALIDATION_BLOCK_SIZE = 2
+        processor.cancel_check.interval = 0
+        check = processor.cancel_requested
+        responses = []
+
+        def cancel_requested() -> bool:
+            # The request arrives just after the check before the first block.
+            if not responses:
+                responses.append(self._cancel(job))
+                return False
+            return check()
+
+        processor.cancel_requested = cancel_requested
+        with self.assertRaises(ImportCancelled):
+            processor.run()
+
+        self.assertEqual(responses[0].data["status"], ImportStatus.PROCESSING)
+        self.assertTrue(responses[0].data["cancel_requested"])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportStatus.CANCELLED)
+        self.assertEqual((job.processed_rows, job.success_rows), (2, 2))
+        self.assertEqual(job.records.count(), 2)
+        self.assertEqual(job.checkpoint, {})
+
+    def test_cancel_after_the_task_read_the_job_is_not_overwritten(self):
+        job = self._make_job()
+        processor = CSVProcessor(job)
+        ImportService.cancel(job)
+
+        with self.assertRaises(ImportCancelled):
+            processor.run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportStatus.CANCELLED)
+        self.assertIsNone(job.started_at)
+        self.assertFalse(job.records.exists())
+
+    def test_resumed_job_with_a_cancel_request_stops_before_reading(self):
+        offset = self.content.index(b"2,n,")
+        job = self._make_job(
+            status=ImportStatus.PROCESSING,
+            checkpoint={
+                "offset": offset,
+                "bytes": offset,
+                "rows": 1,
+                "success": 1,
+                "failed": 0,
+                "total_sum": 1.0,
+            },
+        )
+        ImportService.cancel(job)
+
+        with self.assertRaises(ImportCancelled):
+            CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportStatus.CANCELLED)
+        self.assertEqual((job.processed_rows, job.success_rows), (1, 1))
+        self.assertFalse(job.records.exists())
+
+    def test_cancelled_chunks_mark_the_job_cancelled(self):
+        job = self._make_job()
+        processor = CSVProcessor(job)
+        fieldnames, ranges = processor.plan_chunks(chunk_size=1, max_chunks=2)
+        processor.start(job.file.size)
+        ImportService.cancel(job)
+
+        results = [
+            CSVProcessor(job).run_chunk(index, start, end, fieldnames)
+            for index, (start, end) in enumerate(ranges)
+        ]
+        self.assertTrue(all(r["cancelled"] and r["processed"] == 0 for r in results))
+        with self.assertRaises(ImportCancelled):
+            CSVProcessor(job).finish_chunks(results)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportStatus.CANCELLED)
+        self.assertFalse(job.aggregates.exists())
+
+
+@override_settings(API_KEY="test-key")
+class AggregatesTest(APITestCase):
+    content = (
+        b"id,name,email,amount\n"
+        b"1,name-1,a@Example.com,10\n"
+        b"2,name-2,b@example.com,20.5\n"
+        b"3,name-3,bad@,30\n"
+        b"4,name-4,a@other.org,5\n"
+        b"5,name-5,c@other.org,-1\n"
+        b"6,name-6,a@Example.com,7\n"
+    )
+
+    def aggregates(self, specs: list) -> Aggregates:
+        return Aggregates(parse_aggregates(specs, DEFAULT_SCHEMA.columns))
+
+    def test_partial_states_merge_into_the_one_pass_result(self):
+        specs = [
+            {"name": "n", "type": "count"},
+            {"name": "stats", "type": "stats", "column": "amount"},
+            {"name": "low", "type": "min", "column": "amount"},
+            {"name": "ids", "type": "distinct", "column": "id"},
+            {
+                "name": "by_domain",
+                "type": "sum",
+                "column": "amount",
+                "group_by": "email",
+                "group_key": "domain",
+            },
+        ]
+        amounts = [float(i % 97) for i in range(20_000)]
+        columns = {
+            "id": list(range(20_000)),
+            "amount": amounts,
+            "email": [f"u@d{i % 3}.com" for i in range(20_000)],
+        }
+        whole = self.aggregates(specs)
+        whole.update(columns, list(range(20_000)))
+
+        halves = [self.aggregates(specs) for _ in range(2)]
+        halves[0].update(columns, list(range(0, 20_000, 2)))
+        halves[1].update(columns, list(range(1, 20_000, 2)))
+        merged = self.aggregates(specs)
+        for half in halves:
+            merged.merge(json.loads(json.dumps(half.state())))
+
+        results = {r["name"]: r["value"] for r in merged.results()}
+        expected = {r["name"]: r["value"] for r in whole.results()}
+        stats = results.pop("stats")
+        for stat, value in expected.pop("stats").items():
+            self.assertAlmostEqual(stats[stat], value)
+        self.assertEqual(results, expected)
+        self.assertEqual(results["n"], 20_000)
+        self.assertAlmostEqual(stats["mean"], statistics.mean(amounts))
+        self.assertAlmostEqual(stats["variance"], statistics.variance(amounts))
+        self.assertEqual(results["low"], 0.0)
+        self.assertAlmostEqual(results["ids"], 20_000, delta=20_000 * 0.05)
+        self.assertEqual(sorted(results["by_domain"]), ["d0.com", "d1.com", "d2.com"])
+
+    def test_groups_past_the_limit_are_folded_together(self):
+        aggregates = self.aggregates(
+            [{"name": "n", "type": "count", "group_by": "name", "max_groups": 2}]
+        )
+        aggregates.update({"name": ["a", "b", "c", "a", "d"]}, [0, 1, 2, 3, 4])
+
+        [result] = aggregates.results()
+        self.assertEqual(result["value"], {"a": 2, "b": 1, "__other__": 2})
+
+    def test_invalid_aggregates_are_rejected(self):
+        for specs, message in (
+            ({}, "Aggregates must be a list."),
+            ([{"name": "x", "type": "median"}], "type must be one of"),
+            ([{"name": "x", "type": "sum"}], "sum needs a column"),
+            ([{"name": "x", "type": "sum", "column": "email"}], "numeric column"),
+            (
+                [
+                    {
+                        "name": "x",
+                        "type": "count",
+                        "group_by": "name",
+                        "group_key": "domain",
+                    }
+                ],
+                "domain groups need an email column",
+            ),
+            ([{"name": "x", "type": "count"}] * 2, "must be unique"),
+        ):
+            with self.assertRaisesMessage(SchemaError, message):
+                parse_aggregates(specs, DEFAULT_SCHEMA.columns)
+
+    def test_completed_job_stores_default_aggregates(self):
+        job = ImportJob.objects.create(file=SimpleUploadedFile("t.csv", self.content))
+        CSVProcessor(job).run()
+
+        response = self.client.get(
+            f"/api/imports/{job.id}/aggregates/", HTTP_X_API_KEY="test-key"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], ImportStatus.COMPLETED)
+        results = {r["name"]: r["value"] for r in response.data["results"]}
+        self.assertEqual(results["rows"], 4)
+        self.assertEqual(results["amount_sum"], 42.5)
+        self.assertEqual((results["amount_min"], results["amount_max"]), (5, 20.5))
+        self.assertEqual(results["distinct_emails"], 3)
+        self.assertEqual(
+            results["amount_by_domain"], {"example.com": 37.5, "other.org": 5}
+        )
+
+    def test_schema_aggregates_survive_chunks_and_resume(self):
+        schema = ImportSchema.objects.create(
+            name="regional",
+            columns=DEFAULT_COLUMNS + [{"name": "region", "type": "str"}],
+            aggregates=[
+                {
+                    "name": "by_region",
+                    "type": "stats",
+                    "column": "amount",
+                    "group_by": "region",
+                }
+            ],
+        )
+        content = b"id,name,email,amount,region\n" + b"".join(
+            b"%d,n,u%d@example.com,%d,%s\n" % (i, i, i, b"eu" if i % 2 else b"us")
+            for i in range(1, 41)
+        )
+        expected = {
+            "eu": statistics.mean(range(1, 41, 2)),
+            "us": statistics.mean(range(2, 41, 2)),
+        }
+
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("t.csv", content), schema=schema
+        )
+        processor = CSVProcessor(job)
+        fieldnames, ranges = processor.plan_chunks(chunk_size=1, max_chunks=3)
+        processor.start(job.file.size)
+        results = [
+            CSVProcessor(job).run_chunk(index, start, end, fieldnames)
+            for index, (start, end) in enumerate(ranges)
+        ]
+        job.refresh_from_db()
+        CSVProcessor(job).finish_chunks(results)
+        [chunked] = ImportService.list_aggregates(job)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(
+            {region: stats["mean"] for region, stats in chunked.value.items()},
+            expected,
+        )
+
+        # A resumed job picks up the aggregates of the rows before its checkpoint.
+        first = Aggregates.for_schema(schema, compile_schema(schema).columns)
+        first.update({"amount": [1], "region": ["eu"]}, [0])
+        offset = content.index(b"2,n,")
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("t.csv", content),
+            schema=schema,
+            status=ImportStatus.PROCESSING,
+            checkpoint={
+                "offset": offset,
+                "bytes": offset,
+                "rows": 1,
+                "success": 1,
+                "failed": 0,
+                "total_sum": 1.0,
+                "aggregates": first.state(),
+            },
+        )
+        CSVProcessor(job).run()
+        [resumed] = ImportService.list_aggregates(job)
+        self.assertEqual(resumed.value, chunked.value)
+
+
+class ReaderBackendTest(TestCase):
+    content = (
+        b"id,name,email,amount,extra\n"
+        b'1,"name, 1",foo@example.com,100,x\n'
+        b"\n"
+        b"2,name-2,bar@,200,y\n"
+        b"3,name-3,baz@example.com,-1,z\n"
+        b"4,name-4,qux@example.com,50,w\n"
+    )
+
+    def run_job(self, reader: str, **fields) -> ImportJob:
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", self.content), reader=reader, **fields
+        )
+        CSVProcessor(job).run()
+        job.refresh_from_db()
+        return job
+
+    def test_csv_blocks_are_split_into_schema_columns(self):
+        reader = CSVBlockReader(io.BytesIO(self.content), block_rows=3)
+        validator = DEFAULT_SCHEMA.bind(reader.read_header())
+
+        blocks = list(reader.blocks(validator))
+
+        self.assertEqual([size for size, _ in blocks], [3, 1])
+        self.assertEqual(blocks[0][1][0], ["1", "2", "3"])
+        self.assertEqual(blocks[0][1][1], ["name, 1", "name-2", "name-3"])
+
+    def test_csv_reader_skips_rows_without_an_offset(self):
+        reader = CSVBlockReader(io.BytesIO(self.content), block_rows=10)
+        validator = DEFAULT_SCHEMA.bind(reader.read_header())
+        reader.skip(None, 2)
+
+        [(size, columns)] = list(reader.blocks(validator))
+        self.assertEqual(columns[0], ["3", "4"])
+
+    @skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_arrow_reader_matches_csv_reader(self):
+        results = []
+        for reader in ("csv", "arrow"):
+            job = self.run_job(reader)
+            results.append(
+                (
+                    job.success_rows,
+                    job.failed_rows,
+                    job.error_counts,
+                    job.bytes_processed,
+                    list(job.records.values_list("row_number", "name", "amount")),
+                    list(job.row_errors.values_list("row_number", "column", "code")),
+                )
+            )
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][:2], (2, 2))
+
+    @skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_arrow_checkpoint_resumes_by_row_count(self):
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", self.content),
+            reader="arrow",
+            status=ImportStatus.PROCESSING,
+            checkpoint={
+                "offset": None,
+                "bytes": 40,
+                "rows": 2,
+                "success": 1,
+                "failed": 1,
+                "total_sum": 100.0,
+            },
+        )
+        CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual((job.processed_rows, job.success_rows), (4, 2))
+        self.assertEqual(list(job.records.values_list("row_number", flat=True)), [4])
+
+    @skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_arrow_reads_byte_range_chunks(self):
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", self.content), reader="arrow"
+        )
+        processor = CSVProcessor(job)
+        fieldnames, ranges = processor.plan_chunks(chunk_size=1, max_chunks=2)
+        processor.start(job.file.size)
+        results = [
+            CSVProcessor(job).run_chunk(index, start, end, fieldnames)
+            for index, (start, end) in enumerate(ranges)
+        ]
+        job.refresh_from_db()
+        CSVProcessor(job).finish_chunks(results)
+
+        job.refresh_from_db()
+        self.assertEqual(len(ranges), 2)
+        self.assertEqual((job.success_rows, job.failed_rows), (2, 2))
+        self.assertEqual(job.bytes_processed, len(self.content))
+
+
+class MmapReaderTest(TestCase):
+    content = (
+        b"id,name,email,amount\r\n"
+        b"1,name-1,foo@example.com,100\r\n"
+        b"\r\n"
+        b"2,name-2,bar@,200\r\n"
+        b'3,"multi\nline",baz@example.com,-1\r\n'
+        b"4,name-4\r\n"
+        b"5,name-5,qux@example.com,25.5"
+    )
+
+    def run_job(self, mmap: bool) -> tuple:
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", self.content)
+        )
+        with override_settings(IMPORT_MMAP=mmap):
+            total = CSVProcessor(job).run()
+        job.refresh_from_db()
+        return (
+            total,
+            job.success_rows,
+            job.failed_rows,
+            job.error_counts,
+            job.bytes_processed,
+            list(job.records.values_list("row_number", "name", "amount")),
+            list(job.row_errors.values_list("row_number", "column", "code")),
+        )
+
+    def read(self, reader) -> list:
+        validator = DEFAULT_SCHEMA.bind(reader.read_header())
+        return [
+            validator.validate_columns(values, size)
+            for size, values in reader.blocks(validator)
+        ]
+
+    def test_blocks_match_streaming_reader(self):
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", self.content)
+        )
+        path = job.file.path
+
+        for block_size in (8, 1024):
+            mapped = self.read(MmapBlockReader(path, block_size))
+            streamed = self.read(CSVBlockReader(io.BytesIO(self.content), 1024))
+            merged = [
+                sum((columns[name] for columns, _ in mapped), [])
+                for name in DEFAULT_SCHEMA.names
+            ]
+            errors = sum((errors for _, errors in mapped), [])
+
+            self.assertEqual(merged, [streamed[0][0][n] for n in DEFAULT_SCHEMA.names])
+            self.assertEqual(errors, streamed[0][1])
+
+    def test_processor_results_match_without_mmap(self):
+        mapped, streamed = self.run_job(True), self.run_job(False)
+
+        self.assertEqual(mapped, streamed)
+        self.assertEqual(mapped[1:3], (2, 3))
+        self.assertEqual(mapped[4], len(self.content))
+
+    def test_resumes_from_checkpoint_offset(self):
+        offset = self.content.index(b"2,name-2")
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", self.content),
+            status=ImportStatus.PROCESSING,
+            checkpoint={
+                "offset": offset,
+                "bytes": offset,
+                "rows": 1,
+                "success": 1,
+                "failed": 0,
+                "total_sum": 100.0,
+            },
+        )
+        CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual((job.processed_rows, job.success_rows), (5, 2))
+        self.assertEqual(list(job.records.values_list("row_number", flat=True)), [5])
+
+
+class ValidationPoolTest(TestCase):
+    content = (
+        b"id,name,email,amount\n"
+        b'1,"multi\nline",foo@example.com,100\n'
+        b"2,name-2,bar@,200\n"
+        b'3,"quoted ""name""",baz@example.com,-1\n'
+        b"\n"
+        b"4,name-4,qux@example.com,50\n"
+        b"5,name-5,qux@example.com,25"
+    )
+
+    def tearDown(self):
+        parallel.shutdown()
+
+    def test_blocks_end_on_row_boundaries(self):
+        header = self.content.index(b"\n") + 1
+        raw = io.BytesIO(self.content)
+        raw.seek(header)
+
+        blocks = list(parallel.split_rows(raw, header, block_size=16))
+
+        self.assertEqual(b"".join(data for data, _ in blocks), self.content[header:])
+        self.assertEqual(blocks[-1][1], len(self.content))
+        for data, end in blocks:
+            self.assertEqual(self.content[end - len(data) : end], data)
+            self.assertEqual(data.count(b'"') % 2, 0)
+
+    def test_pool_results_match_serial_processing(self):
+        results = []
+        for workers in (0, 2):
+            job = ImportJob.objects.create(
+                file=SimpleUploadedFile("test.csv", self.content)
+            )
+            with override_settings(
+                IMPORT_POOL_WORKERS=workers, IMPORT_POOL_BLOCK_SIZE=32
+            ):
+                total = CSVProcessor(job).run()
+            job.refresh_from_db()
+            results.append(
+                (
+                    total,
+                    job.success_rows,
+                    job.failed_rows,
+                    job.error_counts,
+                    list(job.records.values_list("row_number", "name")),
+                    list(job.row_errors.values_list("row_number", "code")),
+                )
+            )
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][:3], (175.0, 3, 2))
+
+
+class BenchmarkTest(TestCase):
+    def test_generator_is_deterministic(self):
+        dataset = Dataset(rows=200, error_ratio=0.5, extra_columns=2, seed=7)
+        data = generate_csv(dataset)
+
+        self.assertEqual(data, generate_csv(dataset))
+        self.assertNotEqual(data, generate_csv(Dataset(rows=200, seed=8)))
+        rows = list(csv.DictReader(io.StringIO(data.decode())))
+        self.assertEqual(len(rows), 200)
+        self.assertEqual(len(rows[0]), 6)
+
+    def test_stages_report_throughput_and_queries(self):
+        results = run_benchmarks([Dataset(rows=50, error_ratio=0.1)])
+
+        self.assertEqual([r["stage"] for r in results], list(STAGES))
+        end_to_end = results[-1]
+        self.assertGreater(end_to_end["rows_per_sec"], 0)
+        self.assertGreater(end_to_end["queries_per_10k_rows"], 0)
+        self.assertEqual(ImportJob.objects.count(), 0)
+
+        changes = compare(results, [{**end_to_end, "rows_per_sec": 1}])
+        self.assertEqual(len(changes), 1)
+        self.assertGreater(changes[0]["change"], 0)
+
+
+class CSVBatchValidatorTest(TestCase):
+    rows = [
+        {"id": "1", "name": "name-1", "email": "foo@example.com", "amount": "100"},
+        {"id": "x", "name": "name-2", "email": "foo@example.com", "amount": "1"},
+        {"id": "-3", "name": "name-3", "email": "foo@example.com", "amount": "1"},
+        {"id": "4", "name": "  ", "email": "foo@example.com", "amount": "1"},
+        {"id": "5", "name": "name-5", "email": "bar@", "amount": "1"},
+        {"id": "6", "name": "name-6", "email": "foo@example.com", "amount": "asd"},
+        {"id": "7", "name": "name-7", "email": "foo@example.com", "amount": "-1"},
+        {"id": "8", "name": "name-8", "email": "foo@example.com", "amount": "nan"},
+        {"id": "9", "name": "name-9", "email": "foo@example.com", "amount": "inf"},
+        {"id": None, "name": None, "email": None, "amount": None},
+    ]
+
+    def test_errors_match_row_validator(self):
+        _, errors = CSVBatchValidator.validate_rows(self.rows)
+
+        expected = []
+        for row in self.rows:
+            try:
+                CSVRowValidator.validate_row(row)
+                expected.append(None)
+            except (ValueError, SyntaxError) as exc:
+                expected.append(str(exc))
+
+        self.assertEqual([error and error[1] for error in errors], expected)
+        self.assertEqual(
+            [error and error[0] for error in errors],
+            [None, "id", "id", "name", "email", "amount", "amount", "amount"]
+            + ["amount", "id"],
+        )
+        self.assertIsNone(errors[0])
+        self.assertTrue(all(errors[1:]))
+
+    def test_non_finite_amounts_are_invalid(self):
+        _, errors = CSVBatchValidator.validate_rows(self.rows[7:9])
+
+        self.assertEqual(errors, [("amount", "Invalid amount")] * 2)
+
+    def test_valid_block_is_parsed_column_wise(self):
+        columns, errors = CSVBatchValidator.validate_rows(self.rows[:1] * 3)
+
+        self.assertEqual(errors, [None] * 3)
+        self.assertEqual(columns["id"], [1, 1, 1])
+        self.assertEqual(columns["amount"], [100.0] * 3)
+
+
+class ImportSchemaTest(TestCase):
+    columns = [
+        {"name": "id", "type": "int", "min": 1},
+        {"name": "name", "type": "str", "max_length": 6},
+        {"name": "email", "type": "email"},
+        {"name": "amount", "type": "float", "min": 0, "max": 500},
+        {"name": "currency", "type": "str", "choices": ["EUR", "USD"]},
+        {"name": "note", "type": "str", "required": False},
+    ]
+
+    def test_default_schema_matches_batch_validator(self):
+        rows = CSVBatchValidatorTest.rows
+        header = ["amount", "email", "name", "id"]
+        lists = [
+            [row[name] for name in header if row[name] is not None] for row in rows
+        ]
+
+        columns, errors = DEFAULT_SCHEMA.bind(header).validate_rows(lists)
+        expected_columns, expected_errors = CSVBatchValidator.validate_rows(rows)
+
+        self.assertEqual(errors, expected_errors)
+        self.assertEqual(columns["id"][0], expected_columns["id"][0])
+        self.assertEqual(columns["amount"][0], expected_columns["amount"][0])
+
+    def test_custom_schema_applies_constraints(self):
+        schema = ImportSchema.objects.create(name="orders", columns=self.columns)
+        validator = compile_schema(schema).bind(
+            ["id", "name", "email", "amount", "currency"]
+        )
+
+        columns, errors = validator.validate_rows(
+            [
+                ["1", "ann", "ann@example.com", "10", "EUR"],
+                ["2", "bartholomew", "bart@example.com", "10", "EUR"],
+                ["3", "cy", "cy@example.com", "900", "EUR"],
+                ["4", "di", "di@example.com", "10", "GBP"],
+            ]
+        )
+
+        self.assertEqual(
+            errors,
+            [
+                None,
+                ("name", "Name is longer than 6"),
+                ("amount", "Amount must be at most 500"),
+                ("currency", "Currency is not an allowed value"),
+            ],
+        )
+        self.assertEqual(columns["note"], [None] * 4)
+        self.assertIs(compile_schema(schema), compile_schema(schema))
+
+        with self.assertRaisesMessage(ValueError, "Missing columns: {'currency'}"):
+            compile_schema(schema).bind(["id", "name", "email", "amount"])
+
+    def test_invalid_schemas_are_rejected(self):
+        for columns in (
+            [],
+            [{"name": "id", "type": "uuid"}],
+            [{"name": "id", "type": "int", "max_length": 3}],
+            self.columns[1:],
+            [{**self.columns[0], "required": False}, *self.columns[1:]],
+            [{**self.columns[0], "stores": "note"}, *self.columns[1:]],
+            [{**self.columns[1], "stores": "email"}, *self.columns[2:]],
+            [*self.columns, {"name": "ref", "type": "int", "stores": "id"}],
+        ):
+            with self.subTest(columns=columns), self.assertRaises(SchemaError):
+                parse_columns(columns)
+
+    def test_job_is_processed_with_its_schema(self):
+        schema = ImportSchema.objects.create(name="orders", columns=self.columns)
+        content = (
+            b"id,name,email,amount,currency\n"
+            b"1,ann,ann@example.com,10,EUR\n"
+            b"2,bo,bo@example.com,10,GBP\n"
+        )
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", content), schema=schema
+        )
+        CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual((job.success_rows, job.failed_rows), (1, 1))
+        self.assertEqual(job.error_counts, {"invalid_currency": 1})
+
+    def test_declared_columns_can_be_stored_under_another_name(self):
+        schema = ImportSchema.objects.create(
+            name="mapped",
+            columns=[
+                {"name": "customer_id", "type": "int", "stores": "id"},
+                {"name": "customer", "type": "str", "stores": "name"},
+                {"name": "contact", "type": "email", "stores": "email"},
+                {"name": "total", "type": "float", "stores": "amount"},
+            ],
+        )
+        content = (
+            b"customer_id,customer,contact,total\n"
+            b"1,ann,ann@example.com,10\n"
+            b"1,bo,bo@example.com,20\n"
+        )
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", content), schema=schema
+        )
+        CSVProcessor(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual((job.success_rows, job.failed_rows), (1, 1))
+        self.assertEqual(
+            list(job.records.values_list("record_id", "name", "email", "amount")),
+            [(1, "ann", "ann@example.com", 10)],
+        )
+        self.assertEqual(
+            list(job.row_errors.values_list("column", "code")),
+            [("customer_id", "duplicate_id")],
+        )
+
+    def test_missing_stored_column_error_names_the_mapping(self):
+        with self.assertRaisesMessage(SchemaError, '"stores": "id"'):
+            parse_columns(self.columns[1:])
+
+    @override_settings(API_KEY="test-key")
+    @patch("processor.api.enqueue_import")
+    def test_upload_selects_latest_schema_version(self, mock_task):
+        ImportSchema.objects.create(name="orders", columns=self.columns)
+        latest = ImportSchema.objects.create(
+            name="orders", version=2, columns=self.columns[:4]
+        )
+
+        def upload(**extra):
+            file = SimpleUploadedFile("test.csv", csv_content, content_type="text/csv")
+            return self.client.post(
+                "/api/imports/",
+                {"file": file, **extra},
+                HTTP_X_API_KEY="test-key",
+            )
+
+        response = upload(schema="orders")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ImportJob.objects.get(id=response.data["id"]).schema, latest)
+        self.assertEqual(upload(schema="orders", schema_version=3).status_code, 400)
+        self.assertEqual(upload(schema="unknown").status_code, 400)
+
+
+class EmailValidationCacheTest(TestCase):
+    def test_repeated_addresses_hit_the_cache(self):
+        cache = EmailValidationCache(size=10, domain_size=10)
+
+        self.assertEqual(cache.lookup("foo@example.com"), ("foo@example.com", None))
+        self.assertEqual(cache.lookup("foo@example.com"), ("foo@example.com", None))
+
+        self.assertEqual(cache.stats(), {"hits": 1, "domain_hits": 0, "misses": 1})
+
+    def test_known_domain_only_rechecks_local_part(self):
+        cache = EmailValidationCache(size=10, domain_size=10)
+        cache.lookup("foo@example.com")
+        cache.lookup("foo@-bad.com")
+
+        self.assertEqual(cache.lookup("bar@example.com"), ("bar@example.com", None))
+        _, error = cache.lookup("bar@-bad.com")
+        self.assertTrue(error.startswith("Invalid Domain"))
+        # A local part that is not a plain dot-atom still goes through emval.
+        _, error = cache.lookup("a b@example.com")
+        self.assertTrue(error.startswith("Invalid Local Part"))
+
+        self.assertEqual(cache.stats(), {"hits": 0, "domain_hits": 2, "misses": 3})
+
+    def test_cached_errors_match_uncached_validation(self):
+        cache = EmailValidationCache(size=10, domain_size=10)
+        for value in ["x@-bad.com", "a..b@-bad.com", "y@-bad.com", "bar@"]:
+            try:
+                validate_email(value)
+                expected = None
+            except ValueError as exc:
+                expected = str(exc)
+            self.assertEqual(cache.lookup(value)[1], expected)
+
+
+class MetricsTest(TestCase):
+    def test_nested_stages_are_exclusive(self):
+        timer = metrics.StageTimer(enabled=True)
+        with timer.stage("process"):
+            with timer.stage("write"):
+                time.sleep(0.02)
+
+        self.assertGreaterEqual(timer.totals["write"], 0.02)
+        self.assertLess(timer.totals["process"], 0.01)
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", (1, 5))
+        for value in (0.5, 2, 2, 10):
+            histogram.observe(value)
+        data = {k: str(v) for k, v in histogram.pending.items()}
+        data["sum"] = str(histogram.pending_sum)
+
+        self.assertEqual(
+            histogram.render(data)[2:],
+            [
+                'test_seconds_bucket{le="1"} 1',
+                'test_seconds_bucket{le="5"} 3',
+                'test_seconds_bucket{le="+Inf"} 4',
+                "test_seconds_sum 14.5",
+                "test_seconds_count 4",
+            ],
+        )
+
+    @override_settings(API_KEY="test-key")
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", HTTP_X_API_KEY="test-key")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(b"# TYPE import_db_write_seconds histogram", response.content)
+
+
+class ProgressThrottleTest(TestCase):
+    def test_fires_on_row_count_or_elapsed_time(self):
+        throttle = ProgressThrottle(interval=60, rows=100)
+
+        self.assertFalse(throttle.due(50))
+        self.assertTrue(throttle.due(100))
+        self.assertFalse(throttle.due(150))
+
+        throttle.last_time -= 60
+        self.assertTrue(throttle.due(160))
+
+
+@override_settings(
+    API_KEY="test-key",
+    API_CLIENTS={"acme": "acme-key", "globex": "globex-key"},
+    IMPORT_FAST_LANE_MAX_BYTES=64,
+    IMPORT_BULK_SLOTS=3,
+    IMPORT_CLIENT_WEIGHTS={"acme": 2},
+)
+class SchedulingTest(APITestCase):
+    def create_bulk(self, client: str, count: int) -> list[ImportJob]:
+        return [
+            ImportJob.objects.create(file="imports/big.csv", client=client, lane="bulk")
+            for _ in range(count)
+        ]
+
+    @patch("processor.api.enqueue_import")
+    def test_upload_records_client_and_lane_by_size(self, mock_enqueue):
+        for key, content, expected in (
+            ("test-key", csv_content, ("default", "bulk")),
+            ("globex-key", csv_content[:40], ("globex", "fast")),
+        ):
+            file = SimpleUploadedFile("test.csv", content, content_type="text/csv")
+            response = self.client.post(
+                "/api/imports/", {"file": file}, format="multipart", HTTP_X_API_KEY=key
+            )
+            job = ImportJob.objects.get(id=response.data["id"])
+            self.assertEqual((job.client, job.lane), expected)
+
+        response = self.client.get("/api/imports/", HTTP_X_API_KEY="nope")
+        self.assertEqual(response.status_code, 403)
+
+    def test_slots_are_shared_by_client_weight(self):
+        waiting = [(i, "acme") for i in range(6)] + [(i, "globex") for i in range(6, 9)]
+
+        self.assertEqual(pick_fair(waiting, Counter(), 3), [0, 6, 1])
+        self.assertEqual(pick_fair(waiting, Counter(acme=2), 1), [6])
+        self.assertEqual(pick_fair(waiting[:2], Counter(globex=5), 4), [0, 1])
+
+    @patch("processor.tasks.process_import")
+    def test_bulk_jobs_wait_for_a_free_slot(self, mock_task):
+        # One client's backlog does not keep the other waiting.
+        acme = self.create_bulk("acme", 5)
+        globex = self.create_bulk("globex", 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_import(acme[0])
+        calls = mock_task.apply_async.call_args_list
+        self.assertEqual(
+            [call.kwargs["args"][0] for call in calls],
+            [str(acme[0].id), str(globex[0].id), str(acme[1].id)],
+        )
+        self.assertEqual({call.kwargs["queue"] for call in calls}, {"imports-bulk"})
+
+        # No free slot until a running job finishes.
+        self.assertEqual(dispatch_bulk(), 0)
+        ImportJob.objects.filter(id=globex[0].id).update(status=ImportStatus.COMPLETED)
+        mock_task.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(dispatch_bulk(), 1)
+        mock_task.apply_async.assert_called_once_with(
+            args=[str(globex[1].id)], queue="imports-bulk"
+        )
+
+    @patch("processor.tasks.process_import")
+    def test_fast_jobs_skip_the_scheduler(self, mock_task):
+        job = ImportJob.objects.create(file="imports/test.csv", lane="fast")
+        enqueue_import(job)
+
+        mock_task.apply_async.assert_called_once_with(
+            args=[str(job.id)], queue="imports-fast"
+        )
+        self.assertIsNone(ImportJob.objects.get(id=job.id).dispatched_at)
+
+    def test_queue_wait_is_kept_across_restarts(self):
+        job = ImportJob.objects.create(
+            file=SimpleUploadedFile("test.csv", csv_content), lane="fast"
+        )
+        CSVProcessor(job).run()
+        job.refresh_from_db()
+        wait = job.queue_wait
+        self.assertIsNotNone(wait)
+
+        CSVProcessor(job).start()
+        job.refresh_from_db()
+        self.assertEqual(job.queue_wait, wait)
+        self.assertEqual(
+            ImportJobStatusSerializer.from_instance(job)["queue_wait"], wait
+        )
 
 
 class ImportServiceTest(TestCase):
@@ -0,0 +1,327 @@
+import hashlib
+import io
+from typing import IO, Any, Iterable
+from uuid import UUID
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.utils import timezone
+from loguru import logger
+from rest_framework.exceptions import ValidationError
+
+from .models import (
+    ImportJob,
+    ImportSchema,
+    ImportUpload,
+    ImportUploadChunk,
+    UploadStatus,
+)
+from .compression import compression_for
+from .scheduling import choose_lane
+from .serializers import (
+    _estimate_rows,
+    _read_head,
+    _validate_header,
+    _validate_not_binary,
+    _validate_not_empty,
+)
+from .services import ImportService
+
+
+class HashingReader(io.RawIOBase):
+    """
+    Read-only stream handed to storage: hashes and counts bytes as the
+    storage backend pulls them, and refuses to read more than ``limit`` bytes.
+    """
+
+    def __init__(self, stream: IO[bytes] | io.RawIOBase, limit: int | None = None):
+        self.stream = stream
+        self.limit = limit
+        self.size = 0
+        self.digest = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        view = memoryview(buffer).cast("B")
+        size = len(view)
+        if self.limit is not None:
+            # One byte past the limit is enough to detect an oversized body.
+            size = min(size, self.limit - self.size + 1)
+        data = self.stream.read(size) or b""
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            raise ValidationError({"size": f"Chunk is larger than {self.limit} bytes."})
+        self.digest.update(data)
+        view[: len(data)] = data
+        return len(data)
+
+    def file(self) -> File:
+        """This stream as a ``File`` for storage."""
+        return File(io.BufferedReader(self))
+
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Hashes multipart file fields as their chunks stream in. Installed in front
+    of Django's handlers, it passes every chunk on unchanged, so the file is
+    still stored by the next handler and never read a second time.
+    """
+
+    def __init__(self, request: Any = None):
+        super().__init__(request)
+        self.digests: dict[str, Any] = {}
+
+    def new_file(self, field_name: str, *args: Any, **kwargs: Any) -> None:
+        super().new_file(field_name, *args, **kwargs)
+        self.digests[field_name] = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> bytes:
+        self.digests[self.field_name].update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size: int) -> None:
+        return None
+
+    def hexdigest(self, field_name: str) -> str:
+        digest = self.digests.get(field_name)
+        return digest.hexdigest() if digest is not None else ""
+
+
+class ConcatReader(io.RawIOBase):
+    """Reads stored upload parts back to back as one stream."""
+
+    def __init__(self, names: Iterable[str]):
+        self.names = iter(names)
+        self.current: IO[bytes] | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        view = memoryview(buffer).cast("B")
+        while True:
+            if self.current is None:
+                name = next(self.names, None)
+                if name is None:
+                    return 0
+                self.current = default_storage.open(name, "rb")
+            data = self.current.read(len(view))
+            if data:
+                view[: len(data)] = data
+                return len(data)
+            self.current.close()
+            self.current = None
+
+
+class UploadService:
+    @staticmethod
+    def part_name(upload_id: UUID, index: int) -> str:
+        return f"uploads/{upload_id}/{index}.part"
+
+    @staticmethod
+    def create(
+        filename: str,
+        size: int,
+        sha256: str = "",
+        reprocess: bool = False,
+        schema: ImportSchema | None = None,
+        reader: str = "",
+        client: str = "",
+    ) -> ImportUpload:
+        return ImportUpload.objects.create(
+            filename=filename,
+            size=size,
+            chunk_size=settings.IMPORT_UPLOAD_CHUNK_SIZE,
+            sha256=sha256.lower(),
+            reprocess=reprocess,
+            schema=schema,
+            reader=reader,
+            client=client,
+        )
+
+    @staticmethod
+    def received(upload: ImportUpload) -> list[int]:
+        return list(upload.chunks.order_by("index").values_list("index", flat=True))
+
+    @staticmethod
+    def missing(upload: ImportUpload) -> list[int]:
+        received = set(UploadService.received(upload))
+        return [i for i in range(upload.total_chunks) if i not in received]
+
+    @staticmethod
+    def store_chunk(
+        upload: ImportUpload,
+        index: int,
+        offset: int,
+        stream: IO[bytes],
+        sha256: str = "",
+    ) -> ImportUploadChunk:
+        if upload.status != UploadStatus.OPEN:
+            raise ValidationError({"detail": f"Upload is already {upload.status}."})
+        if not 0 <= index < upload.total_chunks:
+            raise ValidationError({"index": "Chunk index is out of range."})
+        start = index * upload.chunk_size
+        if offset != start:
+            raise ValidationError({"offset": f"Chunk {index} starts at byte {start}."})
+        expected = min(upload.chunk_size, upload.size - start)
+
+        # The body is streamed into storage as it is read; nothing is buffered
+        # in memory or in a temporary file first. A retried chunk replaces the
+        # earlier (possibly partial) part.
+        name = UploadService.part_name(upload.id, index)
+        default_storage.delete(name)
+        reader = HashingReader(stream, expected)
+        stored = name
+        try:
+            # Storage picks another name when the part already exists, i.e.
+            # when the same chunk is being sent twice at once.
+            stored = default_storage.save(name, reader.file())
+            if stored != name:
+                raise ValidationError(
+                    {"index": f"Chunk {index} is already being uploaded."}
+                )
+            if reader.size != expected:
+                raise ValidationError(
+                    {"size": f"Expected {expected} bytes, got {reader.size}."}
+                )
+            if sha256 and reader.hexdigest() != sha256.lower():
+                raise ValidationError({"sha256": "Chunk checksum does not match."})
+        except Exception:
+            default_storage.delete(stored)
+            raise
+
+        chunk, _ = ImportUploadChunk.objects.update_or_create(
+            upload=upload,
+            index=index,
+            defaults={"size": reader.size, "sha256": reader.hexdigest()},
+        )
+        return chunk
+
+    @staticmethod
+    def complete(upload_id: UUID | str) -> tuple[ImportUpload, bool]:
+        """
+        Check that every part is there and the header is valid, then mark the
+        upload for assembly. Returns (upload, queued); ``queued`` is True when
+        ``assemble`` should now run. An upload that is already assembling or
+        completed is returned as it is. Completed jobs are only matched in
+        ``assemble``, on the digest of the bytes received: a declared digest
+        is never trusted on its own.
+        """
+        with transaction.atomic():
+            upload = ImportUpload.objects.select_for_update().get(pk=upload_id)
+            if upload.status != UploadStatus.OPEN:
+                return upload, False
+
+            if UploadService.missing(upload):
+                raise ValidationError({"detail": "Upload has missing chunks."})
+
+            UploadService.read_head(upload)
+
+            upload.status = UploadStatus.ASSEMBLING
+            upload.error = ""
+            upload.save(update_fields=["status", "error", "updated_at"])
+        return upload, True
+
+    @staticmethod
+    def assemble(upload_id: UUID | str) -> ImportJob | None:
+        """
+        Concatenate and hash the parts of an assembling upload into a new
+        ``ImportJob`` file. Runs in a worker, and holds no lock while copying.
+        Returns the new job, or None when the upload matched a completed job
+        or was not assembling. A checksum mismatch opens the upload again,
+        with the reason in ``error``.
+        """
+        upload = ImportUpload.objects.get(pk=upload_id)
+        if upload.status != UploadStatus.ASSEMBLING:
+            return None
+        names = UploadService.part_names(upload)
+        head = UploadService.read_head(upload)
+
+        reader = HashingReader(ConcatReader(names))
+        job = ImportJob(
+            schema=upload.schema, reader=upload.reader, client=upload.client
+        )
+        job.file.save(upload.filename, reader.file(), save=False)
+        digest = reader.hexdigest()
+        if upload.sha256 and digest != upload.sha256:
+            job.file.delete(save=False)
+            UploadService.reopen(upload.id, "File checksum does not match.")
+            return None
+        job.sha256 = digest
+        job.total_rows_estimated = True
+        # Compressed files, and a file storage did not name, are estimated
+        # while they are processed.
+        if job.file.name and compression_for(upload.filename) is None:
+            with default_storage.open(job.file.name, "rb") as stored:
+                job.total_rows = _estimate_rows(stored, head, reader.size)
+        job.lane = choose_lane(reader.size, job.total_rows)
+
+        with transaction.atomic():
+            upload = ImportUpload.objects.select_for_update().get(pk=upload.id)
+            if upload.status != UploadStatus.ASSEMBLING:
+                # Finished by a redelivered task in the meantime.
+                job.file.delete(save=False)
+                return None
+            upload.sha256 = digest
+            if not upload.reprocess:
+                previous = ImportService.find_completed(digest, upload.schema)
+                if previous is not None:
+                    job.file.delete(save=False)
+                    UploadService.reuse(upload, previous, names)
+                    return None
+            job.save()
+
+            upload.job = job
+            upload.status = UploadStatus.COMPLETED
+            upload.save(update_fields=["job", "sha256", "status", "updated_at"])
+            transaction.on_commit(lambda: UploadService.delete_parts(names))
+
+        logger.info(
+            f"ImportUpload {upload.id} assembled into ImportJob {job.id} ({reader.size} bytes)"
+        )
+        return job
+
+    @staticmethod
+    def reopen(upload_id: UUID | str, error: str) -> None:
+        ImportUpload.objects.filter(
+            pk=upload_id, status=UploadStatus.ASSEMBLING
+        ).update(status=UploadStatus.OPEN, error=error, updated_at=timezone.now())
+        logger.warning(f"ImportUpload {upload_id} assembly failed: {error}")
+
+    @staticmethod
+    def part_names(upload: ImportUpload) -> list[str]:
+        return [
+            UploadService.part_name(upload.id, i) for i in range(upload.total_chunks)
+        ]
+
+    @staticmethod
+    def read_head(upload: ImportUpload) -> bytes:
+        """Validate the start of the file, which is in the first part."""
+        with default_storage.open(UploadService.part_name(upload.id, 0), "rb") as first:
+            head = _read_head(first, upload.filename)
+        _validate_not_empty(head)
+        _validate_not_binary(head)
+        _validate_header(head, upload.schema)
+        return head
+
+    @staticmethod
+    def reuse(upload: ImportUpload, job: ImportJob, names: list[str]) -> ImportUpload:
+        upload.job = job
+        upload.status = UploadStatus.COMPLETED
+        upload.save(update_fields=["job", "sha256", "status", "updated_at"])
+        transaction.on_commit(lambda: UploadService.delete_parts(names))
+        logger.info(f"ImportUpload {upload.id} matches completed ImportJob {job.id}")
+        return upload
+
+    @staticmethod
+    def delete_parts(names: list[str]) -> None:
+        for name in names:
+            default_storage.delete(name)
@@ -1,8 +1,29 @@
 from django.urls import path
 
-from .api import ImportUploadApi, ImportStatusApi
+from .api import (
+    ImportAggregatesApi,
+    ImportBatchStatusApi,
+    ImportCancelApi,
+    ImportErrorsApi,
+    ImportUploadApi,
+    ImportStatusApi,
+    UploadChunkApi,
+    UploadCompleteApi,
+    UploadSessionApi,
+    UploadSessionStatusApi,
+)
+from .events import import_events
 
 urlpatterns = [
     path("imports/", ImportUploadApi.as_view()),
+    path("imports/status/", ImportBatchStatusApi.as_view()),
     path("imports/<str:uuid>/", ImportStatusApi.as_view()),
+    path("imports/<str:uuid>/cancel", ImportCancelApi.as_view()),
+    path("imports/<str:uuid>/errors/", ImportErrorsApi.as_view()),
+    path("imports/<str:uuid>/aggregates/", ImportAggregatesApi.as_view()),
+    path("imports/<str:uuid>/events", import_events),
+    path("uploads/", UploadSessionApi.as_view()),
+    path("uploads/<str:uuid>/", UploadSessionStatusApi.as_view()),
+    path("uploads/<str:uuid>/chunks/<int:index>/", UploadChunkApi.as_view()),
+    path("uploads/<str:uuid>/complete/", UploadCompleteApi.as_view()),
 ]
@@ -1,7 +1,12 @@
 # validators.py
-from collections.abc import Sequence
+import math
+import re
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from functools import lru_cache
 from typing import Any, Mapping
 
+from django.conf import settings
 from emval import EmailValidator
 
 emval = EmailValidator(
@@ -14,6 +19,80 @@ emval = EmailValidator(
 )
 
 
+class EmailValidationCache:
+    """
+    Worker-lifetime memo of email validation results.
+
+    Full addresses go through a bounded LRU. On a miss, an address whose local
+    part is a plain dot-atom reuses the cached verdict for its domain instead
+    of calling emval. emval checks the local part before the domain, so only
+    "Invalid Domain" errors are reused. Anything unusual (quoting, unicode,
+    length limits) still goes to emval.
+    """
+
+    SIMPLE_LOCAL = re.compile(
+        r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*\Z"
+    )
+    MAX_LOCAL_LENGTH = 64
+    MAX_ADDRESS_LENGTH = 254
+
+    def __init__(self, size: int, domain_size: int):
+        self.domain_size = domain_size
+        self.domains: OrderedDict[str, str | None] = OrderedDict()
+        self.domain_hits = 0
+        self.lookup = lru_cache(maxsize=size)(self._validate)
+
+    def _validate(self, value: str) -> tuple[str | None, str | None]:
+        local, at, domain = value.rpartition("@")
+        simple = bool(
+            at
+            and len(value) <= self.MAX_ADDRESS_LENGTH
+            and len(local) <= self.MAX_LOCAL_LENGTH
+            and self.SIMPLE_LOCAL.match(local)
+        )
+
+        if simple and domain in self.domains:
+            self.domains.move_to_end(domain)
+            self.domain_hits += 1
+            error = self.domains[domain]
+            return (None, error) if error else (value, None)
+
+        try:
+            emval.validate_email(value)
+        except (ValueError, SyntaxError) as exc:
+            error = str(exc)
+            if simple and error.startswith("Invalid Domain"):
+                self._remember_domain(domain, error)
+            return None, error
+
+        if simple:
+            self._remember_domain(domain, None)
+        return value.strip(), None
+
+    def _remember_domain(self, domain: str, error: str | None) -> None:
+        self.domains[domain] = error
+        if len(self.domains) > self.domain_size:
+            self.domains.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        info = self.lookup.cache_info()
+        return {
+            "hits": info.hits,
+            "domain_hits": self.domain_hits,
+            "misses": info.misses - self.domain_hits,
+        }
+
+    def clear(self) -> None:
+        self.lookup.cache_clear()
+        self.domains.clear()
+        self.domain_hits = 0
+
+
+email_cache = EmailValidationCache(
+    settings.EMAIL_CACHE_SIZE, settings.EMAIL_DOMAIN_CACHE_SIZE
+)
+
+
 def validate_id(value: str | None) -> int:
     if value is None:
         raise ValueError("Invalid id")
@@ -42,10 +121,11 @@ def validate_email(value: str | None) -> str:
     if not value or not isinstance(value, str):
         raise ValueError("Invalid email address")
 
-    if not emval.validate_email(value):
-        raise ValueError("Invalid email address")
+    email, error = email_cache.lookup(value)
+    if email is None:
+        raise ValueError(error or "Invalid email address")
 
-    return value.strip()
+    return email
 
 
 def validate_amount(value: str | None) -> float:
@@ -55,6 +135,9 @@ def validate_amount(value: str | None) -> float:
         amount = float(value)
     except (TypeError, ValueError):
         raise ValueError("Invalid amount")
+    # float() accepts "nan" and "inf", which would poison every sum.
+    if not math.isfinite(amount):
+        raise ValueError("Invalid amount")
 
     if amount < 0:
         raise ValueError("Amount must be non-negative")
@@ -73,6 +156,138 @@ class CSVRowValidator:
         }
 
 
+ColumnResult = tuple[list[Any], list[str | None]]
+ColumnValidator = Callable[[Sequence[str | None]], ColumnResult]
+
+
+def _bulk_parse(
+    values: Sequence[str | None],
+    convert: Callable[[Any], Any],
+    validate: Callable[[str | None], Any],
+) -> ColumnResult:
+    # Optimistic path: one C-level pass over the whole column. Only a column
+    # that contains a bad value falls back to the per-value validator.
+    try:
+        return list(map(convert, values)), [None] * len(values)
+    except (TypeError, ValueError):
+        pass
+
+    parsed: list[Any] = []
+    errors: list[str | None] = []
+    for value in values:
+        try:
+            parsed.append(validate(value))
+            errors.append(None)
+        except ValueError as exc:
+            parsed.append(None)
+            errors.append(str(exc))
+    return parsed, errors
+
+
+def validate_ids(values: Sequence[str | None]) -> ColumnResult:
+    parsed, errors = _bulk_parse(values, int, validate_id)
+    for i, id_ in enumerate(parsed):
+        if id_ is not None and id_ <= 0:
+            parsed[i] = None
+            errors[i] = "Id must be positive"
+    return parsed, errors
+
+
+def validate_names(values: Sequence[str | None]) -> ColumnResult:
+    parsed = [(value or "").strip() for value in values]
+    errors = [None if name else "Name is required" for name in parsed]
+    return parsed, errors
+
+
+def validate_emails(values: Sequence[str | None]) -> ColumnResult:
+    lookup = email_cache.lookup
+    parsed: list[Any] = []
+    errors: list[str | None] = []
+    for value in values:
+        if not value or not isinstance(value, str):
+            parsed.append(None)
+            errors.append("Invalid email address")
+            continue
+        email, error = lookup(value)
+        parsed.append(email)
+        errors.append(error)
+    return parsed, errors
+
+
+def validate_amounts(values: Sequence[str | None]) -> ColumnResult:
+    parsed, errors = _bulk_parse(values, float, validate_amount)
+    for i, amount in enumerate(parsed):
+        if amount is None:
+            continue
+        if not math.isfinite(amount):
+            parsed[i] = None
+            errors[i] = "Invalid amount"
+        elif amount < 0:
+            parsed[i] = None
+            errors[i] = "Amount must be non-negative"
+    return parsed, errors
+
+
+ERROR_CODES = {
+    "Invalid id": "invalid_id",
+    "Id must be positive": "non_positive_id",
+    "Name is required": "missing_name",
+    "Invalid email address": "invalid_email",
+    "Missing amount": "missing_amount",
+    "Invalid amount": "invalid_amount",
+    "Amount must be non-negative": "negative_amount",
+    "Duplicate id": "duplicate_id",
+}
+
+
+def error_code(column: str, message: str) -> str:
+    # emval reports many distinct reasons; they all collapse to invalid_<column>.
+    return ERROR_CODES.get(message, f"invalid_{column}"[:32])
+
+
+RowError = tuple[str, str]
+
+
+class CSVBatchValidator:
+    """
+    Column-wise counterpart of ``CSVRowValidator``. Validates a block of rows
+    given as one list per column and returns the parsed columns together with
+    a per-row error list instead of raising: ``None`` for valid rows, else a
+    ``(column, message)`` pair. A row reports the first failing column in the
+    same order, and with the same message, as ``CSVRowValidator.validate_row``.
+    """
+
+    COLUMNS: dict[str, ColumnValidator] = {
+        "id": validate_ids,
+        "name": validate_names,
+        "email": validate_emails,
+        "amount": validate_amounts,
+    }
+
+    @classmethod
+    def validate_columns(
+        cls, columns: Mapping[str, Sequence[str | None]], size: int
+    ) -> tuple[dict[str, list[Any]], list[RowError | None]]:
+        parsed: dict[str, list[Any]] = {}
+        errors: list[RowError | None] = [None] * size
+
+        for name, validate in cls.COLUMNS.items():
+            values, column_errors = validate(columns.get(name) or [None] * size)
+            parsed[name] = values
+            for i, error in enumerate(column_errors):
+                if error is not None and errors[i] is None:
+                    errors[i] = (name, error)
+
+        return parsed, errors
+
+    @classmethod
+    def validate_rows(
+        cls, rows: Sequence[Mapping[str, str | None]]
+    ) -> tuple[dict[str, list[Any]], list[RowError | None]]:
+        columns = {name: [row.get(name) for row in rows] for name in cls.COLUMNS}
+        return cls.validate_columns(columns, len(rows))
+
+
 class CSVHeaderValidator:
     EXPECTED_COLUMNS = {"id", "name", "email", "amount"}
 
@@ -0,0 +1,17 @@
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from rest_framework.exceptions import PermissionDenied
+
+from . import metrics
+from .permissions import HasImportApiKey
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    # Scrapers send the API key like any other client (X-API-Key).
+    try:
+        HasImportApiKey().has_permission(request, None)  # type: ignore[arg-type]
+    except PermissionDenied as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=403)
+
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
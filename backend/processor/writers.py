@@ -0,0 +1,100 @@
+from collections.abc import Iterable
+from typing import Any
+from uuid import UUID
+
+from django.db import connection, models, transaction
+
+from .metrics import StageTimer
+from .models import ImportedRecord, ImportRowError
+
+
+class BulkWriter:
+    """
+    Buffers rows for one job and writes them in batches, one transaction per
+    batch. PostgreSQL gets ``COPY ... FROM STDIN``; other databases fall back
+    to ``bulk_create``. Rows are tuples matching ``columns``; ``job_id`` is
+    added on write.
+    """
+
+    model: type[models.Model]
+    columns: tuple[str, ...]
+
+    def __init__(
+        self,
+        job_id: UUID,
+        batch_size: int,
+        chunk: int = 0,
+        timer: StageTimer | None = None,
+    ):
+        self.job_id = job_id
+        self.batch_size = max(1, batch_size)
+        self.chunk = chunk
+        self.timer = timer or StageTimer(enabled=False)
+        self.buffer: list[tuple[Any, ...]] = []
+        self.written = 0
+
+    def extend(self, rows: Iterable[tuple[Any, ...]]) -> None:
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        while self.buffer:
+            batch = self.buffer[: self.batch_size]
+            del self.buffer[: self.batch_size]
+            with self.timer.stage("write"), transaction.atomic():
+                if connection.vendor == "postgresql":
+                    self._copy(batch)
+                else:
+                    self._bulk_create(batch)
+            self.written += len(batch)
+
+    def copy_sql(self) -> str:
+        # Column names are quoted too: "column" is a reserved word.
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        columns = ", ".join(quote(name) for name in ("job_id", *self.columns))
+        return f"COPY {table} ({columns}) FROM STDIN"
+
+    def _copy(self, batch: list[tuple[Any, ...]]) -> None:
+        job_id = self.job_id
+        with connection.cursor() as cursor:
+            with cursor.copy(self.copy_sql()) as copy:
+                for row in batch:
+                    copy.write_row((job_id, *row))
+
+    def _bulk_create(self, batch: list[tuple[Any, ...]]) -> None:
+        job_id = self.job_id
+        columns = self.columns
+        self.model._default_manager.bulk_create(
+            [self.model(job_id=job_id, **dict(zip(columns, row))) for row in batch],
+            batch_size=self.batch_size,
+        )
+
+
+class ImportedRecordWriter(BulkWriter):
+    model = ImportedRecord
+    columns = ("chunk", "row_number", "record_id", "name", "email", "amount")
+
+    def add_block(
+        self, columns: dict[str, list[Any]], valid: list[int], first_row: int
+    ) -> None:
+        chunk = self.chunk
+        ids = columns["id"]
+        names = columns["name"]
+        emails = columns["email"]
+        amounts = columns["amount"]
+        self.extend(
+            (chunk, first_row + i + 1, ids[i], names[i], emails[i], amounts[i])
+            for i in valid
+        )
+
+
+class ImportRowErrorWriter(BulkWriter):
+    model = ImportRowError
+    columns = ("chunk", "row_number", "column", "code")
+
+    def add(self, row_number: int, column: str, code: str) -> None:
+        self.buffer.append((self.chunk, row_number, column, code))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
@@ -11,13 +11,11 @@ export default function App() {
 
   const { job, isLoading, error: jobError } = useImportJob(jobId);
 
-  const isTotalKnown = !!job && job.total_rows > 0;
+  const isTotalKnown = !!job && (job.total_rows > 0 || job.file_size > 0);
 
   const progress = useMemo(() => {
     if (!job) return 0;
-    const { processed_rows, total_rows } = job;
-    if (!total_rows) return 0;
-    return Math.round((processed_rows / total_rows) * 100);
+    return job.progress;
   }, [job]);
 
   async function onUpload() {
@@ -51,7 +49,7 @@ export default function App() {
               <input
                 id="fileInput"
                 type="file"
-                accept=".csv"
+                accept=".csv,.csv.gz,.csv.zst"
                 onChange={(e) => setSelectedFile(e.target.files?.[0] ?? null)}
                 hidden
               />
@@ -93,7 +91,9 @@ export default function App() {
 
               <div className="progress-text">
                 {job.processed_rows}
-                {isTotalKnown ? ` / ${job.total_rows} rows (${progress}%)` : " rows processed"}
+                {isTotalKnown
+                  ? ` / ${job.total_rows_estimated ? "~" : ""}${job.total_rows} rows (${progress}%)`
+                  : " rows processed"}
               </div>
 
               {job.status === "completed" && (
@@ -105,6 +105,7 @@ export default function App() {
               )}
 
               {job.status === "failed" && <div className="error-box">{job.error || "Job failed"}</div>}
+              {job.status === "cancelled" && <div className="error-box">Import cancelled</div>}
             </div>
           )}
         </div>
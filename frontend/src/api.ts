@@ -1,6 +1,6 @@
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL ?? "http://localhost:8000";
 
-export type ImportStatus = "pending" | "processing" | "completed" | "failed";
+export type ImportStatus = "pending" | "processing" | "completed" | "failed" | "cancelled";
 
 export type ImportSummary = {
   total: number;
@@ -11,15 +11,24 @@ export type ImportJob = {
   id: string;
   status: ImportStatus;
   progress: number;
+  row_progress: number;
+  byte_progress: number;
 
   total_rows: number;
+  total_rows_estimated: boolean;
   processed_rows: number;
   success_rows: number;
   failed_rows: number;
 
+  file_size: number;
+  bytes_processed: number;
+
   error: string;
+  error_counts: Record<string, number>;
+  timings: Record<string, number>;
   file: string;
   created_at: string;
+  started_at: string | null;
   updated_at: string;
 };
 
@@ -41,17 +50,86 @@ export async function uploadCsv(file: File): Promise<{ id: string }> {
   return res.json();
 }
 
+const jobCache = new Map<string, { etag: string; job: ImportJob }>();
+
 export async function fetchJob(jobId: string): Promise<ImportJob> {
-  const res = await fetch(
-    `${API_BASE_URL}/api/imports/${jobId}/`, {
-      headers: { "X-API-KEY": import.meta.env.VITE_IMPORT_API_KEY },
-    }
-  );
+  const cached = jobCache.get(jobId);
+  const headers: Record<string, string> = {
+    "X-API-KEY": import.meta.env.VITE_IMPORT_API_KEY,
+  };
+  if (cached) headers["If-None-Match"] = cached.etag;
+
+  const res = await fetch(`${API_BASE_URL}/api/imports/${jobId}/`, {
+    headers,
+    // Revalidation is handled here; keep the browser cache out of the way.
+    cache: "no-store",
+  });
+
+  if (res.status === 304 && cached) {
+    return cached.job;
+  }
 
   if (!res.ok) {
     const text = await res.text().catch(() => "");
     throw new Error(text || `Fetch failed (${res.status})`);
   }
 
-  return res.json();
+  const job: ImportJob = await res.json();
+  const etag = res.headers.get("ETag");
+  if (etag) jobCache.set(jobId, { etag, job });
+  return job;
+}
+
+export type JobEvent = { event: "progress" | "summary"; job: ImportJob };
+
+/**
+ * Reads the Server-Sent Events stream for a job. Uses fetch instead of
+ * EventSource because EventSource cannot send the X-API-KEY header.
+ * Rejects when push isn't available so the caller can fall back to polling.
+ * Resolves true when the server ended the stream with a `retry` field (it caps
+ * how long one connection stays open), so the caller should reconnect.
+ */
+export async function streamJob(
+  jobId: string,
+  onEvent: (event: JobEvent) => void,
+  signal: AbortSignal
+): Promise<boolean> {
+  const res = await fetch(`${API_BASE_URL}/api/imports/${jobId}/events`, {
+    headers: {
+      "X-API-KEY": import.meta.env.VITE_IMPORT_API_KEY,
+      Accept: "text/event-stream",
+    },
+    signal,
+  });
+
+  if (!res.ok || !res.body) {
+    throw new Error(`Event stream unavailable (${res.status})`);
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  let retry = false;
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return retry;
+    buffer += value;
+
+    let end: number;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const message = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of message.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+        else if (line.startsWith("retry: ")) retry = true;
+      }
+      if (data && (event === "progress" || event === "summary")) {
+        onEvent({ event, job: JSON.parse(data) });
+      }
+    }
+  }
 }
@@ -1,16 +1,23 @@
+import { useEffect, useState } from "react";
 import useSWR from "swr";
-import { fetchJob, type ImportJob } from "./api";
+import { fetchJob, streamJob, type ImportJob } from "./api";
+
+function isFinished(job: ImportJob | undefined) {
+  return job?.status === "completed" || job?.status === "failed" || job?.status === "cancelled";
+}
 
 export function useImportJob(jobId: string | null) {
   const key = jobId ? ["import-job", jobId] : null;
+  const [streaming, setStreaming] = useState(false);
 
   const { data, error, isLoading, mutate } = useSWR<ImportJob>(
     key,
     () => fetchJob(jobId!),
     {
       refreshInterval: (latest) => {
-        if (!latest) return 1000;
-        if (latest.status === "completed" || latest.status === "failed") return 0;
+        if (isFinished(latest)) return 0;
+        // The event stream pushes updates; poll only when it isn't available.
+        if (streaming) return 0;
         return 1000;
       },
       revalidateOnFocus: false,
@@ -18,10 +25,35 @@ export function useImportJob(jobId: string | null) {
     }
   );
 
+  useEffect(() => {
+    if (!jobId) return;
+
+    const controller = new AbortController();
+    setStreaming(true);
+
+    const stream = async () => {
+      const onEvent = ({ job }: { job: ImportJob }) => {
+        mutate(job, { revalidate: false });
+      };
+      // The server closes long streams with a retry field; open a new one.
+      while (await streamJob(jobId, onEvent, controller.signal)) {
+        if (controller.signal.aborted) return;
+      }
+    };
+
+    stream()
+      .catch(() => undefined)
+      .finally(() => {
+        if (!controller.signal.aborted) setStreaming(false);
+      });
+
+    return () => controller.abort();
+  }, [jobId, mutate]);
+
   return {
     job: data ?? null,
     error,
     isLoading,
     refresh: mutate,
   };
-}
\ No newline at end of file
+}